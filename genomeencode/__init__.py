@@ -1,4 +1,7 @@
 """__init__ file for the package"""
 
-__all__ = ['burros_wheeler', 'decoder', 'encoder', 'huffman',
-           'interface', 'sequence']
+__all__ = ['adaptive_huffman', 'aio', 'blocks', 'burros_wheeler', 'cache',
+           'client', 'codec', 'context_model', 'decoder', 'dedup', 'encoder',
+           'exposition', 'fm_index', 'huffman', 'interface', 'metrics',
+           'multi_bwt', 'pipeline', 'progress', 'r_index', 'rans',
+           'reference', 'repeats', 'sequence', 'service', 'shared', 'trace']
@@ -0,0 +1,472 @@
+# -*- coding: utf-8 -*-
+"""
+One-pass adaptive Huffman coding for streaming input, e.g; sequencer output
+piped over stdin. The encoder and the decoder start from the same empty model
+and rebuild their canonical codes from the symbol counts at the same points of
+the stream (periodic model rebuilds), so no frequency table is sent and
+nothing has to be buffered: output is emitted as soon as whole bytes are
+ready and the memory only depends on the size of the alphabet.
+
+Usage: python -m genomeencode.adaptive_huffman [-d] < input > output
+"""
+from __future__ import absolute_import
+import argparse
+import sys
+from typing import BinaryIO, Dict, List, TextIO, Tuple
+from genomeencode.huffman import MultiHuffman
+
+class AdaptiveModel:
+    """The model shared by the adaptive encoder and decoder. Symbol 0 ends
+    the stream, symbol 1 escapes a new character (sent as a raw code point)
+    and the other symbols are characters in the order they first appeared.
+
+    Attributes
+    ----------
+    chars: List[str]
+        The character of every symbol, None for the two special symbols.
+    index: Dict[str, int]
+        The symbol of every known character.
+    counts: List[int]
+        The occurrences of every symbol since the last halving.
+    lengths: List[int]
+        The current code length of every symbol.
+    codes: List[int]
+        The current canonical code of every symbol.
+    width: int
+        The length of the longest current code.
+    """
+    END = 0
+    ESCAPE = 1
+    CHAR_BITS = 21 # enough for any unicode code point
+    MAX_LENGTH = 15
+    FIRST_PERIOD = 32
+    MAX_PERIOD = 4096
+    LIMIT = 1 << 16
+
+    def __init__(self: object) -> None:
+        """Class constructor.
+
+        Returns
+        -------
+        None
+            An empty model.
+
+        """
+        self.chars = [None, None]
+        self.index = {}
+        self.counts = [0, 0]
+        self.__seen = 0
+        self.__period = AdaptiveModel.FIRST_PERIOD
+        self.__next = 0
+        self.lengths = []
+        self.codes = []
+        self.width = 0
+        self.__lookup = []
+        self.rebuild()
+
+    def rebuild(self: object) -> None:
+        """Rebuilds the canonical codes (and the decoding lookup table) from
+        the current counts.
+
+        Returns
+        -------
+        None
+
+        """
+        lengths = MultiHuffman.code_lengths(self.counts,
+                                            AdaptiveModel.MAX_LENGTH)
+        codes = MultiHuffman.canonical_codes(lengths)
+        self.lengths = lengths.tolist()
+        self.codes = codes.tolist()
+        self.width = max(self.lengths)
+        self.__lookup = [0] * (1 << self.width)
+        for symbol, (code, length) in enumerate(zip(self.codes,
+                                                    self.lengths)):
+            start = code << (self.width - length)
+            self.__lookup[start:start + (1 << (self.width - length))] = \
+                [symbol << 5 | length] * (1 << (self.width - length))
+        self.__next = self.__seen + self.__period
+        self.__period = min(2 * self.__period, AdaptiveModel.MAX_PERIOD)
+
+    def lookup(self: object, window: int) -> Tuple[int, int]:
+        """Finds the symbol whose code starts a window of bits.
+
+        Parameters
+        ----------
+        window : int
+            The next width bits of the stream.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The symbol and the length of its code.
+
+        """
+        entry = self.__lookup[window]
+        return entry >> 5, entry & 31
+
+    def add(self: object, char: str) -> int:
+        """Adds a new character to the alphabet.
+
+        Parameters
+        ----------
+        char : str
+            The character.
+
+        Returns
+        -------
+        int
+            The symbol of the character.
+
+        """
+        self.index[char] = len(self.chars)
+        self.chars.append(char)
+        self.counts.append(0) # not codable before the next rebuild
+        return self.index[char]
+
+    def update(self: object, symbol: int) -> None:
+        """Counts a coded symbol, halving the counts when they grow too large
+        and rebuilding the codes when the period is over.
+
+        Parameters
+        ----------
+        symbol : int
+            The symbol.
+
+        Returns
+        -------
+        None
+
+        """
+        self.counts[symbol] += 1
+        self.__seen += 1
+        if self.__seen >= self.__next:
+            if sum(self.counts) > AdaptiveModel.LIMIT:
+                self.counts = [(count + 1) // 2 for count in self.counts]
+            self.rebuild()
+
+    def codable(self: object, symbol: int) -> bool:
+        """Tells whether a symbol has a code yet, characters added since the
+        last rebuild are escaped.
+
+        Parameters
+        ----------
+        symbol : int
+            The symbol.
+
+        Returns
+        -------
+        bool
+            True when the symbol has a code.
+
+        """
+        return symbol < len(self.codes)
+
+class AdaptiveHuffmanEncoder:
+    """A streaming adaptive Huffman encoder: text goes in with feed() in
+    pieces of any size and the coded bytes come out as soon as possible.
+
+    Attributes
+    ----------
+    model: AdaptiveModel
+        The adaptive model.
+    """
+    MAGIC = b'AHUF'
+    VERSION = 1
+    BUFFER_BITS = 256
+
+    def __init__(self: object) -> None:
+        """Class constructor.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.model = AdaptiveModel()
+        self.__bits = 0
+        self.__count = 0
+        self.__started = False
+        self.__finished = False
+
+    def __put(self: object, value: int, length: int) -> None:
+        """Appends bits to the bit buffer."""
+        self.__bits = (self.__bits << length) | value
+        self.__count += length
+
+    def __drain(self: object) -> bytes:
+        """Takes the whole bytes out of the bit buffer."""
+        out = b''
+        if not self.__started:
+            out = self.MAGIC + bytes([self.VERSION])
+            self.__started = True
+        ready = self.__count // 8
+        if ready:
+            self.__count -= 8 * ready
+            out += (self.__bits >> self.__count).to_bytes(ready, 'big')
+            self.__bits &= (1 << self.__count) - 1
+        return out
+
+    def __code(self: object, symbol: int) -> None:
+        """Puts the code of a symbol and counts it."""
+        model = self.model
+        self.__put(model.codes[symbol], model.lengths[symbol])
+        model.update(symbol)
+
+    def feed(self: object, text: str) -> bytes:
+        """Encodes a piece of text.
+
+        Parameters
+        ----------
+        text : str
+            The next characters of the stream.
+
+        Returns
+        -------
+        bytes
+            The coded bytes that are ready.
+
+        """
+        if self.__finished:
+            raise ValueError("The stream was already flushed")
+        model = self.model
+        out = [self.__drain()]
+        for char in text:
+            symbol = model.index.get(char)
+            if symbol is not None and model.codable(symbol):
+                self.__code(symbol)
+            else:
+                # the decoder learns the character from its raw code point
+                self.__code(AdaptiveModel.ESCAPE)
+                self.__put(ord(char), AdaptiveModel.CHAR_BITS)
+                model.update(symbol if symbol is not None else
+                             model.add(char))
+            if self.__count >= self.BUFFER_BITS:
+                out.append(self.__drain())
+        out.append(self.__drain())
+        return b''.join(out)
+
+    def flush(self: object) -> bytes:
+        """Ends the stream.
+
+        Returns
+        -------
+        bytes
+            The last coded bytes, padded to a whole byte.
+
+        """
+        if self.__finished:
+            return b''
+        self.__code(AdaptiveModel.END)
+        self.__put(0, -self.__count % 8)
+        self.__finished = True
+        return self.__drain()
+
+class AdaptiveHuffmanDecoder:
+    """A streaming adaptive Huffman decoder: coded bytes go in with feed() in
+    pieces of any size and the text comes out as soon as it is decoded.
+
+    Attributes
+    ----------
+    model: AdaptiveModel
+        The adaptive model, the same as the encoder's at every symbol.
+    finished: bool
+        True once the end of the stream was decoded.
+    """
+
+    def __init__(self: object) -> None:
+        """Class constructor.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.model = AdaptiveModel()
+        self.finished = False
+        self.__pending = b''
+        self.__position = 0
+        self.__bits = 0
+        self.__count = 0
+        self.__started = False
+
+    def __refill(self: object) -> None:
+        """Moves pending bytes to the bit buffer, 8 at a time."""
+        while self.__count < 64 and self.__position < len(self.__pending):
+            chunk = self.__pending[self.__position:self.__position + 8]
+            self.__position += len(chunk)
+            self.__bits = (self.__bits << 8 * len(chunk)) | \
+                int.from_bytes(chunk, 'big')
+            self.__count += 8 * len(chunk)
+
+    def __peek(self: object, length: int) -> int:
+        """Reads the next bits without consuming them, zeroes past the end."""
+        if self.__count >= length:
+            return self.__bits >> (self.__count - length)
+        return self.__bits << (length - self.__count)
+
+    def __take(self: object, length: int) -> int:
+        """Consumes the next bits."""
+        value = self.__peek(length)
+        self.__count -= length
+        self.__bits &= (1 << self.__count) - 1
+        return value
+
+    def __available(self: object) -> int:
+        """The number of bits that were received and not consumed yet."""
+        return self.__count + 8 * (len(self.__pending) - self.__position)
+
+    def __decode(self: object, final: bool) -> str:
+        """Decodes as many symbols as possible."""
+        model = self.model
+        out = []
+        while not self.finished:
+            self.__refill()
+            symbol, length = model.lookup(self.__peek(model.width) &
+                                          ((1 << model.width) - 1))
+            needed = length + (AdaptiveModel.CHAR_BITS if
+                               symbol == AdaptiveModel.ESCAPE else 0)
+            if self.__available() < needed:
+                if final:
+                    raise ValueError("The stream is truncated")
+                break
+            self.__take(length)
+            model.update(symbol)
+            if symbol == AdaptiveModel.END:
+                self.finished = True
+            elif symbol == AdaptiveModel.ESCAPE:
+                self.__refill()
+                char = chr(self.__take(AdaptiveModel.CHAR_BITS))
+                symbol = model.index.get(char)
+                model.update(symbol if symbol is not None else
+                             model.add(char))
+                out.append(char)
+            else:
+                out.append(model.chars[symbol])
+        # forget the consumed bytes
+        self.__pending = self.__pending[self.__position:]
+        self.__position = 0
+        return ''.join(out)
+
+    def feed(self: object, data: bytes) -> str:
+        """Decodes a piece of the coded stream.
+
+        Parameters
+        ----------
+        data : bytes
+            The next coded bytes.
+
+        Returns
+        -------
+        str
+            The characters decoded so far.
+
+        """
+        self.__pending += data
+        if not self.__started:
+            header = len(AdaptiveHuffmanEncoder.MAGIC) + 1
+            if len(self.__pending) < header:
+                return ''
+            magic, version = self.__pending[:header - 1], \
+                self.__pending[header - 1]
+            if magic != AdaptiveHuffmanEncoder.MAGIC or \
+                    version != AdaptiveHuffmanEncoder.VERSION:
+                raise ValueError("Not an adaptive Huffman stream")
+            self.__pending = self.__pending[header:]
+            self.__started = True
+        return self.__decode(False)
+
+    def flush(self: object) -> str:
+        """Decodes the end of the stream.
+
+        Returns
+        -------
+        str
+            The last decoded characters.
+
+        """
+        if not self.__started:
+            raise ValueError("The stream is truncated")
+        return self.__decode(True)
+
+def compress_stream(source: TextIO, target: BinaryIO,
+                    chunk_size: int=1 << 16) -> int:
+    """Compresses a text stream in a single pass, piece by piece.
+
+    Parameters
+    ----------
+    source : TextIO
+        The text stream, e.g; sys.stdin.
+    target : BinaryIO
+        The binary stream to write the coded bytes to.
+    chunk_size : int, optional
+        The number of characters read at a time. The default is 65536.
+
+    Returns
+    -------
+    int
+        The number of coded bytes.
+
+    """
+    encoder = AdaptiveHuffmanEncoder()
+    written = 0
+    for text in iter(lambda: source.read(chunk_size), ''):
+        written += target.write(encoder.feed(text))
+    written += target.write(encoder.feed('') + encoder.flush())
+    target.flush()
+    return written
+
+def decompress_stream(source: BinaryIO, target: TextIO,
+                      chunk_size: int=1 << 16) -> int:
+    """Decompresses a coded stream in a single pass, piece by piece.
+
+    Parameters
+    ----------
+    source : BinaryIO
+        The binary stream of coded bytes, e.g; sys.stdin.buffer.
+    target : TextIO
+        The text stream to write the characters to.
+    chunk_size : int, optional
+        The number of bytes read at a time. The default is 65536.
+
+    Returns
+    -------
+    int
+        The number of decoded characters.
+
+    """
+    decoder = AdaptiveHuffmanDecoder()
+    written = 0
+    for data in iter(lambda: source.read(chunk_size), b''):
+        written += target.write(decoder.feed(data))
+    written += target.write(decoder.flush())
+    target.flush()
+    return written
+
+def main(args: List[str]=None) -> None:
+    """Compresses (or decompresses) stdin to stdout.
+
+    Parameters
+    ----------
+    args : List[str], optional
+        The command line arguments. The default is None, i.e; sys.argv.
+
+    Returns
+    -------
+    None
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n\n')[0])
+    parser.add_argument('-d', '--decompress', action='store_true',
+                        help='decompress instead of compressing')
+    options = parser.parse_args(args)
+    if options.decompress:
+        decompress_stream(sys.stdin.buffer, sys.stdout)
+    else:
+        compress_stream(sys.stdin, sys.stdout.buffer)
+
+if __name__ == '__main__':
+    main()
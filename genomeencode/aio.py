@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+An asyncio API for compression and decompression, so that one event loop can
+drive many jobs. The sequences are compressed to blocked files (see
+blocks.BlockReader) block by block: compressing or decoding a block runs on an
+executor given by the caller, e.g; a process pool, and the file reads and
+writes run on the default executor of the loop, so that the loop never waits
+for the disk or the CPU. Like pipeline.PipelineEncoder, a job keeps at most
+in_flight blocks in memory.
+"""
+from __future__ import absolute_import
+import asyncio
+import os
+from collections import deque
+from concurrent.futures import Executor
+from functools import partial
+from typing import AsyncIterator, Callable
+from genomeencode import codec
+from genomeencode.blocks import BlockReader, decode_block
+from genomeencode.metrics import MetricsSink, get_default_sink, measure
+from genomeencode.pipeline import PipelineEncoder
+
+IN_FLIGHT = 4
+
+async def offload(executor: Executor, function: Callable, *args: object):
+    """Runs a blocking function on an executor without blocking the loop.
+
+    Parameters
+    ----------
+    executor : Executor
+        The executor, None for the default executor of the loop.
+    function : Callable
+        The function.
+    *args : object
+        Its arguments, they must be picklable for a process pool.
+
+    Returns
+    -------
+    object
+        The result of the function.
+
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(function, *args))
+
+async def compress_async(path: str, output: str=None, entropy: str='rans',
+                         block_size: int=PipelineEncoder.BLOCK_SIZE,
+                         executor: Executor=None, in_flight: int=IN_FLIGHT,
+                         metrics: MetricsSink=None) -> str:
+    """Compresses a sequence file to a blocked file, the blocks are
+    compressed on the executor while the next ones are read and the previous
+    ones written.
+
+    Parameters
+    ----------
+    path : str
+        The path of the sequence file.
+    output : str, optional
+        The path of the blocked file. The default is None, i.e; the path of
+        the sequence with a .gblk extension.
+    entropy : str, optional
+        The codec backend of the blocks. The default is 'rans'.
+    block_size : int, optional
+        The number of characters of a block. The default is 1 Mi.
+    executor : Executor, optional
+        The executor of the compression. The default is None, i.e; the
+        default executor of the loop.
+    in_flight : int, optional
+        The maximum number of blocks in memory. The default is 4.
+    metrics : MetricsSink, optional
+        The metrics sink. The default is None, i.e; the default sink.
+
+    Returns
+    -------
+    str
+        The path of the blocked file.
+
+    """
+    encoder = PipelineEncoder(path, output, block_size, entropy,
+                              in_flight=in_flight, metrics=metrics)
+    size = await offload(None, os.path.getsize, path)
+    offsets = [encoder.start(size)]
+    length = 0
+    pending = deque()
+    blocks = encoder.blocks()
+    with measure(encoder.metrics, 'compress_async', 'total', size) as total:
+        file = await offload(None, open, encoder.output, 'wb')
+        try:
+            await offload(None, file.seek, offsets[0])
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < in_flight:
+                    block = await offload(None, next, blocks, None)
+                    if block is None:
+                        exhausted = True
+                    else:
+                        pending.append((len(block), asyncio.ensure_future(
+                            offload(executor, codec.compress, block,
+                                    entropy))))
+                if not pending:
+                    break
+                characters, task = pending.popleft()
+                data = await task
+                await offload(None, file.write, data)
+                offsets.append(offsets[-1] + len(data))
+                length += characters
+            await offload(None, file.seek, 0)
+            await offload(None, file.write, encoder.header(offsets, length))
+        except BaseException:
+            for _, task in pending:
+                task.cancel()
+            await offload(None, file.close)
+            await offload(None, os.remove, encoder.output)
+            raise
+        finally:
+            blocks.close()
+        await offload(None, file.close)
+        total['bytes_out'] = offsets[-1]
+        total['blocks'] = len(offsets) - 1
+    return encoder.output
+
+async def iter_blocks(path: str, start: int=0, stop: int=None,
+                      executor: Executor=None,
+                      in_flight: int=IN_FLIGHT) -> AsyncIterator[str]:
+    """Reads a region of a blocked file block by block, the next blocks are
+    decoded on the executor while the current one is consumed. Decoded
+    blocks go through the shared cache of the readers.
+
+    Parameters
+    ----------
+    path : str
+        The path of the blocked file.
+    start : int, optional
+        The first position of the region. The default is 0.
+    stop : int, optional
+        The position after the region. The default is None, i.e; the end of
+        the sequence.
+    executor : Executor, optional
+        The executor of the decoding. The default is None, i.e; the default
+        executor of the loop.
+    in_flight : int, optional
+        The maximum number of blocks decoded ahead. The default is 4.
+
+    Yields
+    ------
+    AsyncIterator[str]
+        The part of the region in every block it overlaps.
+
+    """
+    reader = await offload(None, partial(BlockReader, readahead=False), path)
+
+    async def load(number: int) -> str:
+        block = reader.cache.get(reader.key(number))
+        if block is None:
+            data, section = await offload(None, reader.raw, number)
+            block = await offload(executor, decode_block, data, section,
+                                  reader.isa_sample)
+            reader.cache.put(reader.key(number), block)
+        return block
+
+    pending = deque()
+    try:
+        start, stop, _ = slice(start, stop).indices(len(reader))
+        if start >= stop:
+            return
+        numbers = iter(range(start // reader.block_size,
+                             (stop - 1) // reader.block_size + 1))
+        while True:
+            for number in numbers:
+                pending.append((number, asyncio.ensure_future(load(number))))
+                if len(pending) >= in_flight:
+                    break
+            if not pending:
+                break
+            number, task = pending.popleft()
+            block = await task
+            offset = number * reader.block_size
+            yield block[max(start - offset, 0):stop - offset]
+    finally:
+        for _, task in pending:
+            task.cancel()
+        await offload(None, reader.close)
+
+async def decompress_async(path: str, output: str=None,
+                           executor: Executor=None, in_flight: int=IN_FLIGHT,
+                           metrics: MetricsSink=None) -> str:
+    """Decompresses a blocked file to a sequence file, see iter_blocks.
+
+    Parameters
+    ----------
+    path : str
+        The path of the blocked file.
+    output : str, optional
+        The path of the sequence file. The default is None, i.e; the path of
+        the blocked file with a _decoded.txt suffix.
+    executor : Executor, optional
+        The executor of the decoding. The default is None, i.e; the default
+        executor of the loop.
+    in_flight : int, optional
+        The maximum number of blocks decoded ahead. The default is 4.
+    metrics : MetricsSink, optional
+        The metrics sink. The default is None, i.e; the default sink.
+
+    Returns
+    -------
+    str
+        The path of the sequence file.
+
+    """
+    if output is None:
+        output = os.path.splitext(path)[0] + '_decoded.txt'
+    metrics = metrics if metrics is not None else get_default_sink()
+    size = await offload(None, os.path.getsize, path)
+    with measure(metrics, 'decompress_async', 'total', size) as total:
+        file = await offload(None, open, output, 'w')
+        try:
+            async for piece in iter_blocks(path, executor=executor,
+                                           in_flight=in_flight):
+                await offload(None, file.write, piece)
+                total['bytes_out'] += len(piece)
+        except BaseException:
+            await offload(None, file.close)
+            await offload(None, os.remove, output)
+            raise
+        await offload(None, file.close)
+    return output
@@ -0,0 +1,895 @@
+# -*- coding: utf-8 -*-
+"""
+Random access to compressed sequences. A blocked file holds independently
+compressed blocks of a fixed number of characters behind an offset table, so a
+region read only decodes the blocks it overlaps. Decoded blocks are kept in a
+memory-bounded LRU cache shared by the readers of a process, and a sequential
+scan prefetches the next block on a background thread.
+A file can also keep a sampled inverse suffix array of every block: a short
+region of a block that is not cached is then extracted by walking LF backward
+from the nearest sample after it, over the decoded transform, in O(sample +
+length) steps instead of inverting the whole block. The samples also split
+the inverse transform of a block into independent LF walks, that run in
+lockstep and on several worker processes sharing the transform and the
+output in shared memory.
+"""
+from __future__ import absolute_import
+import os
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Hashable, Tuple
+import numpy as np
+from genomeencode import codec
+from genomeencode.fm_index import FMIndex, suffix_array, text_ranks
+from genomeencode.metrics import MetricsSink, get_default_sink, measure
+from genomeencode.shared import SharedArray, Spec
+
+MAGIC = b'GBLK'
+VERSION = 2
+HEADER = struct.Struct('<4sBQQQ')
+# version 2, the inverse suffix array sampling rate (0 for none)
+SAMPLING = struct.Struct('<Q')
+
+def lf_mapping(ranks: np.ndarray) -> np.ndarray:
+    """Computes the LF mapping of a transform, the inverse of its stable
+    sort (see BurrosWheeler.lf_mapping).
+
+    Parameters
+    ----------
+    ranks : np.ndarray
+        The ranks of the transform, the '$' sign is rank 0.
+
+    Returns
+    -------
+    np.ndarray
+        The row of the suffix one character longer than the suffix of
+        every row.
+
+    """
+    lf_map = np.empty(len(ranks), dtype=np.int64)
+    lf_map[np.argsort(ranks, kind='stable')] = np.arange(len(ranks))
+    return lf_map
+
+def invert_segments(ranks: np.ndarray, rows: np.ndarray, steps: int,
+                    lf_map: np.ndarray=None) -> np.ndarray:
+    """Walks LF backward from many rows of a transform at once, every walk
+    reads the segment of text before the suffix of its row. The walks are
+    independent, each step moves all of them with one numpy lookup.
+
+    Parameters
+    ----------
+    ranks : np.ndarray
+        The ranks of the transform, the '$' sign is rank 0.
+    rows : np.ndarray
+        The row every walk starts from.
+    steps : int
+        The number of characters read by every walk.
+    lf_map : np.ndarray, optional
+        The LF mapping of the transform. The default is None, i.e; computed
+        with lf_mapping.
+
+    Returns
+    -------
+    np.ndarray
+        The ranks of the segment of every walk, one row per walk in text
+        order.
+
+    """
+    if lf_map is None:
+        lf_map = lf_mapping(ranks)
+    rows = np.asarray(rows, dtype=np.int64)
+    segments = np.empty((len(rows), steps), dtype=ranks.dtype)
+    for step in range(steps - 1, -1, -1):
+        segments[:, step] = ranks[rows]
+        rows = lf_map[rows]
+    return segments
+
+def invert_shared(ranks: Spec, lf_map: Spec, rows: Spec, output: Spec,
+                  first: int, stop: int, steps: int) -> None:
+    """Runs the walks of a slice of rows on a worker process, see
+    invert_segments, the segments are written in place.
+
+    Parameters
+    ----------
+    ranks : Spec
+        The shared ranks of the transform.
+    lf_map : Spec
+        The shared LF mapping of the transform, computed once by the parent.
+    rows : Spec
+        The shared rows the walks start from.
+    output : Spec
+        The shared segments, one row per walk.
+    first : int
+        The first walk of the slice.
+    stop : int
+        The walk after the slice.
+    steps : int
+        The number of characters read by every walk.
+
+    Returns
+    -------
+    None
+
+    """
+    with SharedArray.attach(ranks) as shared_ranks, \
+            SharedArray.attach(lf_map) as shared_lf_map, \
+            SharedArray.attach(rows) as shared_rows, \
+            SharedArray.attach(output) as shared_output:
+        shared_output.array[first:stop] = invert_segments(
+            shared_ranks.array, shared_rows.array[first:stop], steps,
+            shared_lf_map.array)
+
+def assemble(alphabet: np.ndarray, segments: np.ndarray, length: int,
+             sample: int) -> str:
+    """Joins the segments read by the walks of invert_segments, started from
+    the sampled rows of a block.
+
+    Parameters
+    ----------
+    alphabet : np.ndarray
+        The code point of every rank.
+    segments : np.ndarray
+        The ranks read by every walk.
+    length : int
+        The number of characters of the block.
+    sample : int
+        The sampling rate, i.e; the number of characters of every walk.
+
+    Returns
+    -------
+    str
+        The block.
+
+    """
+    # the walk of the last segment starts before the previous one
+    last = length - (len(segments) - 1) * sample
+    codes = alphabet[np.concatenate((segments[:-1].reshape(-1),
+                                     segments[-1, -last:]))]
+    return codes.astype('<u4').tobytes().decode('utf-32-le')
+
+def decode_block(data: bytes, section: bytes=b'', isa_sample: int=0) -> str:
+    """Decodes a block read with BlockReader.raw, in any process. A sampled
+    block is inverted from its samples: the segment between two sampled
+    positions is read by an LF walk from the row of the second one (the '$'
+    row for the last segment).
+
+    Parameters
+    ----------
+    data : bytes
+        The compressed block.
+    section : bytes, optional
+        The inverse suffix array samples of the block. The default is b''.
+    isa_sample : int, optional
+        The sampling rate of the samples. The default is 0, i.e; none.
+
+    Returns
+    -------
+    str
+        The decoded block.
+
+    """
+    if not isa_sample:
+        return codec.decompress(data)
+    alphabet, ranks = BlockReader.ranks(data)
+    rows = np.concatenate((np.frombuffer(section, dtype='<u4')[1:], [0]))
+    return assemble(alphabet, invert_segments(ranks, rows, isa_sample),
+                    len(ranks) - 1, isa_sample)
+
+class BlockCache:
+    """A thread-safe LRU cache of decoded blocks, bounded by the total number
+    of characters it holds.
+
+    Attributes
+    ----------
+    capacity: int
+        The maximum number of cached characters.
+    size: int
+        The number of cached characters.
+    hits: int
+        The number of lookups that found a block.
+    misses: int
+        The number of lookups that found none.
+    evictions: int
+        The number of evicted blocks.
+    """
+
+    def __init__(self: object, capacity: int=64 << 20) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        capacity : int, optional
+            The maximum number of cached characters. The default is 64 Mi.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.capacity = capacity
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__blocks = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self: object) -> int:
+        """The number of cached blocks."""
+        return len(self.__blocks)
+
+    def __contains__(self: object, key: Hashable) -> bool:
+        """Whether a block is cached, without counting a lookup."""
+        with self.__lock:
+            return key in self.__blocks
+
+    def get(self: object, key: Hashable) -> str:
+        """Looks a block up and marks it as the most recently used.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the block, see BlockReader.key.
+
+        Returns
+        -------
+        str
+            The decoded block, None on a miss.
+
+        """
+        with self.__lock:
+            block = self.__blocks.get(key)
+            if block is None:
+                self.misses += 1
+                return None
+            self.__blocks.move_to_end(key)
+            self.hits += 1
+            return block
+
+    def put(self: object, key: Hashable, block: str) -> None:
+        """Caches a block, evicting the least recently used ones to make room.
+        Blocks larger than the capacity are not cached.
+
+        Parameters
+        ----------
+        key : Hashable
+            The key of the block.
+        block : str
+            The decoded block.
+
+        Returns
+        -------
+        None
+
+        """
+        if len(block) > self.capacity:
+            return
+        with self.__lock:
+            previous = self.__blocks.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.__blocks[key] = block
+            self.size += len(block)
+            while self.size > self.capacity:
+                _, evicted = self.__blocks.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def clear(self: object) -> None:
+        """Removes every block."""
+        with self.__lock:
+            self.__blocks.clear()
+            self.size = 0
+
+    def stats(self: object) -> Dict[str, float]:
+        """Sums up the cache.
+
+        Returns
+        -------
+        Dict[str, float]
+            The hits, misses, evictions and hit rate, the number of cached
+            blocks and characters.
+
+        """
+        with self.__lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'blocks': len(self.__blocks), 'size': self.size}
+
+_SHARED_CACHE = BlockCache()
+
+def get_shared_cache() -> BlockCache:
+    """Returns the process-wide block cache, used by every reader that was
+    not given an explicit cache.
+
+    Returns
+    -------
+    BlockCache
+        The shared cache.
+
+    """
+    return _SHARED_CACHE
+
+class BlockWriter:
+    """A writer of blocked files.
+
+    Attributes
+    ----------
+    path: str
+        The path of the blocked file.
+    block_size: int
+        The number of characters of a block.
+    entropy: str
+        The codec backend of the blocks, see codec.compress.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    isa_sample: int
+        The inverse suffix array of every block keeps the rows of the
+        positions that are multiples of isa_sample, 0 for none.
+    """
+    BLOCK_SIZE = 1 << 20
+    ISA_SAMPLE = 64
+
+    def __init__(self: object, path: str, block_size: int=BLOCK_SIZE,
+                 entropy: str='rans', metrics: MetricsSink=None,
+                 isa_sample: int=0) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        path : str
+            The path of the blocked file.
+        block_size : int, optional
+            The number of characters of a block. The default is 1 Mi.
+        entropy : str, optional
+            The codec backend of the blocks. The default is 'rans'.
+        metrics : MetricsSink, optional
+            The metrics sink. The default is None, i.e; the default sink.
+        isa_sample : int, optional
+            The inverse suffix array sampling rate, every sample takes 4
+            bytes, e.g; ISA_SAMPLE adds 1 bit per character. The default is
+            0, i.e; no samples.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        if block_size <= 0:
+            raise ValueError("The block size must be positive")
+        if entropy not in codec.BACKENDS:
+            raise ValueError("Unknown entropy coder %s" % entropy)
+        if isa_sample < 0:
+            raise ValueError("The sampling rate cannot be negative")
+        if isa_sample and not codec.BACKENDS[entropy][1]:
+            raise ValueError("%s does not code a Burros-Wheeler transform, "
+                             "its blocks cannot be sampled" % entropy)
+        if isa_sample and block_size >= 2 ** 32:
+            raise ValueError("Sampled blocks hold less than 4 Gi characters")
+        self.path = path
+        self.block_size = block_size
+        self.entropy = entropy
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.isa_sample = isa_sample
+
+    def sampled(self: object, block: str) -> Tuple[bytes, bytes]:
+        """Compresses a block and samples its inverse suffix array, the
+        transform comes from the same suffix array as the samples.
+
+        Parameters
+        ----------
+        block : str
+            The block, without '$' signs.
+
+        Returns
+        -------
+        Tuple[bytes, bytes]
+            The compressed block and the row of every sampled position, as
+            little endian 32 bits integers.
+
+        """
+        alphabet, symbols = text_ranks(block)
+        suff_arr = suffix_array(symbols)
+        bwt = alphabet[symbols[suff_arr - 1]].astype('<u4').tobytes()
+        inverse = np.empty(len(suff_arr), dtype='<u4')
+        inverse[suff_arr] = np.arange(len(suff_arr))
+        return (codec.compress_transform(bwt.decode('utf-32-le'),
+                                         self.entropy),
+                inverse[:len(block):self.isa_sample].tobytes())
+
+    def write(self: object, sequence: str) -> None:
+        """Compresses a sequence block by block and writes the blocked file.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence.
+
+        Returns
+        -------
+        None
+
+        """
+        name = type(self).__name__
+        with measure(self.metrics, name, 'total', len(sequence)) as total:
+            blocks = []
+            sections = []
+            with measure(self.metrics, name, 'compress', len(sequence),
+                         -(-len(sequence) // self.block_size)) as event:
+                for start in range(0, len(sequence), self.block_size):
+                    block = sequence[start:start + self.block_size]
+                    if self.isa_sample:
+                        block, section = self.sampled(block)
+                        sections.append(section)
+                    else:
+                        block = codec.compress(block, self.entropy)
+                        sections.append(b'')
+                    blocks.append(block)
+                event['bytes_out'] = sum(map(len, blocks + sections))
+            # the block offset table, then the section offset table
+            offsets = [HEADER.size + SAMPLING.size + 16 * (len(blocks) + 1)]
+            for block in blocks + sections:
+                offsets.append(offsets[-1] + len(block))
+            offsets.insert(len(blocks) + 1, offsets[len(blocks)])
+            with open(self.path, 'wb') as file:
+                file.write(HEADER.pack(MAGIC, VERSION, self.block_size,
+                                       len(sequence), len(blocks)))
+                file.write(SAMPLING.pack(self.isa_sample))
+                file.write(struct.pack('<%dQ' % len(offsets), *offsets))
+                for block in blocks + sections:
+                    file.write(block)
+            total['bytes_out'] = offsets[-1]
+
+class BlockReader:
+    """A random access reader of blocked files, decoded blocks go through a
+    BlockCache keyed by the file identity and the block number.
+
+    Attributes
+    ----------
+    path: str
+        The path of the blocked file.
+    block_size: int
+        The number of characters of a block.
+    length: int
+        The number of characters of the sequence.
+    count: int
+        The number of blocks.
+    offsets: Tuple[int, ...]
+        The file offset of every block, and of the end of the last one.
+    isa_sample: int
+        The inverse suffix array sampling rate of the blocks, 0 for none.
+    sections: Tuple[int, ...]
+        The file offset of the inverse suffix array samples of every block,
+        and of the end of the last ones.
+    identity: Tuple[int, ...]
+        The device, inode, size, modification time and offset table hash of
+        the file, a rewritten file does not hit the blocks of the previous
+        one.
+    cache: BlockCache
+        The cache of decoded blocks.
+    readahead: bool
+        Whether reading a block right after the previous one prefetches the
+        next block.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    workers: int
+        The number of processes that invert a sampled block, 1 to invert it
+        in the calling thread. No more processes than CPUs are started.
+    """
+    # a region of at most this many samples of a block whose transform is
+    # cached is extracted rather than decoded
+    EXTRACT_SAMPLES = 4
+
+    def __init__(self: object, path: str, cache: BlockCache=None,
+                 readahead: bool=True, metrics: MetricsSink=None,
+                 workers: int=1) -> None:
+        """Class constructor, reads the offset table.
+
+        Parameters
+        ----------
+        path : str
+            The path of the blocked file.
+        cache : BlockCache, optional
+            The cache of decoded blocks, and of the transforms of the sampled
+            blocks (see BlockReader.transform). The default is None, i.e; the
+            process-wide cache (see get_shared_cache).
+        readahead : bool, optional
+            Whether sequential reads prefetch the next block. The default is
+            True.
+        metrics : MetricsSink, optional
+            The metrics sink. The default is None, i.e; the default sink.
+        workers : int, optional
+            The number of processes that invert a sampled block, at most the
+            number of CPUs. The default is 1, i.e; no process.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.path = path
+        self.cache = cache if cache is not None else get_shared_cache()
+        self.readahead = readahead
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.workers = workers
+        self.__file = open(path, 'rb')
+        self.__lock = threading.Lock()
+        self.__pending = {}
+        self.__last = -2
+        self.__executor = None
+        self.__processes = None
+        stat = os.fstat(self.__file.fileno())
+        magic, version, self.block_size, self.length, self.count = \
+            HEADER.unpack(self.__file.read(HEADER.size))
+        if magic != MAGIC or version not in (1, VERSION):
+            self.__file.close()
+            raise ValueError("%s is not a blocked file" % path)
+        self.isa_sample = 0
+        if version > 1:
+            self.isa_sample, = SAMPLING.unpack(
+                self.__file.read(SAMPLING.size))
+        self.offsets = struct.unpack('<%dQ' % (self.count + 1),
+                                     self.__file.read(8 * (self.count + 1)))
+        self.sections = None
+        if version > 1:
+            self.sections = struct.unpack(
+                '<%dQ' % (self.count + 1),
+                self.__file.read(8 * (self.count + 1)))
+        self.identity = (stat.st_dev, stat.st_ino, stat.st_size,
+                         stat.st_mtime_ns, hash(self.offsets))
+
+    def __len__(self: object) -> int:
+        """The number of characters of the sequence."""
+        return self.length
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self: object, *args: object) -> None:
+        self.close()
+
+    def close(self: object) -> None:
+        """Stops the readahead thread and closes the file."""
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+        if self.__processes is not None:
+            self.__processes.shutdown(wait=True)
+            self.__processes = None
+        self.__file.close()
+
+    def __read(self: object, start: int, stop: int) -> bytes:
+        """Reads a range of the file."""
+        with self.__lock:
+            self.__file.seek(start)
+            return self.__file.read(stop - start)
+
+    def key(self: object, number: int) -> Tuple[Tuple[int, ...], int]:
+        """The cache key of a block."""
+        return (self.identity, number)
+
+    def decode(self: object, number: int) -> str:
+        """Reads and decodes a block, without the cache.
+
+        Parameters
+        ----------
+        number : int
+            The number of the block.
+
+        Returns
+        -------
+        str
+            The decoded block.
+
+        """
+        data = self.__read(self.offsets[number], self.offsets[number + 1])
+        with measure(self.metrics, type(self).__name__, 'decode',
+                     len(data)) as event:
+            section = self.__read(self.sections[number],
+                                  self.sections[number + 1]) \
+                if self.isa_sample else b''
+            # a block already extracted from is inverted from its cached
+            # transform, without decoding it again
+            transform = self.key(number) + ('transform',)
+            index = self.cache.get(transform) \
+                if self.isa_sample and transform in self.cache else None
+            if index is not None:
+                rows = np.concatenate((np.frombuffer(section,
+                                                     dtype='<u4')[1:], [0]))
+                segments = invert_segments(index.bwt, rows, self.isa_sample)
+                block = assemble(index.alphabet, segments,
+                                 len(index.bwt) - 1, self.isa_sample)
+            elif self.isa_sample and self.workers > 1:
+                block = self.invert(data, section)
+            else:
+                block = decode_block(data, section, self.isa_sample)
+            event['bytes_out'] = len(block)
+        return block
+
+    def raw(self: object, number: int) -> Tuple[bytes, bytes]:
+        """Reads a block without decoding it, see decode_block.
+
+        Parameters
+        ----------
+        number : int
+            The number of the block.
+
+        Returns
+        -------
+        Tuple[bytes, bytes]
+            The compressed block and its inverse suffix array samples, empty
+            when the file has none.
+
+        """
+        if not 0 <= number < self.count:
+            raise IndexError("Block %d out of range" % number)
+        data = self.__read(self.offsets[number], self.offsets[number + 1])
+        if not self.isa_sample:
+            return data, b''
+        return data, self.__read(self.sections[number],
+                                 self.sections[number + 1])
+
+    def invert(self: object, data: bytes, section: bytes) -> str:
+        """Inverts the transform of a sampled block on the worker processes,
+        see decode_block.
+
+        Parameters
+        ----------
+        data : bytes
+            The compressed block.
+        section : bytes
+            The inverse suffix array samples of the block.
+
+        Returns
+        -------
+        str
+            The decoded block.
+
+        """
+        rows = np.concatenate((np.frombuffer(section, dtype='<u4')[1:], [0]))
+        # more processes than CPUs only add the cost of the pool
+        workers = min(self.workers, os.cpu_count() or 1)
+        if workers < 2 or len(rows) < 2 * workers:
+            return decode_block(data, section, self.isa_sample)
+        alphabet, ranks = self.ranks(data)
+        with self.__lock:
+            if self.__processes is None:
+                self.__processes = ProcessPoolExecutor(workers)
+        # the workers only receive the segment names and their slice, the
+        # LF mapping is sorted once for all of them
+        bounds = np.linspace(0, len(rows), workers + 1).astype(int)
+        with SharedArray.copy(ranks) as shared_ranks, \
+                SharedArray.copy(lf_mapping(ranks)) as shared_lf_map, \
+                SharedArray.copy(rows.astype(np.int64)) as shared_rows, \
+                SharedArray((len(rows), self.isa_sample),
+                            ranks.dtype.str) as output:
+            count = len(bounds) - 1
+            list(self.__processes.map(
+                invert_shared, [shared_ranks.spec] * count,
+                [shared_lf_map.spec] * count, [shared_rows.spec] * count,
+                [output.spec] * count,
+                bounds[:-1].tolist(), bounds[1:].tolist(),
+                [self.isa_sample] * count))
+            segments = output.array.copy()
+        return assemble(alphabet, segments, len(ranks) - 1, self.isa_sample)
+
+    @staticmethod
+    def ranks(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+        """Decodes the transform of a sampled block, without inverting it.
+
+        Parameters
+        ----------
+        data : bytes
+            The compressed block.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The code point of every rank and the ranks of the transform, the
+            '$' sign is rank 0 like in fm_index.text_ranks.
+
+        """
+        codes = np.frombuffer(codec.decompress_transform(data)
+                              .encode('utf-32-le'), dtype='<u4')
+        alphabet, ranks = np.unique(np.where(codes == ord('$'), 0, codes),
+                                    return_inverse=True)
+        alphabet[0] = ord('$')
+        return alphabet, ranks.reshape(-1).astype(np.uint8)
+
+    def transform(self: object, number: int) -> FMIndex:
+        """Decodes the transform of a sampled block, without inverting it,
+        and builds its occurrence checkpoints. The result is cached with the
+        decoded blocks.
+
+        Parameters
+        ----------
+        number : int
+            The number of the block.
+
+        Returns
+        -------
+        FMIndex
+            The index of the block, without suffix array samples.
+
+        """
+        key = self.key(number) + ('transform',)
+        index = self.cache.get(key)
+        if index is not None:
+            return index
+        data = self.__read(self.offsets[number], self.offsets[number + 1])
+        with measure(self.metrics, type(self).__name__, 'transform',
+                     len(data)):
+            alphabet, ranks = self.ranks(data)
+            index = FMIndex.from_bwt(alphabet, ranks,
+                                     np.zeros(len(ranks), dtype=bool), [],
+                                     self.isa_sample)
+        self.cache.put(key, index)
+        return index
+
+    def extract(self: object, number: int, start: int, stop: int) -> str:
+        """Extracts a region of a sampled block, the segments between the
+        sampled positions around it are walked backward with LF in lockstep
+        from the sampled rows after them (the '$' row for the last segment).
+
+        Parameters
+        ----------
+        number : int
+            The number of the block.
+        start : int
+            The first position of the region, in the block.
+        stop : int
+            The position after the region, in the block.
+
+        Returns
+        -------
+        str
+            The characters of the region, clipped to the block.
+
+        """
+        if not self.isa_sample:
+            raise ValueError("%s has no inverse suffix array samples" %
+                             self.path)
+        if not 0 <= number < self.count:
+            raise IndexError("Block %d out of range" % number)
+        length = min(self.block_size, self.length - number * self.block_size)
+        start, stop, _ = slice(start, stop).indices(length)
+        if start >= stop:
+            return ''
+        first = start // self.isa_sample
+        last = -(-stop // self.isa_sample)
+        position = min(last * self.isa_sample, length)
+        with measure(self.metrics, type(self).__name__, 'extract',
+                     position - first * self.isa_sample) as event:
+            index = self.transform(number)
+            # the rows of the sampled positions after every segment, the
+            # '$' sign sorts first
+            offset = self.sections[number] + 4 * (first + 1)
+            sampled = min(last, -(-length // self.isa_sample) - 1) - first
+            rows = np.frombuffer(self.__read(offset, offset + 4 * sampled),
+                                 dtype='<u4').astype(np.int64)
+            if position == length:
+                rows = np.concatenate((rows, [0]))
+            segments = np.empty((len(rows), self.isa_sample),
+                                dtype=index.bwt.dtype)
+            for step in range(self.isa_sample - 1, -1, -1):
+                segments[:, step] = index.bwt[rows]
+                rows = index.lf(rows)
+            region = assemble(index.alphabet, segments,
+                              position - first * self.isa_sample,
+                              self.isa_sample)
+            event['bytes_out'] = stop - start
+        skip = start - first * self.isa_sample
+        return region[skip:skip + stop - start]
+
+    def fetch(self: object, number: int) -> str:
+        """Decodes a block into the cache, unless a thread already does.
+
+        Parameters
+        ----------
+        number : int
+            The number of the block.
+
+        Returns
+        -------
+        str
+            The decoded block.
+
+        """
+        with self.__lock:
+            future = self.__pending.get(number)
+            owner = future is None
+            if owner:
+                future = self.__pending[number] = Future()
+        if not owner:
+            return future.result()
+        try:
+            block = self.decode(number)
+            self.cache.put(self.key(number), block)
+            future.set_result(block)
+            return block
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        finally:
+            with self.__lock:
+                del self.__pending[number]
+
+    def prefetch(self: object, number: int) -> None:
+        """Decodes a block on the readahead thread, if it is not cached."""
+        if number >= self.count or self.key(number) in self.cache:
+            return
+        with self.__lock:
+            if number in self.__pending or self.__file.closed:
+                return
+            if self.__executor is None:
+                self.__executor = ThreadPoolExecutor(1)
+            self.__executor.submit(self.fetch, number)
+
+    def block(self: object, number: int) -> str:
+        """Reads a decoded block.
+
+        Parameters
+        ----------
+        number : int
+            The number of the block.
+
+        Returns
+        -------
+        str
+            The decoded block.
+
+        """
+        if not 0 <= number < self.count:
+            raise IndexError("Block %d out of range" % number)
+        block = self.cache.get(self.key(number))
+        if block is None:
+            block = self.fetch(number)
+        if self.readahead and number == self.__last + 1:
+            self.prefetch(number + 1)
+        self.__last = number
+        return block
+
+    def read(self: object, start: int=0, stop: int=None) -> str:
+        """Reads a region of the sequence.
+
+        Parameters
+        ----------
+        start : int, optional
+            The first position of the region. The default is 0.
+        stop : int, optional
+            The position after the region. The default is None, i.e; the end
+            of the sequence.
+
+        Returns
+        -------
+        str
+            The characters of the region.
+
+        """
+        start, stop, _ = slice(start, stop).indices(self.length)
+        if start >= stop:
+            return ''
+        first = start // self.block_size
+        last = (stop - 1) // self.block_size
+        pieces = []
+        for number in range(first, last + 1):
+            offset = number * self.block_size
+            size = min(self.block_size, self.length - offset)
+            low, high = max(start - offset, 0), min(stop - offset, size)
+            # decoding the transform costs about as much as inverting it, a
+            # short region is extracted only when the transform is cached
+            key = self.key(number)
+            if self.isa_sample and key not in self.cache and \
+                    high - low <= self.EXTRACT_SAMPLES * self.isa_sample and \
+                    key + ('transform',) in self.cache:
+                pieces.append(self.extract(number, low, high))
+            else:
+                pieces.append(self.block(number)[low:high])
+        return ''.join(pieces)
@@ -7,12 +7,16 @@ The yielding in some functions doesn't respect Space complexity, but it was done
 manner to facilitate the data flow into the View class (the GUI).
 """
 from __future__ import absolute_import
-from typing import List, Tuple, Generator
+from typing import Callable, List, Tuple, Generator
+from genomeencode.progress import report
 
 class BurrosWheeler:
     """A class to represent the Burrows-Wheeler algorithm, all methods are
     static for ease of reading and outside usability.
     """
+    # the long loops report their progress every REPORT_EVERY characters
+    REPORT_EVERY = 1 << 16
+
     @staticmethod
     def pprint(mat: List[str]) -> None:
         """Pretty print, this method prints a burrows wheeler matrix
@@ -188,6 +192,121 @@ class BurrosWheeler:
 
         return sorted(suff_arr)
 
+    @staticmethod
+    def int_suffix_array(sequence: str,
+                         progress: Callable[[float], None]=None) -> List[int]:
+        """Builds the suffix array of a sequence as a list of suffix indexes,
+        the '$' sign is appended like in suffix_array. Prefix doubling is used
+        so that no suffix is ever copied.
+        - Complexity of the algorithm O(nlog^2(n))
+        - Every round sorts the suffixes by their first 2k characters
+
+        Parameters
+        ----------
+        sequence : str
+            The given sequence of characters.
+        progress : Callable[[float], None], optional
+            The progress callback, called after every round with the rounds
+            done out of the most there can be. The default is None.
+
+        Returns
+        -------
+        List[int]
+            The starting index of every suffix, in lexicographical order.
+
+        """
+
+        sequence += '$'
+        length = len(sequence)
+        rank = [ord(char) for char in sequence]
+        suff_arr = list(range(0, length, 1))
+        k = 1
+        while True:
+            base = max(rank) + 2
+            # a suffix shorter than k characters sorts before its extensions
+            keys = [rank[i] * base + (rank[i + k] + 1 if i + k < length else 0)
+                    for i in range(0, length, 1)]
+            suff_arr.sort(key=keys.__getitem__)
+
+            new_rank = [0] * length
+            for j in range(1, length, 1):
+                new_rank[suff_arr[j]] = new_rank[suff_arr[j - 1]] + (
+                    keys[suff_arr[j]] != keys[suff_arr[j - 1]])
+            rank = new_rank
+
+            if rank[suff_arr[-1]] == length - 1: # all suffixes are distinct
+                report(progress, 1.0)
+                return suff_arr
+            # the suffixes are distinct once k reaches the length
+            report(progress, k.bit_length() / length.bit_length())
+            k *= 2
+
+    @staticmethod
+    def bwt_from_suffix_array(sequence: str, suff_arr: List[int],
+                              progress: Callable[[float], None]=None) -> str:
+        """Generates a Burrows-Wheeler Transform from the integer suffix array
+        of a sequence, the character preceding every suffix is taken.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence to be transformed, without the '$' sign.
+        suff_arr : List[int]
+            The integer suffix array of the sequence.
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+
+        Returns
+        -------
+        str
+            The Burrows-Wheeler Transform.
+
+        """
+
+        sequence += '$'
+        every = BurrosWheeler.REPORT_EVERY
+        pieces = []
+        for start in range(0, len(suff_arr), every):
+            # index -1 is the '$' sign, i.e; the character preceding suffix 0
+            pieces.append(''.join([sequence[i - 1]
+                                   for i in suff_arr[start:start + every]]))
+            report(progress, min(start + every, len(suff_arr)) /
+                   len(suff_arr))
+        return ''.join(pieces)
+
+    @staticmethod
+    def lf_mapping(bwt: str) -> List[int]:
+        """Computes the Last-to-First mapping of a Burrows-Wheeler Transform,
+        the row of the Burrows-Wheeler Matrix that starts with the character
+        ending a given row (with the same occurrence rank).
+
+        Parameters
+        ----------
+        bwt : str
+            The Burrows-Wheeler Transform.
+
+        Returns
+        -------
+        List[int]
+            The LF mapping, a row index for every row.
+
+        """
+
+        counts = {}
+        occurrences = []
+        for char in bwt:
+            occ = counts.get(char, 0)
+            occurrences.append(occ)
+            counts[char] = occ + 1
+
+        first = {} # first row of every character in the first column
+        total = 0
+        for char in sorted(counts):
+            first[char] = total
+            total += counts[char]
+
+        return [first[char] + occ for char, occ in zip(bwt, occurrences)]
+
     @staticmethod
     def bwt_advanced(sequence: str) -> str:
         """Generates a Burrows-Wheeler Transfrom from a suffix array, advanced
@@ -205,29 +324,39 @@ class BurrosWheeler:
 
         """
 
-        bwt = []
-        for suff in BurrosWheeler.suffix_array(sequence):
-            i = suff[1] # The suffix's index is the 2nd element in the tuple
-            if i == 0:
-                bwt.append('$')
-            else:
-                bwt.append(sequence[i - 1])
+        suff_arr = BurrosWheeler.int_suffix_array(sequence)
+        return BurrosWheeler.bwt_from_suffix_array(sequence, suff_arr)
 
-        return ''.join(bwt)
-    
     @staticmethod
-    def inverse_bwt(bwt: str) -> str:
-        """Inverse Burrows-Wheeler Transform (reconstruct original string)."""
+    def inverse_bwt(bwt: str,
+                    progress: Callable[[float], None]=None) -> str:
+        """Inverse Burrows-Wheeler Transform (reconstruct original string),
+        the sequence is read backwards by following the LF mapping from the
+        row that starts with the '$' sign, in O(n) time.
 
-        n = len(bwt)
-        table = [""] * n
+        Parameters
+        ----------
+        bwt : str
+            The Burrows-Wheeler Transform.
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+
+        Returns
+        -------
+        str
+            The original sequence, without the '$' sign.
 
-        for _ in range(n):
-            # Prepend bwt as first column
-            table = sorted([bwt[i] + table[i] for i in range(n)])
+        """
 
-        # Find the row that ends with '$'
-        for row in table:
-            if row.endswith("$"):
-                return row[:-1]   # remove $
+        lf_map = BurrosWheeler.lf_mapping(bwt)
+        row = lf_map[bwt.index('$')] # the row of the rotation '$' + sequence
+        reverse = []
+        every = BurrosWheeler.REPORT_EVERY
+        for start in range(0, len(bwt) - 1, every):
+            for _ in range(start, min(start + every, len(bwt) - 1), 1):
+                reverse.append(bwt[row])
+                row = lf_map[row]
+            report(progress, len(reverse) / (len(bwt) - 1))
+
+        return ''.join(reversed(reverse))
 
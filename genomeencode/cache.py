@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+An on-disk cache of compression results, for pipelines that compress the same
+inputs with the same parameters again. An artifact is stored under a hash of
+the input contents and of the codec parameters, inserts are atomic and the
+least recently used artifacts are evicted when the directory outgrows its
+size bound, so several processes can share a cache directory.
+"""
+from __future__ import absolute_import
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from typing import Dict
+
+class ResultCache:
+    """A size-bounded directory of finished artifacts, with LRU eviction. A
+    hit refreshes the modification time of the artifact, the eviction removes
+    the oldest ones first.
+
+    Attributes
+    ----------
+    root: str
+        The directory of the cache.
+    max_bytes: int
+        The size bound of the directory.
+    hits: int
+        The number of lookups that found an artifact.
+    misses: int
+        The number of lookups that found none.
+    inserts: int
+        The number of stored artifacts.
+    evictions: int
+        The number of evicted artifacts.
+    """
+    # Bumped whenever an encoder changes its output, old keys become misses
+    VERSION = 1
+    BLOCK = 1 << 20
+
+    def __init__(self: object, root: str, max_bytes: int=1 << 30) -> None:
+        """Class constructor, opens or creates a cache directory.
+
+        Parameters
+        ----------
+        root : str
+            The directory of the cache.
+        max_bytes : int, optional
+            The size bound of the directory. The default is 1 GiB.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+        self.evictions = 0
+        self.__lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def key(self: object, path: str, *parameters: object) -> str:
+        """Computes the key of a result.
+
+        Parameters
+        ----------
+        path : str
+            The path of the input file, its contents are hashed.
+        *parameters : object
+            The JSON-serializable codec parameters, e.g; the controller and
+            the entropy coding backend.
+
+        Returns
+        -------
+        str
+            The hexadecimal SHA-256 key.
+
+        """
+        digest = hashlib.sha256(json.dumps(
+            [self.VERSION, list(parameters)]).encode('utf-8'))
+        with open(path, 'rb') as file:
+            for block in iter(lambda: file.read(self.BLOCK), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def artifact(self: object, key: str) -> str:
+        """The path of an artifact."""
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self: object, key: str, destination: str) -> bool:
+        """Copies a cached artifact.
+
+        Parameters
+        ----------
+        key : str
+            The key of the result.
+        destination : str
+            The path to copy the artifact to.
+
+        Returns
+        -------
+        bool
+            True on a hit, False when nothing was copied.
+
+        """
+        path = self.artifact(key)
+        try:
+            shutil.copyfile(path, destination)
+            os.utime(path)
+        except FileNotFoundError: # missing or evicted meanwhile
+            with self.__lock:
+                self.misses += 1
+            return False
+        with self.__lock:
+            self.hits += 1
+        return True
+
+    def put(self: object, key: str, source: str) -> None:
+        """Stores an artifact, then evicts the least recently used ones if the
+        cache is over its size bound.
+
+        Parameters
+        ----------
+        key : str
+            The key of the result.
+        source : str
+            The path of the artifact.
+
+        Returns
+        -------
+        None
+
+        """
+        if os.path.getsize(source) > self.max_bytes:
+            return
+        path = self.artifact(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path),
+                                             suffix='.tmp')
+        os.close(handle)
+        try:
+            shutil.copyfile(source, temporary)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+        with self.__lock:
+            self.inserts += 1
+        self.evict()
+
+    def entries(self: object) -> list:
+        """Lists the artifacts, oldest first.
+
+        Returns
+        -------
+        list
+            The (modification time, size, path) of every artifact.
+
+        """
+        entries = []
+        for directory in os.scandir(self.root):
+            if not directory.is_dir():
+                continue
+            for entry in os.scandir(directory.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def evict(self: object) -> None:
+        """Removes the least recently used artifacts until the cache fits its
+        size bound."""
+        entries = self.entries()
+        size = sum(entry[1] for entry in entries)
+        for _, length, path in entries:
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            size -= length
+            with self.__lock:
+                self.evictions += 1
+
+    def clear(self: object) -> None:
+        """Removes every artifact."""
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self: object) -> Dict[str, int]:
+        """Sums up the cache.
+
+        Returns
+        -------
+        Dict[str, int]
+            The hits, misses, inserts and evictions of this instance, and the
+            number of entries and bytes in the directory.
+
+        """
+        entries = self.entries()
+        with self.__lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'inserts': self.inserts, 'evictions': self.evictions,
+                    'entries': len(entries),
+                    'bytes': sum(entry[1] for entry in entries)}
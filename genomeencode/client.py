@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+A thin client of the compression service (see service.Service). A client
+keeps its connection alive between requests, so that a tool that compresses
+many small sequences pays neither the interpreter start nor a new connection
+for each of them.
+"""
+from __future__ import absolute_import
+import socket
+from http.client import HTTPConnection
+from typing import Tuple, Union
+from urllib.parse import urlencode
+
+class UnixHTTPConnection(HTTPConnection):
+    """An HTTP connection over a Unix socket."""
+
+    def __init__(self: object, path: str, timeout: float=None) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        path : str
+            The path of the Unix socket.
+        timeout : float, optional
+            The timeout of the socket operations. The default is None.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self: object) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+class Client:
+    """A client of the compression service, the errors of the service are
+    raised as ValueError (invalid input), FileNotFoundError (missing file) or
+    RuntimeError.
+
+    Attributes
+    ----------
+    address: Union[str, Tuple[str, int]]
+        The address of the service, a Unix socket path or a host and port.
+    connection: HTTPConnection
+        The connection, kept alive between requests.
+    """
+    ERRORS = {400: ValueError, 404: FileNotFoundError}
+
+    def __init__(self: object, address: Union[str, Tuple[str, int]],
+                 timeout: float=None) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        address : Union[str, Tuple[str, int]]
+            The address of the service, a Unix socket path or a host and
+            port.
+        timeout : float, optional
+            The timeout of the socket operations. The default is None.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.address = address
+        if isinstance(address, str):
+            self.connection = UnixHTTPConnection(address, timeout)
+        else:
+            self.connection = HTTPConnection(*address, timeout=timeout)
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self: object, *args: object) -> None:
+        self.close()
+
+    def request(self: object, method: str, target: str,
+                body: bytes=b'') -> bytes:
+        """Sends a request and waits for the response.
+
+        Parameters
+        ----------
+        method : str
+            The HTTP method.
+        target : str
+            The path and query of the request.
+        body : bytes, optional
+            The request body. The default is b''.
+
+        Returns
+        -------
+        bytes
+            The response body.
+
+        """
+        self.connection.request(method, target, body)
+        response = self.connection.getresponse()
+        data = response.read()
+        if response.status != 200:
+            raise self.ERRORS.get(response.status, RuntimeError)(
+                data.decode('utf-8', errors='replace'))
+        return data
+
+    def compress(self: object, sequence: str, entropy: str='rans') -> bytes:
+        """Compresses a sequence, see codec.compress.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence.
+        entropy : str, optional
+            The codec backend. The default is 'rans'.
+
+        Returns
+        -------
+        bytes
+            The compressed data.
+
+        """
+        return self.request('POST', '/compress?' + urlencode(
+            {'entropy': entropy}), sequence.encode('utf-8'))
+
+    def decompress(self: object, data: bytes) -> str:
+        """Decompresses data, see codec.decompress.
+
+        Parameters
+        ----------
+        data : bytes
+            The compressed data.
+
+        Returns
+        -------
+        str
+            The sequence.
+
+        """
+        return self.request('POST', '/decompress', data).decode('utf-8')
+
+    def extract(self: object, path: str, start: int=0,
+                stop: int=None) -> str:
+        """Reads a region of a blocked file on the host of the service, see
+        blocks.BlockReader.read.
+
+        Parameters
+        ----------
+        path : str
+            The path of the blocked file.
+        start : int, optional
+            The first position of the region. The default is 0.
+        stop : int, optional
+            The position after the region. The default is None, i.e; the end
+            of the sequence.
+
+        Returns
+        -------
+        str
+            The region.
+
+        """
+        query = {'path': path, 'start': start}
+        if stop is not None:
+            query['stop'] = stop
+        return self.request('GET', '/extract?' + urlencode(query)).decode(
+            'utf-8')
+
+    def close(self: object) -> None:
+        """Closes the connection."""
+        self.connection.close()
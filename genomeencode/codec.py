@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory compression of sequences with the same algorithms as the encoder
+and decoder controllers, without going through files: the Burros-Wheeler
+transform followed by a binary entropy coding backend (or the context model,
+that codes the sequence itself). Every backend writes a self-describing
+container, decompress() recognizes it by its magic bytes.
+"""
+from __future__ import absolute_import
+from genomeencode.burros_wheeler import BurrosWheeler
+from genomeencode.context_model import ContextCoder
+from genomeencode.huffman import MultiHuffman
+from genomeencode.rans import RansCoder
+
+# The binary entropy coding backends by name: (coder, runs after the BWT)
+BACKENDS = {
+    'rans': (RansCoder, True),
+    'multihuffman': (MultiHuffman, True),
+    'context': (ContextCoder, False),
+}
+
+def compress(sequence: str, entropy: str='rans') -> bytes:
+    """Compresses a sequence in memory.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence to be compressed.
+    entropy : str, optional
+        The entropy coding backend; 'rans', 'multihuffman' or 'context'. The
+        default is 'rans'.
+
+    Returns
+    -------
+    bytes
+        The compressed sequence.
+
+    """
+    if entropy not in BACKENDS:
+        raise ValueError("Unknown entropy coder %s, expected one of %s" % (
+            entropy, ', '.join(BACKENDS)))
+    coder, transformed = BACKENDS[entropy]
+    if transformed:
+        sequence = BurrosWheeler.bwt_advanced(sequence)
+    return coder.encode(sequence)
+
+def compress_transform(bwt: str, entropy: str='rans') -> bytes:
+    """Compresses a Burros-Wheeler transform that was built elsewhere, e.g;
+    along with its suffix array (see blocks.BlockWriter), decompress() inverts
+    it like the transform built by compress().
+
+    Parameters
+    ----------
+    bwt : str
+        The Burros-Wheeler transform, with its '$' sign.
+    entropy : str, optional
+        The entropy coding backend, 'rans' or 'multihuffman'. The default is
+        'rans'.
+
+    Returns
+    -------
+    bytes
+        The compressed transform.
+
+    """
+    if not BACKENDS.get(entropy, (None, False))[1]:
+        raise ValueError("%s does not code a Burros-Wheeler transform" %
+                         entropy)
+    return BACKENDS[entropy][0].encode(bwt)
+
+def backend(data: bytes) -> str:
+    """Finds the entropy coding backend of a compressed sequence.
+
+    Parameters
+    ----------
+    data : bytes
+        The compressed sequence.
+
+    Returns
+    -------
+    str
+        The name of the backend.
+
+    """
+    for name, (coder, _) in BACKENDS.items():
+        if data[:len(coder.MAGIC)] == coder.MAGIC:
+            return name
+    raise ValueError("Unknown compressed format")
+
+def decompress(data: bytes) -> str:
+    """Decompresses a sequence compressed with compress().
+
+    Parameters
+    ----------
+    data : bytes
+        The compressed sequence.
+
+    Returns
+    -------
+    str
+        The original sequence.
+
+    """
+    coder, transformed = BACKENDS[backend(data)]
+    sequence = coder.decode(data)
+    if transformed:
+        sequence = BurrosWheeler.inverse_bwt(sequence)
+    return sequence
+
+def decompress_transform(data: bytes) -> str:
+    """Decodes the Burros-Wheeler transform of a compressed sequence without
+    inverting it.
+
+    Parameters
+    ----------
+    data : bytes
+        The compressed sequence, from a backend that codes the transform.
+
+    Returns
+    -------
+    str
+        The Burros-Wheeler transform.
+
+    """
+    name = backend(data)
+    coder, transformed = BACKENDS[name]
+    if not transformed:
+        raise ValueError("%s does not code a Burros-Wheeler transform" % name)
+    return coder.decode(data)
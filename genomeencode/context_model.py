@@ -0,0 +1,578 @@
+# -*- coding: utf-8 -*-
+"""
+Order-k context modelling codec for nucleotide sequences. The probability of
+every base is predicted from the k bases before it by an adaptive model (hashed
+contexts for large k) and coded with interleaved rANS. Each block of the
+sequence uses the order k that codes a sample of it in the fewest bits, and
+speed presets trade the candidate orders and the model size against throughput.
+
+The model is meant for the original sequence, the Burrows-Wheeler transform
+breaks the order of the bases it relies on.
+"""
+from __future__ import absolute_import
+import struct
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+from genomeencode.rans import RansCoder
+
+# The speed presets: candidate orders, log2 of the number of hashed contexts,
+# number of interleaved coder states, block length and length of the sample
+# the order of a block is chosen on (in bases, None for the whole block). A
+# model of a hashed order holds 2 ** table_bits rows of 16 bits counts, one
+# per symbol, and one model is alive at a time: about 160 MB for the 5
+# symbols of DNA with N at 24 bits ('best'), 40 MB at 22 bits ('default')
+PRESETS = {
+    'fast': {'orders': (3, 8), 'table_bits': 16, 'lanes': 2048,
+             'block_size': 1 << 22, 'sample': 1 << 18},
+    'default': {'orders': (2, 4, 8, 11, 12), 'table_bits': 22, 'lanes': 512,
+                'block_size': 1 << 22, 'sample': 1 << 20},
+    'best': {'orders': (2, 4, 8, 11, 12, 14, 16), 'table_bits': 24,
+             'lanes': 256, 'block_size': 1 << 24, 'sample': 1 << 22},
+}
+
+class ContextModel:
+    """An adaptive order-k model, it keeps the symbol counts of every context.
+    Contexts are the last k symbols packed in an integer, they index the table
+    directly when it is small enough and are hashed otherwise.
+
+    Attributes
+    ----------
+    order: int
+        The number of previous symbols of a context, k.
+    size: int
+        The size of the alphabet.
+    table: np.ndarray
+        The symbol counts of every (hashed) context.
+    """
+    SCALE_BITS = RansCoder.SCALE_BITS
+    INCREMENT = 24
+    LIMIT = 1 << 13
+    MAX_ORDER = 16
+
+    def __init__(self: object, order: int, size: int,
+                 table_bits: int) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        order : int
+            The number of previous symbols of a context, k.
+        size : int
+            The size of the alphabet.
+        table_bits : int
+            The log2 of the maximum number of contexts.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.order = order
+        self.size = size
+        self.__bits = max(1, (size - 1).bit_length())
+        width = order * self.__bits
+        if width > 64:
+            raise ValueError("Order %d is too large for %d symbols" % (
+                order, size))
+        self.__mask = np.uint64((1 << width) - 1)
+        self.__hashed = width > table_bits
+        self.__shift = np.uint64(64 - table_bits)
+        self.table = np.ones((1 << min(width, table_bits), size),
+                             dtype=np.uint16)
+
+    def rows(self: object, contexts: np.ndarray) -> np.ndarray:
+        """Finds the table rows of some contexts.
+
+        Parameters
+        ----------
+        contexts : np.ndarray
+            The packed contexts.
+
+        Returns
+        -------
+        np.ndarray
+            The table rows.
+
+        """
+        if self.__hashed:
+            # Fibonacci hashing, the multiplication wraps around 2^64
+            contexts = (contexts * np.uint64(0x9E3779B97F4A7C15)) >> \
+                self.__shift
+        return contexts.astype(np.int64)
+
+    def frequencies(self: object,
+                    rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Quantizes the counts of some rows to frequencies that sum up to
+        2^SCALE_BITS, every symbol keeps a frequency of at least 1.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            The table rows.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The frequencies and the cumulative frequencies, one line per row.
+
+        """
+        total = 1 << self.SCALE_BITS
+        counts = self.table[rows].astype(np.int64)
+        freqs = 1 + counts * (total - self.size) // counts.sum(axis=1,
+                                                               keepdims=True)
+        # the rounding error goes to the most probable symbol
+        freqs[np.arange(len(rows)), counts.argmax(axis=1)] += \
+            total - freqs.sum(axis=1)
+        return freqs, np.cumsum(freqs, axis=1) - freqs
+
+    def update(self: object, rows: np.ndarray, symbols: np.ndarray) -> None:
+        """Counts the symbols that were seen in some rows, the counts of a row
+        are halved when they grow too large so that the model keeps adapting.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            The table rows.
+        symbols : np.ndarray
+            The symbols seen in every row.
+
+        Returns
+        -------
+        None
+
+        """
+        # every lane counts, the rows are below LIMIT before the update so
+        # that the 2048 lanes of the presets cannot overflow a count
+        np.add.at(self.table, (rows, symbols), np.uint16(self.INCREMENT))
+        full = rows[self.table[rows].sum(axis=1, dtype=np.int64) > self.LIMIT]
+        while len(full):
+            self.table[full] = (self.table[full] + 1) >> 1
+            totals = self.table[full].sum(axis=1, dtype=np.int64)
+            # a row of ones cannot be halved any further
+            full = full[(totals > self.LIMIT) & (totals > self.size)]
+
+    def advance(self: object, contexts: np.ndarray,
+                symbols: np.ndarray) -> np.ndarray:
+        """Shifts new symbols into some contexts.
+
+        Parameters
+        ----------
+        contexts : np.ndarray
+            The packed contexts.
+        symbols : np.ndarray
+            The next symbol of every context.
+
+        Returns
+        -------
+        np.ndarray
+            The new contexts.
+
+        """
+        return ((contexts << np.uint64(self.__bits)) |
+                symbols.astype(np.uint64)) & self.__mask
+
+class ContextCoder:
+    """A class to represent the order-k context modelling codec, all methods
+    are static like in RansCoder.
+
+    A block is split into as many contiguous runs as there are lanes, the
+    lanes are modelled and coded side by side with one shared model so that
+    every step handles all the lanes with vectorized NumPy operations.
+    """
+    MAGIC = b'CTXM'
+    VERSION = 1
+    HEADER = struct.Struct('<4sBBHQ')
+    BLOCK = struct.Struct('<BHQQ')
+    MIN_RUN = 64
+
+    @staticmethod
+    def layout(length: int, lanes: int) -> Tuple[int, int, np.ndarray]:
+        """Splits a block into contiguous runs, one per lane.
+
+        Parameters
+        ----------
+        length : int
+            The length of the block.
+        lanes : int
+            The maximum number of lanes.
+
+        Returns
+        -------
+        Tuple[int, int, np.ndarray]
+            The number of lanes, the length of a run (the number of steps)
+            and the number of lanes still running at every step.
+
+        """
+        lanes = max(1, min(lanes, length // ContextCoder.MIN_RUN))
+        steps = -(-length // lanes)
+        runs = np.clip(length - np.arange(lanes) * steps, 0, steps)
+        active = (runs[None, :] > np.arange(steps)[:, None]).sum(axis=1)
+        return lanes, steps, active
+
+    @staticmethod
+    def model(symbols: np.ndarray, order: int, size: int, table_bits: int,
+              lanes: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Runs the model over a block, as the decoder will.
+
+        Parameters
+        ----------
+        symbols : np.ndarray
+            The symbol indexes of the block.
+        order : int
+            The order of the model.
+        size : int
+            The size of the alphabet.
+        table_bits : int
+            The log2 of the maximum number of contexts.
+        lanes : int
+            The maximum number of lanes.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The frequency and the cumulative frequency of every symbol.
+
+        """
+        lanes, steps, active = ContextCoder.layout(len(symbols), lanes)
+        model = ContextModel(order, size, table_bits)
+        contexts = np.zeros(lanes, dtype=np.uint64)
+        starts = np.arange(lanes) * steps
+        freqs = np.empty(len(symbols), dtype=np.int64)
+        cums = np.empty(len(symbols), dtype=np.int64)
+        for step in range(steps):
+            count = active[step]
+            positions = starts[:count] + step
+            group = symbols[positions]
+            rows = model.rows(contexts[:count])
+            freq, cum = model.frequencies(rows)
+            lines = np.arange(count)
+            freqs[positions] = freq[lines, group]
+            cums[positions] = cum[lines, group]
+            model.update(rows, group)
+            contexts[:count] = model.advance(contexts[:count], group)
+        return freqs, cums
+
+    @staticmethod
+    def cost(symbols: np.ndarray, order: int, size: int, table_bits: int,
+             lanes: int) -> float:
+        """Estimates the number of bits needed to code some symbols.
+
+        Parameters
+        ----------
+        symbols : np.ndarray
+            The symbol indexes.
+        order : int
+            The order of the model.
+        size : int
+            The size of the alphabet.
+        table_bits : int
+            The log2 of the maximum number of contexts.
+        lanes : int
+            The maximum number of lanes.
+
+        Returns
+        -------
+        float
+            The number of bits.
+
+        """
+        freqs, _ = ContextCoder.model(symbols, order, size, table_bits, lanes)
+        return float(np.sum(ContextModel.SCALE_BITS - np.log2(freqs)))
+
+    @staticmethod
+    def choose_order(symbols: np.ndarray, orders: Tuple[int], size: int,
+                     table_bits: int, lanes: int, sample: int=None) -> int:
+        """Chooses the order that codes the beginning of a block in the fewest
+        bits, high orders need a long enough sample to learn their contexts.
+
+        Parameters
+        ----------
+        symbols : np.ndarray
+            The symbol indexes of the block.
+        orders : Tuple[int]
+            The candidate orders.
+        size : int
+            The size of the alphabet.
+        table_bits : int
+            The log2 of the maximum number of contexts.
+        lanes : int
+            The maximum number of lanes.
+        sample : int, optional
+            The length of the beginning of the block. The default is None,
+            i.e; the whole block.
+
+        Returns
+        -------
+        int
+            The best order.
+
+        """
+        bits = max(1, (size - 1).bit_length())
+        orders = [k for k in orders if k * bits <= 64] or [64 // bits]
+        if len(orders) == 1:
+            return orders[0]
+        symbols = symbols[:sample]
+        return min(orders, key=lambda k: ContextCoder.cost(
+            symbols, k, size, table_bits, lanes))
+
+    @staticmethod
+    def encode_block(symbols: np.ndarray, order: int, size: int,
+                     table_bits: int, lanes: int) -> bytes:
+        """Codes a block with a given order.
+
+        Parameters
+        ----------
+        symbols : np.ndarray
+            The symbol indexes of the block.
+        order : int
+            The order of the model.
+        size : int
+            The size of the alphabet.
+        table_bits : int
+            The log2 of the maximum number of contexts.
+        lanes : int
+            The maximum number of lanes.
+
+        Returns
+        -------
+        bytes
+            The coded block, with its own header.
+
+        """
+        freqs, cums = ContextCoder.model(symbols, order, size, table_bits,
+                                         lanes)
+        lanes, steps, active = ContextCoder.layout(len(symbols), lanes)
+        starts = np.arange(lanes) * steps
+        scale_bits = np.uint64(ContextModel.SCALE_BITS)
+        states = np.full(lanes, RansCoder.LOWER_BOUND, dtype=np.uint64)
+        words = []
+        for step in range(steps - 1, -1, -1):
+            count = active[step]
+            positions = starts[:count] + step
+            x = states[:count]
+            freq = freqs[positions].astype(np.uint64)
+            cum = cums[positions].astype(np.uint64)
+            emit = x >= (freq << np.uint64(20)) # (L >> scale_bits) << 16
+            words.append((x[emit] & np.uint64(0xffff)).astype('<u2'))
+            x = np.where(emit, x >> np.uint64(16), x)
+            states[:count] = ((x // freq) << scale_bits) + (x % freq) + cum
+
+        stream = np.concatenate(words[::-1]) if words else \
+            np.zeros(0, dtype='<u2')
+        return b''.join([ContextCoder.BLOCK.pack(order, lanes, len(symbols),
+                                                 len(stream)),
+                         states.astype('<u4').tobytes(),
+                         stream.tobytes()])
+
+    @staticmethod
+    def decode_block(data: bytes, offset: int, size: int,
+                     table_bits: int) -> Tuple[np.ndarray, int]:
+        """Decodes a block coded with ContextCoder.encode_block.
+
+        Parameters
+        ----------
+        data : bytes
+            The coded sequence.
+        offset : int
+            The offset of the block in the coded sequence.
+        size : int
+            The size of the alphabet.
+        table_bits : int
+            The log2 of the maximum number of contexts.
+
+        Returns
+        -------
+        Tuple[np.ndarray, int]
+            The symbol indexes of the block and the offset of the next block.
+
+        """
+        order, lanes, length, words = ContextCoder.BLOCK.unpack_from(data,
+                                                                     offset)
+        offset += ContextCoder.BLOCK.size
+        states = np.frombuffer(data, '<u4', lanes, offset).astype(np.uint64)
+        offset += 4 * lanes
+        stream = np.frombuffer(data, '<u2', words, offset).astype(np.uint64)
+        offset += 2 * words
+
+        lanes, steps, active = ContextCoder.layout(length, lanes)
+        starts = np.arange(lanes) * steps
+        model = ContextModel(order, size, table_bits)
+        contexts = np.zeros(lanes, dtype=np.uint64)
+        mask = np.uint64((1 << ContextModel.SCALE_BITS) - 1)
+        shift = np.uint64(ContextModel.SCALE_BITS)
+        lower = np.uint64(RansCoder.LOWER_BOUND)
+        symbols = np.empty(length, dtype=np.int64)
+        position = 0
+        for step in range(steps):
+            count = active[step]
+            x = states[:count]
+            rows = model.rows(contexts[:count])
+            freq, cum = model.frequencies(rows)
+            slot = (x & mask).astype(np.int64)
+            group = (cum <= slot[:, None]).sum(axis=1) - 1
+            lines = np.arange(count)
+            x = freq[lines, group].astype(np.uint64) * (x >> shift) + \
+                (slot - cum[lines, group]).astype(np.uint64)
+            need = x < lower
+            needed = int(need.sum())
+            x[need] = (x[need] << np.uint64(16)) | \
+                stream[position:position + needed]
+            position += needed
+            states[:count] = x
+            symbols[starts[:count] + step] = group
+            model.update(rows, group)
+            contexts[:count] = model.advance(contexts[:count], group)
+        return symbols, offset
+
+    @staticmethod
+    def encode(sequence: str, preset: str='default', orders: Tuple[int]=None,
+               block_size: int=None) -> bytes:
+        """Encodes a sequence with the order-k context model.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence to be coded.
+        preset : str, optional
+            The speed preset, a key of PRESETS. The default is 'default'.
+        orders : Tuple[int], optional
+            The candidate orders of every block, between 1 and 16. The default
+            is None, i.e; the orders of the preset.
+        block_size : int, optional
+            The length of a block. The default is None, i.e; the block length
+            of the preset.
+
+        Returns
+        -------
+        bytes
+            The coded sequence, a self-describing binary container.
+
+        """
+        if preset not in PRESETS:
+            raise ValueError("Unknown preset %s, expected one of %s" % (
+                preset, ', '.join(PRESETS)))
+        settings = PRESETS[preset]
+        orders = tuple(orders or settings['orders'])
+        if not all(1 <= k <= ContextModel.MAX_ORDER for k in orders):
+            raise ValueError("Orders must be between 1 and %d" %
+                             ContextModel.MAX_ORDER)
+        block_size = block_size or settings['block_size']
+        table_bits = settings['table_bits']
+        alphabet, symbols = RansCoder.symbols(sequence)
+        size = len(alphabet)
+        if size > 1 << ContextModel.SCALE_BITS:
+            raise ValueError("The alphabet has more than %d symbols" %
+                             (1 << ContextModel.SCALE_BITS))
+
+        blocks = [ContextCoder.HEADER.pack(ContextCoder.MAGIC,
+                                           ContextCoder.VERSION, table_bits,
+                                           size, len(symbols)),
+                  alphabet.astype('<u4').tobytes()]
+        for block in ContextCoder.split(symbols, block_size):
+            order = ContextCoder.choose_order(block, orders, size, table_bits,
+                                              settings['lanes'],
+                                              settings['sample'])
+            blocks.append(ContextCoder.encode_block(block, order, size,
+                                                    table_bits,
+                                                    settings['lanes']))
+        return b''.join(blocks)
+
+    @staticmethod
+    def split(symbols: np.ndarray, block_size: int) -> Iterator[np.ndarray]:
+        """Splits symbols into blocks.
+
+        Parameters
+        ----------
+        symbols : np.ndarray
+            The symbol indexes.
+        block_size : int
+            The length of a block.
+
+        Yields
+        ------
+        Iterator[np.ndarray]
+            The blocks.
+
+        """
+        for start in range(0, len(symbols), block_size):
+            yield symbols[start:start + block_size]
+
+    @staticmethod
+    def block_orders(data: bytes) -> List[int]:
+        """Lists the order chosen for every block of a coded sequence.
+
+        Parameters
+        ----------
+        data : bytes
+            The coded sequence.
+
+        Returns
+        -------
+        List[int]
+            The order of every block.
+
+        """
+        _, _, _, size, length = ContextCoder.HEADER.unpack_from(data)
+        offset = ContextCoder.HEADER.size + 4 * size
+        orders = []
+        while length > 0:
+            order, lanes, count, words = ContextCoder.BLOCK.unpack_from(
+                data, offset)
+            offset += ContextCoder.BLOCK.size + 4 * lanes + 2 * words
+            orders.append(order)
+            length -= count
+        return orders
+
+    @staticmethod
+    def decode(data: bytes) -> str:
+        """Decodes a sequence coded with ContextCoder.encode.
+
+        Parameters
+        ----------
+        data : bytes
+            The coded sequence.
+
+        Returns
+        -------
+        str
+            The original sequence.
+
+        """
+        magic, version, table_bits, size, length = \
+            ContextCoder.HEADER.unpack_from(data)
+        if magic != ContextCoder.MAGIC or version != ContextCoder.VERSION:
+            raise ValueError("Not a context model stream (version %d)" %
+                             version)
+        offset = ContextCoder.HEADER.size
+        alphabet = np.frombuffer(data, '<u4', size, offset)
+        offset += 4 * size
+        blocks = []
+        while length > 0:
+            block, offset = ContextCoder.decode_block(data, offset, size,
+                                                      table_bits)
+            blocks.append(block)
+            length -= len(block)
+        if not blocks:
+            return ''
+        points = alphabet[np.concatenate(blocks)]
+        return points.astype('<u4').tobytes().decode('utf-32-le')
+
+def bits_per_base(sequence: str, **options: Dict) -> float:
+    """Measures the coded size of a sequence in bits per base.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence to be coded.
+    **options : Dict
+        The options of ContextCoder.encode.
+
+    Returns
+    -------
+    float
+        The number of bits per base.
+
+    """
+    return 8 * len(ContextCoder.encode(sequence, **options)) / \
+        max(len(sequence), 1)
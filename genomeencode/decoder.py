@@ -3,9 +3,53 @@
 """Decoder classes, Controller architecture in a MVC layout."""
 from __future__ import absolute_import
 import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+import numpy as np
 from genomeencode.sequence import Sequence
 from genomeencode.burros_wheeler import BurrosWheeler
-from genomeencode.huffman import HuffmanTree
+from genomeencode.huffman import HuffmanTree, MultiHuffman, SyncIndex
+from genomeencode.rans import RansCoder
+from genomeencode.context_model import ContextCoder
+from genomeencode.reference import ReferenceCoder
+from genomeencode.metrics import MetricsSink, get_default_sink, measure
+from genomeencode.progress import report, scale
+from genomeencode.trace import DecodeTrace
+from genomeencode.cache import ResultCache
+from genomeencode.shared import SharedArray, Spec
+
+def decode_shared(stream: Spec, output: Spec,
+                  tasks: List[Tuple[int, int, int, int]],
+                  codes: Dict[str, str]) -> None:
+    """Decodes pieces of a stream on a worker process, from and to shared
+    memory, the characters are written in place as code points.
+
+    Parameters
+    ----------
+    stream : Spec
+        The shared bytes of the stream.
+    output : Spec
+        The shared code points of the decoded sequence.
+    tasks : List[Tuple[int, int, int, int]]
+        The first bit, the bit after the last one, the number of
+        characters and the first character of every piece.
+    codes : Dict[str, str]
+        The codes dictionary.
+
+    Returns
+    -------
+    None
+
+    """
+    with SharedArray.attach(stream) as shared_stream, \
+            SharedArray.attach(output) as shared_output:
+        for start, stop, count, first in tasks:
+            piece = shared_stream.array[start // 8:-(-stop // 8)] \
+                .tobytes().decode('latin-1')
+            decoded = SyncIndex.decode_segment(piece, start % 8, count,
+                                               codes)
+            shared_output.array[first:first + len(decoded)] = \
+                np.frombuffer(decoded.encode('utf-32-le'), dtype='<u4')
 
 class HuffDecoder:
     """A decoder class for Huffman decompression, it is used as a controller
@@ -30,15 +74,35 @@ class HuffDecoder:
     decompressed: str
         The decompressed sequence; normally the Burros-Wheeler transform of an
         original sequence.
+    workers: int
+        The number of processes that decode the pieces between the sync
+        points of a single table stream, 1 to decode it serially.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
     """
+    # FullDecoder runs the inverse Burros-Wheeler transform after this backend
+    transformed = True
 
-    def __init__(self: object, path: str) -> None:
+    def __init__(self: object, path: str, metrics: MetricsSink=None,
+                 progress: Callable[[float], None]=None,
+                 workers: int=1) -> None:
         """Class constructor.
 
         Parameters
         ----------
         path : str
             The path of the file to be read.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+        workers : int, optional
+            The number of decoding processes, used when the file has a sync
+            point index (see huffman.SyncIndex). The default is 1.
 
         Returns
         -------
@@ -53,6 +117,21 @@ class HuffDecoder:
         self.header = None
         self.unicode = None
         self.decompressed = None
+        self.workers = workers
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.progress = progress
+
+    @property
+    def output(self: object) -> str:
+        """The output file path, common to all entropy decoders.
+
+        Returns
+        -------
+        str
+            The output file path for Huffman decompression.
+
+        """
+        return self.dehuffman_output
 
     def decode(self: object) -> None:
         """The main decoding method of the controller.
@@ -64,15 +143,447 @@ class HuffDecoder:
             decompressed sequence to a file.
 
         """
-        seq = self.seq.read_bytes()
+        name = type(self).__name__
+        with measure(self.metrics, name, 'total') as total:
+            with measure(self.metrics, name, 'read') as event:
+                data = self.seq.read_raw()
+                event['bytes_in'] = total['bytes_in'] = len(data)
+                tables = data.startswith(MultiHuffman.MAGIC)
+                seq = data if tables else data.decode('utf-8')
+                event['bytes_out'] = len(seq)
+            report(self.progress, 0.1)
+
+            if tables:
+                with measure(self.metrics, name, 'tables', len(seq)) as event:
+                    self.decompressed = MultiHuffman.decode(seq)
+                    event['bytes_out'] = len(self.decompressed)
+                report(self.progress, 0.9)
+            else:
+                self.decode_tree(seq)
+
+            with measure(self.metrics, name, 'write',
+                         len(self.decompressed)) as event:
+                Sequence(self.dehuffman_output).write(self.decompressed)
+                event['bytes_out'] = total['bytes_out'] = os.path.getsize(
+                    self.dehuffman_output)
+            report(self.progress, 1.0)
+
+    def decode_tree(self: object, seq: str) -> None:
+        """Decodes a sequence compressed with a single HuffmanTree.
+
+        Parameters
+        ----------
+        seq : str
+            The contents of the compressed file.
+
+        Returns
+        -------
+        None
+            Fills the header, unicode, binary and decompressed properties,
+            the binary property only when the stream is decoded serially.
+
+        """
+        name = type(self).__name__
         self.header = seq[:seq.index('\n')]
         self.unicode = seq[seq.index('\n')+1:]
         re_codes = HuffmanTree.header_to_codes(self.header)
-        binary = HuffmanTree.unicode_to_binstr(self.unicode)
-        padding = int(re_codes['pad'])
-        self.binary = HuffmanTree.remove_padding(binary, padding)
-        self.decompressed = HuffmanTree.binstr_to_seq(self.binary, re_codes)
-        Sequence(self.dehuffman_output).write(self.decompressed)
+        index = self.sync_index(re_codes)
+        if index is not None and self.workers > 1:
+            self.decode_pieces(index, re_codes)
+            return
+
+        with measure(self.metrics, name, 'binary', len(seq)) as event:
+            binary = HuffmanTree.unicode_to_binstr(self.unicode)
+            padding = int(re_codes['pad'])
+            self.binary = HuffmanTree.remove_padding(binary, padding)
+            event['bytes_out'] = len(self.binary)
+        report(self.progress, 0.4)
+
+        with measure(self.metrics, name, 'decode',
+                     len(self.binary)) as event:
+            self.decompressed = HuffmanTree.binstr_to_seq(
+                self.binary, re_codes,
+                progress=scale(self.progress, 0.4, 0.9))
+            event['bytes_out'] = len(self.decompressed)
+        report(self.progress, 0.9)
+
+    def sync_index(self: object, codes: Dict[str, str]) -> SyncIndex:
+        """Loads the sync point index written next to the compressed file.
+
+        Parameters
+        ----------
+        codes : Dict[str, str]
+            The codes dictionary of the file.
+
+        Returns
+        -------
+        SyncIndex
+            The index, None when there is none or when it does not match the
+            stream.
+
+        """
+        sidecar = self.seq.path + SyncIndex.SIDECAR
+        if not os.path.exists(sidecar):
+            return None
+        try:
+            index = SyncIndex.load(sidecar)
+        except ValueError: # an unreadable index is ignored like a stale one
+            return None
+        if not index.matches(self.unicode, int(codes['pad'])):
+            return None
+        return index
+
+    def decode_pieces(self: object, index: SyncIndex,
+                      codes: Dict[str, str]) -> None:
+        """Decodes the pieces of the stream between the sync points on
+        several processes, the binary property is not filled. The stream and
+        the decoded sequence are shared with the workers, that only receive
+        the offsets of their pieces.
+
+        Parameters
+        ----------
+        index : SyncIndex
+            The sync point index of the stream.
+        codes : Dict[str, str]
+            The codes dictionary of the file.
+
+        Returns
+        -------
+        None
+            Fills the decompressed property.
+
+        """
+        with measure(self.metrics, type(self).__name__, 'decode',
+                     len(self.unicode), len(index)) as event:
+            tasks = [(start, stop, count, number * index.every)
+                     for number, (start, stop, count) in enumerate(
+                         index.segments())]
+            size = -(-len(tasks) // (4 * self.workers))
+            batches = [tasks[first:first + size]
+                       for first in range(0, len(tasks), size)]
+            stream = np.frombuffer(self.unicode.encode('latin-1'),
+                                   dtype=np.uint8)
+            with SharedArray.copy(stream) as shared_stream, \
+                    SharedArray((index.symbols,), '<u4') as output, \
+                    ProcessPoolExecutor(self.workers) as pool:
+                list(pool.map(decode_shared,
+                              [shared_stream.spec] * len(batches),
+                              [output.spec] * len(batches), batches,
+                              [codes] * len(batches)))
+                self.decompressed = output.array.tobytes().decode('utf-32-le')
+            event['bytes_out'] = len(self.decompressed)
+        report(self.progress, 0.9)
+
+class RansDecoder:
+    """A decoder class for rANS decompression, it is used as a controller
+    in a MVC architecture.
+
+    Attributes
+    ----------
+    path: str
+        The path of the file to be decompressed with rANS decompression.
+    seq: Sequence
+        The sequence that was extracted from the file; a Sequence object.
+    derans_output: str
+        The output file path for rANS decompression.
+    decompressed: str
+        The decompressed sequence; normally the Burros-Wheeler transform of an
+        original sequence.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
+    """
+    transformed = True
+
+    def __init__(self: object, path: str, metrics: MetricsSink=None,
+                 progress: Callable[[float], None]=None) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file to be read.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.path = os.path.splitext(path)[0]
+        self.seq = Sequence(path)
+        self.derans_output = self.path + '_derans.txt'
+        self.decompressed = None
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.progress = progress
+
+    @property
+    def output(self: object) -> str:
+        """The output file path, common to all entropy decoders.
+
+        Returns
+        -------
+        str
+            The output file path for rANS decompression.
+
+        """
+        return self.derans_output
+
+    def decode(self: object) -> None:
+        """The main decoding method of the controller.
+
+        Returns
+        -------
+        None
+            Fills all the properties of an object and writes out the
+            decompressed sequence to a file.
+
+        """
+        name = type(self).__name__
+        with measure(self.metrics, name, 'total') as total:
+            with measure(self.metrics, name, 'read') as event:
+                data = self.seq.read_raw()
+                event['bytes_in'] = total['bytes_in'] = len(data)
+                event['bytes_out'] = len(data)
+            report(self.progress, 0.1)
+
+            with measure(self.metrics, name, 'decode', len(data)) as event:
+                self.decompressed = RansCoder.decode(data)
+                event['bytes_out'] = len(self.decompressed)
+            report(self.progress, 0.9)
+
+            with measure(self.metrics, name, 'write',
+                         len(self.decompressed)) as event:
+                Sequence(self.derans_output).write(self.decompressed)
+                event['bytes_out'] = total['bytes_out'] = os.path.getsize(
+                    self.derans_output)
+            report(self.progress, 1.0)
+
+class ContextDecoder:
+    """A decoder class for order-k context model decompression, it is used as
+    a controller in a MVC architecture.
+
+    Attributes
+    ----------
+    path: str
+        The path of the file to be decompressed with the context model.
+    seq: Sequence
+        The sequence that was extracted from the file; a Sequence object.
+    decontext_output: str
+        The output file path for context model decompression.
+    decompressed: str
+        The decompressed sequence; the original sequence.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
+    """
+    # the context model codes the original sequence, not its transform
+    transformed = False
+
+    def __init__(self: object, path: str, metrics: MetricsSink=None,
+                 progress: Callable[[float], None]=None) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file to be read.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.path = os.path.splitext(path)[0]
+        self.seq = Sequence(path)
+        self.decontext_output = self.path + '_decontext.txt'
+        self.decompressed = None
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.progress = progress
+
+    @property
+    def output(self: object) -> str:
+        """The output file path, common to all entropy decoders.
+
+        Returns
+        -------
+        str
+            The output file path for context model decompression.
+
+        """
+        return self.decontext_output
+
+    def decode(self: object) -> None:
+        """The main decoding method of the controller.
+
+        Returns
+        -------
+        None
+            Fills all the properties of an object and writes out the
+            decompressed sequence to a file.
+
+        """
+        name = type(self).__name__
+        with measure(self.metrics, name, 'total') as total:
+            with measure(self.metrics, name, 'read') as event:
+                data = self.seq.read_raw()
+                event['bytes_in'] = total['bytes_in'] = len(data)
+                event['bytes_out'] = len(data)
+            report(self.progress, 0.1)
+
+            with measure(self.metrics, name, 'decode', len(data)) as event:
+                self.decompressed = ContextCoder.decode(data)
+                event['bytes_out'] = len(self.decompressed)
+            report(self.progress, 0.9)
+
+            with measure(self.metrics, name, 'write',
+                         len(self.decompressed)) as event:
+                Sequence(self.decontext_output).write(self.decompressed)
+                event['bytes_out'] = total['bytes_out'] = os.path.getsize(
+                    self.decontext_output)
+            report(self.progress, 1.0)
+
+class ReferenceDecoder:
+    """A decoder class for reference-based decompression, it replays the
+    edits of a compressed sequence over its reference, it is used as a
+    controller in a MVC architecture.
+
+    Attributes
+    ----------
+    path: str
+        The path of the file to be decompressed against the reference.
+    seq: Sequence
+        The sequence that was extracted from the file; a Sequence object.
+    reference: Sequence
+        The reference sequence file; a Sequence object.
+    deref_output: str
+        The output file path for reference-based decompression.
+    decompressed: str
+        The decompressed sequence; the original sequence.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
+    """
+
+    def __init__(self: object, path: str, reference: str,
+                 metrics: MetricsSink=None,
+                 progress: Callable[[float], None]=None) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file to be read.
+        reference : str
+            The path of the reference file.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.path = os.path.splitext(path)[0]
+        self.seq = Sequence(path)
+        self.reference = Sequence(reference)
+        self.deref_output = self.path + '_deref.txt'
+        self.decompressed = None
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.progress = progress
+
+    @property
+    def output(self: object) -> str:
+        """The output file path, common to all decoders.
+
+        Returns
+        -------
+        str
+            The output file path for reference-based decompression.
+
+        """
+        return self.deref_output
+
+    def decode(self: object) -> None:
+        """The main decoding method of the controller.
+
+        Returns
+        -------
+        None
+            Fills all the properties of an object and writes out the
+            decompressed sequence to a file.
+
+        """
+        name = type(self).__name__
+        with measure(self.metrics, name, 'total') as total:
+            with measure(self.metrics, name, 'read') as event:
+                data = self.seq.read_raw()
+                reference = self.reference.read()
+                event['bytes_in'] = total['bytes_in'] = len(data)
+                event['bytes_out'] = len(data)
+            report(self.progress, 0.2)
+
+            with measure(self.metrics, name, 'decode', len(data)) as event:
+                self.decompressed = ReferenceCoder.decode(reference, data)
+                event['bytes_out'] = len(self.decompressed)
+            report(self.progress, 0.9)
+
+            with measure(self.metrics, name, 'write',
+                         len(self.decompressed)) as event:
+                Sequence(self.deref_output).write(self.decompressed)
+                event['bytes_out'] = total['bytes_out'] = os.path.getsize(
+                    self.deref_output)
+            report(self.progress, 1.0)
+
+# The entropy decoders recognized by the magic bytes of the compressed file,
+# files without a known magic are Huffman compressed
+ENTROPY_DECODERS = {
+    MultiHuffman.MAGIC: HuffDecoder,
+    RansCoder.MAGIC: RansDecoder,
+    ContextCoder.MAGIC: ContextDecoder,
+}
+
+def entropy_decoder(path: str) -> type:
+    """Finds the entropy decoder of a compressed file from its first bytes.
+
+    Parameters
+    ----------
+    path : str
+        The path of the compressed file.
+
+    Returns
+    -------
+    type
+        The decoder class, HuffDecoder when no magic bytes are recognized.
+
+    """
+    with open(path, 'rb') as file:
+        magic = file.read(len(RansCoder.MAGIC))
+    if magic == ReferenceCoder.MAGIC:
+        raise ValueError("%s was compressed against a reference, decode it "
+                         "with ReferenceDecoder" % path)
+    return ENTROPY_DECODERS.get(magic, HuffDecoder)
 
 class BWDecoder:
     """A decoder class for inversing the Burros-Wheeler transform, it is used 
@@ -86,18 +597,34 @@ class BWDecoder:
         The sequence that was extracted from the file; a Sequence object.
     debwt_output: str
         The output file path for the inverse of BWT.
-    bwm: List[str]
-        The reconstructed Burros-Wheeler Matrix.
     original: str
         The original sequence from the inverse BWT.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    trace: DecodeTrace
+        The step-by-step trace of the matrix reconstruction for the GUI, None
+        when the controller is not traced.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
     """
-    def __init__(self: object, path: str) -> None:
+    def __init__(self: object, path: str, metrics: MetricsSink=None,
+                 trace: DecodeTrace=None,
+                 progress: Callable[[float], None]=None) -> None:
         """Class constructor.
 
         Parameters
         ----------
         path : str
             The path of the file to be read.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        trace : DecodeTrace, optional
+            A trace to be recorded during decoding. The default is None, i.e;
+            no tracing.
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
 
         Returns
         -------
@@ -108,9 +635,11 @@ class BWDecoder:
         self.path = os.path.splitext(path)[0]
         self.seq = Sequence(path)
         self.debwt_output = self.path + '_debwt.txt'
-        self.bwm = None
         self.original = None
-        
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.trace = trace
+        self.progress = progress
+
     def decode(self: object) -> None:
         """The main decoding method of the controller.
 
@@ -121,9 +650,30 @@ class BWDecoder:
             sequence to a file.
 
         """
-        self.bwm = list(BurrosWheeler.reconstruct_bwm(self.seq.read()))
-        self.original = BurrosWheeler.decode_bwt(self.bwm[-1])
-        Sequence(self.debwt_output).write(self.original)
+        name = type(self).__name__
+        with measure(self.metrics, name, 'total') as total:
+            with measure(self.metrics, name, 'read') as event:
+                bwt = self.seq.read()
+                event['bytes_in'] = total['bytes_in'] = os.path.getsize(
+                    self.seq.path)
+                event['bytes_out'] = len(bwt)
+            report(self.progress, 0.1)
+
+            with measure(self.metrics, name, 'transform', len(bwt)) as event:
+                self.original = BurrosWheeler.inverse_bwt(
+                    bwt, scale(self.progress, 0.1, 0.9))
+                event['bytes_out'] = len(self.original)
+
+            if self.trace is not None:
+                self.trace.record(bwt)
+            report(self.progress, 0.9)
+
+            with measure(self.metrics, name, 'write',
+                         len(self.original)) as event:
+                Sequence(self.debwt_output).write(self.original)
+                event['bytes_out'] = total['bytes_out'] = os.path.getsize(
+                    self.debwt_output)
+            report(self.progress, 1.0)
 
 class FullDecoder:
     """A decoder class for both Huffman decompression and the inverse of the
@@ -133,21 +683,52 @@ class FullDecoder:
     ----------
     path: str
         The path of the file to be compressed with BWT + Huffman compression.
+    entropy_decoder: object
+        The decoder of the entropy coding backend the file was compressed
+        with, e.g; a HuffDecoder.
     huff_decoder: HuffDecoder
         A HuffDecoder object to do the Huffman decompression on a compressed
-        sequence.
+        sequence, None when another backend was used.
     bw_decoder: BWDecoder
         A BWDecoder object to do the inverse of Burros-Wheeler transform on
-        the output of Huffman decompression.
+        the output of Huffman decompression, None when the entropy coding
+        backend coded the original sequence.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage, it is
+        shared with both decoders.
+    trace: DecodeTrace
+        The trace given to the BWDecoder, None when not traced.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
+    cache: ResultCache
+        The cache of decompressed files, None when not cached.
+    cached: bool
+        Whether the last full_unzip was a cache hit, in which case the
+        decoders did not run and only their output file was written.
     """
 
-    def __init__(self: object, path: str) -> None:
+    def __init__(self: object, path: str, metrics: MetricsSink=None,
+                 trace: DecodeTrace=None,
+                 progress: Callable[[float], None]=None,
+                 cache: ResultCache=None) -> None:
         """Class constructor.
 
         Parameters
         ----------
         path : str
             The path of the file to be read.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        trace : DecodeTrace, optional
+            A trace of the inverse Burros-Wheeler transform to be recorded.
+            The default is None, i.e; no tracing.
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+        cache : ResultCache, optional
+            A cache of decompressed files, traced decodings always run. The
+            default is None, i.e; no caching.
 
         Returns
         -------
@@ -156,12 +737,33 @@ class FullDecoder:
 
         """
         self.path = path
+        self.entropy_decoder = None
         self.huff_decoder = None
         self.bw_decoder = None
-        
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.trace = trace
+        self.progress = progress
+        self.cache = cache
+        self.cached = False
+
+    @property
+    def output(self: object) -> str:
+        """The path of the original sequence once decoded.
+
+        Returns
+        -------
+        str
+            The output file path of the last decoder that ran.
+
+        """
+        if self.bw_decoder is not None:
+            return self.bw_decoder.debwt_output
+        return self.entropy_decoder.output
+
     def full_unzip(self: object) -> None:
         """The main decoding method of the controller, it first decodes the
-        sequence with Huffman decompression, then passes the uncompressed
+        sequence with Huffman decompression (or the entropy coding backend
+        recognized from the file), then passes the uncompressed
         sequence to do the Inverse of Burros-Wheeler transform and obtain
         the original sequence.
 
@@ -172,8 +774,32 @@ class FullDecoder:
             original sequence to a file.
 
         """
-        self.huff_decoder = HuffDecoder(self.path)
-        self.huff_decoder.decode()
+        with measure(self.metrics, type(self).__name__, 'total') as total:
+            total['bytes_in'] = os.path.getsize(self.path)
+            backend = entropy_decoder(self.path)
+            if backend.transformed:
+                self.entropy_decoder = backend(self.path, self.metrics,
+                                               scale(self.progress, 0.0, 0.5))
+                self.bw_decoder = BWDecoder(self.entropy_decoder.output,
+                                            self.metrics, self.trace,
+                                            scale(self.progress, 0.5, 1.0))
+            else:
+                self.entropy_decoder = backend(self.path, self.metrics,
+                                               self.progress)
+            if isinstance(self.entropy_decoder, HuffDecoder):
+                self.huff_decoder = self.entropy_decoder
 
-        self.bw_decoder = BWDecoder(self.huff_decoder.dehuffman_output)
-        self.bw_decoder.decode()
+            key = None
+            if self.cache is not None and self.trace is None:
+                key = self.cache.key(self.path, type(self).__name__)
+                self.cached = self.cache.get(key, self.output)
+                total['cache'] = 'hit' if self.cached else 'miss'
+            if self.cached:
+                report(self.progress, 1.0)
+            else:
+                self.entropy_decoder.decode()
+                if self.bw_decoder is not None:
+                    self.bw_decoder.decode()
+                if key is not None:
+                    self.cache.put(key, self.output)
+            total['bytes_out'] = os.path.getsize(self.output)
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""
+A deduplicating archive for collections of similar sequences. A sequence is
+cut into chunks where a rolling hash of its content matches a pattern, so an
+edit only moves the boundaries around it, and every chunk is compressed once
+and stored by the SHA-256 of its content. A manifest lists the chunks of every
+stored sequence, chunks are reference counted and removed with their last
+manifest.
+"""
+from __future__ import absolute_import
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Callable, Dict, List
+import numpy as np
+from genomeencode import codec
+from genomeencode.metrics import MetricsSink, get_default_sink, measure
+from genomeencode.progress import report
+from genomeencode.reference import text_codes
+from genomeencode.sequence import Sequence
+
+# The random table of the Gear rolling hash, fixed so that every store cuts
+# the same content at the same places
+GEAR = np.random.RandomState(0x67656172).randint(
+    0, 2 ** 63, size=256, dtype=np.int64).astype(np.uint64) * np.uint64(2) + \
+    np.uint64(1)
+WINDOW = 32
+SEGMENT = 1 << 20
+
+def rolling_hashes(codes: np.ndarray) -> np.ndarray:
+    """Computes the Gear hash of the window that ends at every position, i.e;
+    the sum of GEAR[c] << j over the last WINDOW characters c, j being their
+    distance to the position.
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        The code points of the sequence.
+
+    Returns
+    -------
+    np.ndarray
+        The hash at every position from WINDOW - 1 on, there are
+        len(codes) - WINDOW + 1 of them.
+
+    """
+    count = len(codes) - WINDOW + 1
+    hashes = np.zeros(max(count, 0), dtype=np.uint64)
+    gears = GEAR[codes & 0xff]
+    for shift in range(WINDOW):
+        # the character at distance shift of every window end
+        start = WINDOW - 1 - shift
+        hashes += gears[start:start + count] << np.uint64(shift)
+    return hashes
+
+def chunk_boundaries(sequence: str, min_size: int=4096, avg_size: int=16384,
+                     max_size: int=65536) -> List[int]:
+    """Cuts a sequence into content-defined chunks.
+
+    Parameters
+    ----------
+    sequence : str
+        The sequence.
+    min_size : int, optional
+        The smallest chunk but the last one. The default is 4096.
+    avg_size : int, optional
+        The expected chunk size, a power of two. The default is 16384.
+    max_size : int, optional
+        The largest chunk. The default is 65536.
+
+    Returns
+    -------
+    List[int]
+        The end of every chunk, the last one is len(sequence).
+
+    """
+    if avg_size & (avg_size - 1):
+        raise ValueError("The average chunk size must be a power of two")
+    if not 0 < min_size <= avg_size <= max_size:
+        raise ValueError("Expected 0 < min_size <= avg_size <= max_size")
+    # the top bits of the hash mix the whole window
+    mask = np.uint64(avg_size - 1) << np.uint64(64 - avg_size.bit_length() + 1)
+    codes = text_codes(sequence)
+    candidates = []
+    for start in range(0, max(len(codes) - WINDOW + 1, 0), SEGMENT):
+        hashes = rolling_hashes(codes[start:start + SEGMENT + WINDOW - 1])
+        # a chunk ends after the window whose hash matches
+        candidates.append(
+            np.flatnonzero((hashes & mask) == 0) + start + WINDOW)
+    candidates = np.concatenate(candidates) if candidates else \
+        np.zeros(0, dtype=np.int64)
+
+    ends = []
+    start = 0
+    while start < len(sequence):
+        found = np.searchsorted(candidates, start + min_size)
+        end = start + max_size
+        if found < len(candidates):
+            end = min(end, int(candidates[found]))
+        end = min(end, len(sequence))
+        ends.append(end)
+        start = end
+    return ends
+
+class DedupStore:
+    """A content-addressed store of compressed chunks with per-sequence
+    manifests, laid out in a directory:
+
+    - chunks/ab/abcdef... the compressed chunk of SHA-256 abcdef...
+    - manifests/name.json the chunk digests of a stored sequence
+    - index.json the reference count and sizes of every chunk
+
+    Every file is replaced atomically and the methods are thread safe.
+
+    Attributes
+    ----------
+    root: str
+        The directory of the store.
+    entropy: str
+        The codec backend of new chunks.
+    metrics: MetricsSink
+        The sink of the performance events.
+    index: Dict[str, Dict[str, int]]
+        The refs, size and stored size of every chunk.
+    """
+
+    def __init__(self: object, root: str, entropy: str='rans',
+                 metrics: MetricsSink=None, min_size: int=4096,
+                 avg_size: int=16384, max_size: int=65536) -> None:
+        """Class constructor, opens or creates a store.
+
+        Parameters
+        ----------
+        root : str
+            The directory of the store.
+        entropy : str, optional
+            The codec backend of new chunks, see codec.compress. The default
+            is 'rans'.
+        metrics : MetricsSink, optional
+            The sink of the performance events. The default is None, i.e; the
+            default sink.
+        min_size : int, optional
+            The smallest chunk. The default is 4096.
+        avg_size : int, optional
+            The expected chunk size. The default is 16384.
+        max_size : int, optional
+            The largest chunk. The default is 65536.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        if entropy not in codec.BACKENDS:
+            raise ValueError("Unknown entropy coder %s" % entropy)
+        self.root = root
+        self.entropy = entropy
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.sizes = (min_size, avg_size, max_size)
+        self.lock = threading.RLock()
+        os.makedirs(os.path.join(root, 'chunks'), exist_ok=True)
+        os.makedirs(os.path.join(root, 'manifests'), exist_ok=True)
+        self.index = self.load(os.path.join(root, 'index.json'), {})
+
+    @staticmethod
+    def load(path: str, default: object) -> object:
+        """Reads a JSON file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+        default : object
+            The value of a missing file.
+
+        Returns
+        -------
+        object
+            The contents of the file.
+
+        """
+        if not os.path.exists(path):
+            return default
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    @staticmethod
+    def replace(path: str, content: bytes) -> None:
+        """Writes a file atomically, readers see the old or the new contents.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+        content : bytes
+            The new contents.
+
+        Returns
+        -------
+        None
+
+        """
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                file.write(content)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    def chunk_path(self: object, digest: str) -> str:
+        """The path of a chunk."""
+        return os.path.join(self.root, 'chunks', digest[:2], digest)
+
+    def manifest_path(self: object, name: str) -> str:
+        """The path of a manifest, names cannot leave the store."""
+        if not name or name.startswith('.') or '/' in name or \
+                os.sep in name:
+            raise ValueError("Invalid sequence name %r" % name)
+        return os.path.join(self.root, 'manifests', name + '.json')
+
+    def save_index(self: object) -> None:
+        """Writes the chunk index out."""
+        self.replace(os.path.join(self.root, 'index.json'),
+                     json.dumps(self.index, sort_keys=True).encode('utf-8'))
+
+    def put(self: object, name: str, sequence: str,
+            progress: Callable[[float], None]=None) -> Dict[str, int]:
+        """Stores a sequence, only the chunks that are not stored yet are
+        compressed. Storing a name again replaces the sequence.
+
+        Parameters
+        ----------
+        name : str
+            The name of the sequence.
+        sequence : str
+            The sequence.
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+
+        Returns
+        -------
+        Dict[str, int]
+            The number of chunks and new chunks, the size of the sequence and
+            the stored size of its new chunks.
+
+        """
+        manifest_path = self.manifest_path(name)
+        summary = {'chunks': 0, 'new_chunks': 0, 'bytes_in': len(sequence),
+                   'bytes_stored': 0}
+        with measure(self.metrics, 'DedupStore', 'total', len(sequence)):
+            with measure(self.metrics, 'DedupStore', 'chunk', len(sequence)):
+                ends = chunk_boundaries(sequence, *self.sizes)
+            digests = []
+            with self.lock:
+                start = 0
+                for number, end in enumerate(ends):
+                    chunk = sequence[start:end]
+                    start = end
+                    digest = hashlib.sha256(chunk.encode('utf-8')).hexdigest()
+                    digests.append(digest)
+                    entry = self.index.get(digest)
+                    if entry is None:
+                        with measure(self.metrics, 'DedupStore', 'compress',
+                                     len(chunk)) as event:
+                            data = codec.compress(chunk, self.entropy)
+                            event['bytes_out'] = len(data)
+                        path = self.chunk_path(digest)
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        self.replace(path, data)
+                        entry = self.index[digest] = {
+                            'refs': 0, 'size': len(chunk), 'stored': len(data)}
+                        summary['new_chunks'] += 1
+                        summary['bytes_stored'] += len(data)
+                    entry['refs'] += 1
+                    report(progress, (number + 1) / len(ends))
+                summary['chunks'] = len(digests)
+                previous = self.load(manifest_path, None)
+                self.save_index()
+                manifest = {'size': len(sequence), 'chunks': digests}
+                self.replace(manifest_path,
+                             json.dumps(manifest).encode('utf-8'))
+                if previous is not None:
+                    self.release(previous['chunks'])
+        return summary
+
+    def ingest(self: object, path: str, name: str=None,
+               progress: Callable[[float], None]=None) -> Dict[str, int]:
+        """Stores a sequence file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the sequence file.
+        name : str, optional
+            The name of the sequence. The default is None, i.e; the name of
+            the file without its extension.
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+
+        Returns
+        -------
+        Dict[str, int]
+            See DedupStore.put.
+
+        """
+        if name is None:
+            name = os.path.splitext(os.path.basename(path))[0]
+        return self.put(name, Sequence(path).read(), progress)
+
+    def get(self: object, name: str) -> str:
+        """Rebuilds a stored sequence.
+
+        Parameters
+        ----------
+        name : str
+            The name of the sequence.
+
+        Returns
+        -------
+        str
+            The sequence.
+
+        """
+        manifest = self.load(self.manifest_path(name), None)
+        if manifest is None:
+            raise KeyError(name)
+        with measure(self.metrics, 'DedupStore', 'get', 0) as event:
+            pieces = []
+            for digest in manifest['chunks']:
+                with open(self.chunk_path(digest), 'rb') as file:
+                    pieces.append(codec.decompress(file.read()))
+            sequence = ''.join(pieces)
+            event['bytes_out'] = len(sequence)
+        if len(sequence) != manifest['size']:
+            raise ValueError("The chunks of %s are corrupted" % name)
+        return sequence
+
+    def release(self: object, digests: List[str]) -> None:
+        """Drops a reference to chunks, unreferenced chunks are removed.
+
+        Parameters
+        ----------
+        digests : List[str]
+            The digests of the chunks.
+
+        Returns
+        -------
+        None
+
+        """
+        with self.lock:
+            for digest in digests:
+                entry = self.index[digest]
+                entry['refs'] -= 1
+                if entry['refs'] == 0:
+                    del self.index[digest]
+                    os.remove(self.chunk_path(digest))
+            self.save_index()
+
+    def delete(self: object, name: str) -> None:
+        """Removes a stored sequence.
+
+        Parameters
+        ----------
+        name : str
+            The name of the sequence.
+
+        Returns
+        -------
+        None
+
+        """
+        path = self.manifest_path(name)
+        with self.lock:
+            manifest = self.load(path, None)
+            if manifest is None:
+                raise KeyError(name)
+            os.remove(path)
+            self.release(manifest['chunks'])
+
+    def names(self: object) -> List[str]:
+        """The names of the stored sequences, sorted."""
+        return sorted(os.path.splitext(entry)[0] for entry in
+                      os.listdir(os.path.join(self.root, 'manifests'))
+                      if entry.endswith('.json'))
+
+    def stats(self: object) -> Dict[str, float]:
+        """Sums up the store.
+
+        Returns
+        -------
+        Dict[str, float]
+            The number of sequences and chunks, the total size of the
+            sequences, of the distinct chunks and of the compressed chunks,
+            and the ratio of the sequences size to the stored size.
+
+        """
+        with self.lock:
+            logical = sum(self.load(self.manifest_path(name), {})['size']
+                          for name in self.names())
+            unique = sum(entry['size'] for entry in self.index.values())
+            stored = sum(entry['stored'] for entry in self.index.values())
+            return {'sequences': len(self.names()), 'chunks': len(self.index),
+                    'logical_bytes': logical, 'unique_bytes': unique,
+                    'stored_bytes': stored,
+                    'ratio': logical / stored if stored else 0.0}
@@ -3,9 +3,17 @@
 """Encoder classes, Controller architecture in a MVC layout."""
 from __future__ import absolute_import
 import os
+from typing import Callable, Dict, List, Union
 from genomeencode.sequence import Sequence
 from genomeencode.burros_wheeler import BurrosWheeler
-from genomeencode.huffman import HuffmanTree
+from genomeencode.huffman import HuffmanTree, MultiHuffman, SyncIndex
+from genomeencode.rans import RansCoder
+from genomeencode.context_model import ContextCoder
+from genomeencode.reference import ReferenceCoder, ReferenceIndex
+from genomeencode.metrics import MetricsSink, get_default_sink, measure
+from genomeencode.progress import report, scale
+from genomeencode.trace import EncodeTrace
+from genomeencode.cache import ResultCache
 
 class BWEncoder:
     """An encoder class for Burros-Wheeler transform, it is used as a 
@@ -19,20 +27,37 @@ class BWEncoder:
         The sequence that was extracted from the file; a Sequence object.
     bwt_output: str
         The output file path for BWT.
-    rotations: List[str]
-        A matrix of rotations from the original sequence.
-    bwm: List[str]
-        The Burros-Wheeler Matrix.
     bwt: str
         The Burros-Wheeler transform of the sequence.
+    suff_arr: List[int]
+        The suffix array the transform was built from, kept for the analyses
+        that need it (see repeats.RepeatAnalysis).
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    trace: EncodeTrace
+        The step-by-step trace of the transform (rotations and matrix) for
+        the GUI, None when the controller is not traced.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
     """
-    def __init__(self: object, path: str) -> None:
+    def __init__(self: object, path: str, metrics: MetricsSink=None,
+                 trace: EncodeTrace=None,
+                 progress: Callable[[float], None]=None) -> None:
         """Class constructor.
 
         Parameters
         ----------
         path : str
             The path of the file to be read.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        trace : EncodeTrace, optional
+            A trace to be recorded during encoding. The default is None, i.e;
+            no tracing.
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
 
         Returns
         -------
@@ -43,9 +68,11 @@ class BWEncoder:
         self.path = os.path.splitext(path)[0]
         self.seq = Sequence(path)
         self.bwt_output = self.path + '_bwt.txt'
-        self.rotations = None
-        self.bwm = None
         self.bwt = None
+        self.suff_arr = None
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.trace = trace
+        self.progress = progress
 
     def encode(self: object) -> None:
         """The main encoding method of the controller.
@@ -57,10 +84,31 @@ class BWEncoder:
             transformed sequence to a file.
 
         """
-        self.rotations = list(BurrosWheeler.string_rotations(self.seq.read()))
-        self.bwm = BurrosWheeler.construct_bwm(self.rotations[-1])
-        self.bwt = BurrosWheeler.encode_bwt(self.bwm)
-        Sequence(self.bwt_output).write(self.bwt)
+        name = type(self).__name__
+        with measure(self.metrics, name, 'total') as total:
+            with measure(self.metrics, name, 'read') as event:
+                seq = self.seq.read()
+                event['bytes_in'] = total['bytes_in'] = os.path.getsize(
+                    self.seq.path)
+                event['bytes_out'] = len(seq)
+            report(self.progress, 0.1)
+
+            with measure(self.metrics, name, 'transform', len(seq)) as event:
+                self.suff_arr = BurrosWheeler.int_suffix_array(
+                    seq, scale(self.progress, 0.1, 0.8))
+                self.bwt = BurrosWheeler.bwt_from_suffix_array(
+                    seq, self.suff_arr, scale(self.progress, 0.8, 0.9))
+                event['bytes_out'] = len(self.bwt)
+
+            if self.trace is not None:
+                self.trace.record(seq, self.suff_arr)
+            report(self.progress, 0.9)
+
+            with measure(self.metrics, name, 'write', len(self.bwt)) as event:
+                Sequence(self.bwt_output).write(self.bwt)
+                event['bytes_out'] = total['bytes_out'] = os.path.getsize(
+                    self.bwt_output)
+            report(self.progress, 1.0)
 
 class HuffEncoder:
     """An encoder class for Huffman compression, it is used as a controller
@@ -82,17 +130,54 @@ class HuffEncoder:
         as well as padding that were generated when compressing the sequence.
     unicode: str
         The compressed format of the sequence.
-    compressed: str
-        The compressed sequence to be written to a file.
+    compressed: Union[str, bytes]
+        The compressed sequence to be written to a file, binary when
+        several code tables are used.
+    tables: int
+        The maximum number of code tables of a block, 1 for a single
+        HuffmanTree.
+    max_length: int
+        The maximum length of a code, None for unlimited tree paths.
+    sync: int
+        The number of characters between two sync points of the index written
+        next to the compressed file (see huffman.SyncIndex), 0 for none.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
     """
+    # FullEncoder runs the Burros-Wheeler transform before this backend
+    transformed = True
 
-    def __init__(self: object, path: str) -> None:
+    def __init__(self: object, path: str, metrics: MetricsSink=None,
+                 progress: Callable[[float], None]=None,
+                 tables: int=1, max_length: int=None, sync: int=0) -> None:
         """Class constructor.
 
         Parameters
         ----------
         path : str
             The path of the file to be read.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+        tables : int, optional
+            The maximum number of code tables of a block, every group of
+            symbols picks the best one (see huffman.MultiHuffman). The
+            default is 1, i.e; a single HuffmanTree.
+        max_length : int, optional
+            The maximum length of a code (package-merge), e.g; 12 so that
+            decoding needs a single lookup table of 4096 entries. The default
+            is None, i.e; the tree paths for a single table and
+            MultiHuffman.MAX_LENGTH for several tables.
+        sync : int, optional
+            The number of characters between two sync points, e.g;
+            SyncIndex.EVERY, the decoder can then decode the pieces between
+            them in parallel. Only a single table is indexed. The default is
+            0, i.e; no index.
 
         Returns
         -------
@@ -100,6 +185,9 @@ class HuffEncoder:
             A class instance.
 
         """
+        if sync and tables > 1:
+            raise ValueError("Only streams coded with a single table have "
+                             "sync points")
         self.path = os.path.splitext(path)[0]
         self.seq = Sequence(path)
         self.huff_output = self.path + '_compressed.txt'
@@ -107,6 +195,400 @@ class HuffEncoder:
         self.header = None
         self.unicode = None
         self.compressed = None
+        self.tables = tables
+        self.max_length = max_length
+        self.sync = sync
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.progress = progress
+
+    @property
+    def output(self: object) -> str:
+        """The output file path, common to all entropy encoders.
+
+        Returns
+        -------
+        str
+            The output file path for Huffman compression.
+
+        """
+        return self.huff_output
+
+    def encode(self: object) -> None:
+        """The main encoding method of the controller.
+
+        Returns
+        -------
+        None
+            Fills all the properties of an object and writes out the
+            compressed sequence to a file.
+
+        """
+        name = type(self).__name__
+        with measure(self.metrics, name, 'total') as total:
+            with measure(self.metrics, name, 'read') as event:
+                seq = self.seq.read()
+                event['bytes_in'] = total['bytes_in'] = os.path.getsize(
+                    self.seq.path)
+                event['bytes_out'] = len(seq)
+            report(self.progress, 0.1)
+
+            if self.tables > 1:
+                self.encode_tables(seq, total)
+                return
+
+            with measure(self.metrics, name, 'tree', len(seq)) as event:
+                tree = HuffmanTree(seq)
+                if self.max_length is None:
+                    tree.get_codings(tree.root)
+                else:
+                    tree.codes = HuffmanTree.limited_codes(tree.frequency,
+                                                           self.max_length)
+                event['bytes_out'] = len(tree.codes)
+            report(self.progress, 0.3)
+
+            with measure(self.metrics, name, 'binary', len(seq)) as event:
+                self.binary = tree.seq_to_binstr()
+                self.unicode = HuffmanTree.binstr_to_unicode(self.binary)
+                self.header = tree.codes_to_header()
+                event['bytes_out'] = len(self.unicode)
+            report(self.progress, 0.9)
+
+            self.compressed =  self.header + self.unicode
+            with measure(self.metrics, name, 'write',
+                         len(self.compressed)) as event:
+                Sequence(self.huff_output).write_bytes(self.compressed)
+                event['bytes_out'] = total['bytes_out'] = os.path.getsize(
+                    self.huff_output)
+
+            sidecar = self.huff_output + SyncIndex.SIDECAR
+            if self.sync:
+                with measure(self.metrics, name, 'sync', len(seq)) as event:
+                    index = SyncIndex.build(seq, tree.codes, self.unicode,
+                                            self.sync)
+                    index.save(sidecar)
+                    event['bytes_out'] = os.path.getsize(sidecar)
+            elif os.path.exists(sidecar): # the index of a previous stream
+                os.remove(sidecar)
+            report(self.progress, 1.0)
+
+    def encode_tables(self: object, seq: str, total: Dict) -> None:
+        """Encodes a sequence with several code tables, the binary format of
+        huffman.MultiHuffman.
+
+        Parameters
+        ----------
+        seq : str
+            The sequence to be compressed.
+        total : Dict
+            The metrics event of the whole encoding.
+
+        Returns
+        -------
+        None
+            Writes out the compressed sequence to a file.
+
+        """
+        name = type(self).__name__
+        with measure(self.metrics, name, 'tables', len(seq)) as event:
+            self.compressed = MultiHuffman.encode(
+                seq, self.tables, self.max_length or MultiHuffman.MAX_LENGTH)
+            event['bytes_out'] = len(self.compressed)
+        report(self.progress, 0.9)
+
+        with measure(self.metrics, name, 'write',
+                     len(self.compressed)) as event:
+            Sequence(self.huff_output).write_raw(self.compressed)
+            event['bytes_out'] = total['bytes_out'] = os.path.getsize(
+                self.huff_output)
+        report(self.progress, 1.0)
+
+class MultiHuffEncoder(HuffEncoder):
+    """A HuffEncoder that uses up to MultiHuffman.MAX_TABLES code tables by
+    default, the 'multihuffman' entropy coding backend of FullEncoder."""
+
+    def __init__(self: object, path: str, metrics: MetricsSink=None,
+                 progress: Callable[[float], None]=None,
+                 tables: int=MultiHuffman.MAX_TABLES,
+                 max_length: int=None) -> None:
+        """Class constructor, see HuffEncoder."""
+        super().__init__(path, metrics, progress, tables, max_length)
+
+class RansEncoder:
+    """An encoder class for interleaved rANS compression, an alternative to
+    HuffEncoder that gets closer to the entropy of the sequence, it is used
+    as a controller in a MVC architecture.
+
+    Attributes
+    ----------
+    path: str
+        The path of the file to be compressed with rANS compression.
+    seq: Sequence
+        The sequence that was extracted from the file; a Sequence object.
+    rans_output: str
+        The output file path for rANS compression.
+    lanes: int
+        The number of interleaved coder states.
+    compressed: bytes
+        The compressed sequence to be written to a file.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
+    """
+    transformed = True
+
+    def __init__(self: object, path: str, metrics: MetricsSink=None,
+                 progress: Callable[[float], None]=None,
+                 lanes: int=RansCoder.DEFAULT_LANES) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file to be read.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+        lanes : int, optional
+            The number of interleaved coder states. The default is
+            RansCoder.DEFAULT_LANES.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.path = os.path.splitext(path)[0]
+        self.seq = Sequence(path)
+        self.rans_output = self.path + '_compressed.txt'
+        self.lanes = lanes
+        self.compressed = None
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.progress = progress
+
+    @property
+    def output(self: object) -> str:
+        """The output file path, common to all entropy encoders.
+
+        Returns
+        -------
+        str
+            The output file path for rANS compression.
+
+        """
+        return self.rans_output
+
+    def encode(self: object) -> None:
+        """The main encoding method of the controller.
+
+        Returns
+        -------
+        None
+            Fills all the properties of an object and writes out the
+            compressed sequence to a file.
+
+        """
+        name = type(self).__name__
+        with measure(self.metrics, name, 'total') as total:
+            with measure(self.metrics, name, 'read') as event:
+                seq = self.seq.read()
+                event['bytes_in'] = total['bytes_in'] = os.path.getsize(
+                    self.seq.path)
+                event['bytes_out'] = len(seq)
+            report(self.progress, 0.1)
+
+            with measure(self.metrics, name, 'encode', len(seq)) as event:
+                self.compressed = RansCoder.encode(seq, self.lanes)
+                event['bytes_out'] = len(self.compressed)
+            report(self.progress, 0.9)
+
+            with measure(self.metrics, name, 'write',
+                         len(self.compressed)) as event:
+                Sequence(self.rans_output).write_raw(self.compressed)
+                event['bytes_out'] = total['bytes_out'] = os.path.getsize(
+                    self.rans_output)
+            report(self.progress, 1.0)
+
+class ContextEncoder:
+    """An encoder class for order-k context model compression, it is used as
+    a controller in a MVC architecture. The model predicts every base from
+    the previous ones, so it codes the original sequence and not its
+    Burros-Wheeler transform.
+
+    Attributes
+    ----------
+    path: str
+        The path of the file to be compressed with the context model.
+    seq: Sequence
+        The sequence that was extracted from the file; a Sequence object.
+    context_output: str
+        The output file path for context model compression.
+    preset: str
+        The speed preset, a key of context_model.PRESETS.
+    compressed: bytes
+        The compressed sequence to be written to a file.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
+    """
+    # FullEncoder skips the Burros-Wheeler transform for this backend
+    transformed = False
+
+    def __init__(self: object, path: str, metrics: MetricsSink=None,
+                 progress: Callable[[float], None]=None,
+                 preset: str='default') -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file to be read.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+        preset : str, optional
+            The speed preset; 'fast', 'default' or 'best'. The default is
+            'default'.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.path = os.path.splitext(path)[0]
+        self.seq = Sequence(path)
+        self.context_output = self.path + '_compressed.txt'
+        self.preset = preset
+        self.compressed = None
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.progress = progress
+
+    @property
+    def output(self: object) -> str:
+        """The output file path, common to all entropy encoders.
+
+        Returns
+        -------
+        str
+            The output file path for context model compression.
+
+        """
+        return self.context_output
+
+    def encode(self: object) -> None:
+        """The main encoding method of the controller.
+
+        Returns
+        -------
+        None
+            Fills all the properties of an object and writes out the
+            compressed sequence to a file.
+
+        """
+        name = type(self).__name__
+        with measure(self.metrics, name, 'total') as total:
+            with measure(self.metrics, name, 'read') as event:
+                seq = self.seq.read()
+                event['bytes_in'] = total['bytes_in'] = os.path.getsize(
+                    self.seq.path)
+                event['bytes_out'] = len(seq)
+            report(self.progress, 0.1)
+
+            with measure(self.metrics, name, 'encode', len(seq)) as event:
+                self.compressed = ContextCoder.encode(seq, self.preset)
+                event['bytes_out'] = len(self.compressed)
+            report(self.progress, 0.9)
+
+            with measure(self.metrics, name, 'write',
+                         len(self.compressed)) as event:
+                Sequence(self.context_output).write_raw(self.compressed)
+                event['bytes_out'] = total['bytes_out'] = os.path.getsize(
+                    self.context_output)
+            report(self.progress, 1.0)
+
+class ReferenceEncoder:
+    """An encoder class for reference-based compression, it codes a
+    resequenced genome as matches against a known reference plus literal
+    edits, it is used as a controller in a MVC architecture.
+
+    Attributes
+    ----------
+    path: str
+        The path of the file to be compressed against the reference.
+    seq: Sequence
+        The sequence that was extracted from the file; a Sequence object.
+    reference: Sequence
+        The reference sequence file; a Sequence object.
+    index: ReferenceIndex
+        The index of the reference, built on the first encoding unless it
+        was given (an index can be shared by many encoders).
+    ref_output: str
+        The output file path for reference-based compression.
+    compressed: bytes
+        The compressed sequence to be written to a file.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
+    """
+
+    def __init__(self: object, path: str, reference: str,
+                 metrics: MetricsSink=None,
+                 progress: Callable[[float], None]=None,
+                 index: ReferenceIndex=None) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file to be read.
+        reference : str
+            The path of the reference file.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+        index : ReferenceIndex, optional
+            An index of the reference. The default is None, i.e; it is built
+            when encoding.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.path = os.path.splitext(path)[0]
+        self.seq = Sequence(path)
+        self.reference = Sequence(reference)
+        self.index = index
+        self.ref_output = self.path + '_compressed.txt'
+        self.compressed = None
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.progress = progress
+
+    @property
+    def output(self: object) -> str:
+        """The output file path, common to all encoders.
+
+        Returns
+        -------
+        str
+            The output file path for reference-based compression.
+
+        """
+        return self.ref_output
 
     def encode(self: object) -> None:
         """The main encoding method of the controller.
@@ -118,35 +600,96 @@ class HuffEncoder:
             compressed sequence to a file.
 
         """
-        tree = HuffmanTree(self.seq.read())
-        tree.get_codings(tree.root)
-        self.binary = tree.seq_to_binstr()
-        self.unicode = HuffmanTree.binstr_to_unicode(self.binary)
-        self.header = tree.codes_to_header()
-        self.compressed =  self.header + self.unicode
-        Sequence(self.huff_output).write_bytes(self.compressed)
+        name = type(self).__name__
+        with measure(self.metrics, name, 'total') as total:
+            with measure(self.metrics, name, 'read') as event:
+                seq = self.seq.read()
+                event['bytes_in'] = total['bytes_in'] = os.path.getsize(
+                    self.seq.path)
+                event['bytes_out'] = len(seq)
+            report(self.progress, 0.1)
+
+            if self.index is None:
+                with measure(self.metrics, name, 'index') as event:
+                    self.index = ReferenceIndex(self.reference.read())
+                    event['bytes_in'] = len(self.index.reference)
+                    event['bytes_out'] = self.index.hashes.nbytes + \
+                        self.index.positions.nbytes
+            report(self.progress, 0.5)
+
+            with measure(self.metrics, name, 'encode', len(seq)) as event:
+                self.compressed = ReferenceCoder.encode(self.index, seq)
+                event['bytes_out'] = len(self.compressed)
+            report(self.progress, 0.9)
+
+            with measure(self.metrics, name, 'write',
+                         len(self.compressed)) as event:
+                Sequence(self.ref_output).write_raw(self.compressed)
+                event['bytes_out'] = total['bytes_out'] = os.path.getsize(
+                    self.ref_output)
+            report(self.progress, 1.0)
+
+# The entropy coding backends of FullEncoder, by name
+ENTROPY_ENCODERS = {'huffman': HuffEncoder, 'multihuffman': MultiHuffEncoder,
+                    'rans': RansEncoder, 'context': ContextEncoder}
 
 class FullEncoder:
     """An encoder class for both the Burros-Wheeler transform and Huffman
-    compression, controller architecture.
+    compression (or another entropy coding backend), controller architecture.
     
     Attributes
     ----------
     path: str
         The path of the file to be compressed with BWT + Huffman compression.
+    entropy: str
+        The name of the entropy coding backend, a key of ENTROPY_ENCODERS.
     bw_encoder: BWEncoder
-        A BWEncoder object to do the Burros-Wheeler transform on a sequence.
+        A BWEncoder object to do the Burros-Wheeler transform on a sequence,
+        None when the entropy coding backend codes the sequence itself.
+    entropy_encoder: object
+        The encoder of the entropy coding backend, e.g; a HuffEncoder.
     huff_encoder: HuffEncoder
-        A HuffEncoder object to do the Huffman compression on the BW transform.
+        A HuffEncoder object to do the Huffman compression on the BW transform,
+        None when another backend is used.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage, it is
+        shared with both encoders.
+    trace: EncodeTrace
+        The trace given to the BWEncoder, None when not traced.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        stage and can raise progress.Cancelled to abort.
+    cache: ResultCache
+        The cache of compressed files, None when not cached.
+    cached: bool
+        Whether the last full_zip was a cache hit, in which case the encoders
+        did not run and only their output file was written.
     """
 
-    def __init__(self: object, path: str) -> None:
+    def __init__(self: object, path: str, metrics: MetricsSink=None,
+                 trace: EncodeTrace=None,
+                 progress: Callable[[float], None]=None,
+                 entropy: str='huffman', cache: ResultCache=None) -> None:
         """Class constructor.
 
         Parameters
         ----------
         path : str
             The path of the file to be read.
+        metrics : MetricsSink, optional
+            The metrics sink of the controller. The default is None, i.e;
+            the process-wide default sink (see metrics.set_default_sink).
+        trace : EncodeTrace, optional
+            A trace of the Burros-Wheeler transform to be recorded. The
+            default is None, i.e; no tracing.
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+        entropy : str, optional
+            The entropy coding backend; 'huffman', 'multihuffman', 'rans' or
+            'context'. The default is 'huffman'.
+        cache : ResultCache, optional
+            A cache of compressed files, traced encodings always run. The
+            default is None, i.e; no caching.
 
         Returns
         -------
@@ -154,13 +697,37 @@ class FullEncoder:
             A class instance.
 
         """
+        if entropy not in ENTROPY_ENCODERS:
+            raise ValueError("Unknown entropy coder %s, expected one of %s" % (
+                entropy, ', '.join(ENTROPY_ENCODERS)))
         self.path = path
+        self.entropy = entropy
         self.bw_encoder = None
+        self.entropy_encoder = None
         self.huff_encoder = None
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.trace = trace
+        self.progress = progress
+        self.cache = cache
+        self.cached = False
+
+    @property
+    def output(self: object) -> str:
+        """The path of the compressed file.
+
+        Returns
+        -------
+        str
+            The output file path of the entropy encoder.
+
+        """
+        return self.entropy_encoder.output
 
     def full_zip(self: object) -> None:
         """The main encoding method of the controller, it first encodes the
-        sequence with BWT, then passes the BWT to Huffman compression.
+        sequence with BWT, then passes the BWT to Huffman compression (or to
+        the chosen entropy coding backend, the context model codes the
+        sequence itself).
 
         Returns
         -------
@@ -169,8 +736,34 @@ class FullEncoder:
             compressed sequence to a file.
 
         """
-        self.bw_encoder = BWEncoder(self.path)
-        self.bw_encoder.encode()
-        
-        self.huff_encoder = HuffEncoder(self.bw_encoder.bwt_output)
-        self.huff_encoder.encode()
+        with measure(self.metrics, type(self).__name__, 'total') as total:
+            total['bytes_in'] = os.path.getsize(self.path)
+            backend = ENTROPY_ENCODERS[self.entropy]
+            if backend.transformed:
+                self.bw_encoder = BWEncoder(self.path, self.metrics,
+                                            self.trace,
+                                            scale(self.progress, 0.0, 0.7))
+                self.entropy_encoder = backend(self.bw_encoder.bwt_output,
+                                               self.metrics,
+                                               scale(self.progress, 0.7, 1.0))
+            else:
+                self.entropy_encoder = backend(self.path, self.metrics,
+                                               self.progress)
+            if isinstance(self.entropy_encoder, HuffEncoder):
+                self.huff_encoder = self.entropy_encoder
+
+            key = None
+            if self.cache is not None and self.trace is None:
+                key = self.cache.key(self.path, type(self).__name__,
+                                     self.entropy)
+                self.cached = self.cache.get(key, self.output)
+                total['cache'] = 'hit' if self.cached else 'miss'
+            if self.cached:
+                report(self.progress, 1.0)
+            else:
+                if self.bw_encoder is not None:
+                    self.bw_encoder.encode()
+                self.entropy_encoder.encode()
+                if key is not None:
+                    self.cache.put(key, self.output)
+            total['bytes_out'] = os.path.getsize(self.output)
@@ -0,0 +1,504 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide counters, gauges and histograms for long-running compression
+workers, rendered in the Prometheus text exposition format (or OpenMetrics).
+They can be scraped through a local HTTP endpoint or written periodically to a
+textfile-collector file. The PrometheusSink feeds them from the stage events
+of the encoder and decoder controllers.
+"""
+from __future__ import absolute_import
+import math
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence, Tuple
+from genomeencode.metrics import MetricsSink, set_default_sink
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+RATIO_BUCKETS = (0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 5.0, 8.0)
+
+def _escape(value: str) -> str:
+    """Escapes a label value for the text exposition format."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value: float) -> str:
+    """Formats a sample value for the text exposition format."""
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    """The base class of a labelled metric family.
+
+    Attributes
+    ----------
+    name: str
+        The metric name.
+    documentation: str
+        The HELP line of the metric.
+    labelnames: Tuple[str]
+        The label names of the metric.
+    """
+    kind = 'untyped'
+
+    def __init__(self: object, name: str, documentation: str,
+                 labelnames: Sequence[str]=()) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        name : str
+            The metric name.
+        documentation : str
+            The HELP line of the metric.
+        labelnames : Sequence[str], optional
+            The label names of the metric. The default is ().
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self: object, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Returns the label values of a sample in the label names order."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError("%s expects the labels %s" % (
+                self.name, ', '.join(self.labelnames)))
+        return tuple(str(labels[label]) for label in self.labelnames)
+
+    def _labels(self: object, key: Tuple[str, ...], extra: str='') -> str:
+        """Formats the label set of a sample."""
+        pairs = ['%s="%s"' % (name, _escape(value))
+                 for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return '{%s}' % ','.join(pairs) if pairs else ''
+
+    def samples(self: object) -> List[str]:
+        """Returns the sample lines of the metric."""
+        raise NotImplementedError
+
+    def render(self: object, openmetrics: bool=False) -> str:
+        """Returns the metric family in the text exposition format, OpenMetrics
+        names counter families without their _total suffix."""
+        name = self.name
+        if openmetrics and self.kind == 'counter':
+            name = name[:-len('_total')]
+        lines = ['# HELP %s %s' % (name, self.documentation),
+                 '# TYPE %s %s' % (name, self.kind)]
+        return '\n'.join(lines + self.samples()) + '\n'
+
+class Counter(_Metric):
+    """A monotonically increasing counter, its name must end with _total."""
+    kind = 'counter'
+
+    def inc(self: object, amount: float=1, **labels: str) -> None:
+        """Increments the counter.
+
+        Parameters
+        ----------
+        amount : float, optional
+            The increment, it must not be negative. The default is 1.
+        **labels : str
+            The label values of the sample.
+
+        Returns
+        -------
+        None
+
+        """
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self: object, **labels: str) -> float:
+        """Returns the current value of a sample."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self: object) -> List[str]:
+        """Returns the sample lines of the metric."""
+        with self._lock:
+            return ['%s%s %s' % (self.name, self._labels(key),
+                                 _format_value(value))
+                    for key, value in sorted(self._values.items())]
+
+class Gauge(_Metric):
+    """A value that can go up and down, e.g; a queue depth."""
+    kind = 'gauge'
+
+    def set(self: object, value: float, **labels: str) -> None:
+        """Sets the gauge to a given value."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self: object, amount: float=1, **labels: str) -> None:
+        """Increments (or decrements with a negative amount) the gauge."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self: object, **labels: str) -> float:
+        """Returns the current value of a sample."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self: object) -> List[str]:
+        """Returns the sample lines of the metric."""
+        with self._lock:
+            return ['%s%s %s' % (self.name, self._labels(key),
+                                 _format_value(value))
+                    for key, value in sorted(self._values.items())]
+
+class Histogram(_Metric):
+    """A histogram with cumulative buckets, a sum and a count.
+
+    Attributes
+    ----------
+    buckets: Tuple[float]
+        The upper bounds of the buckets, +Inf is always added.
+    """
+    kind = 'histogram'
+
+    def __init__(self: object, name: str, documentation: str,
+                 labelnames: Sequence[str]=(),
+                 buckets: Sequence[float]=SECONDS_BUCKETS) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        name : str
+            The metric name.
+        documentation : str
+            The HELP line of the metric.
+        labelnames : Sequence[str], optional
+            The label names of the metric. The default is ().
+        buckets : Sequence[float], optional
+            The upper bounds of the buckets. The default is SECONDS_BUCKETS.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self: object, value: float, **labels: str) -> None:
+        """Adds an observation to the histogram.
+
+        Parameters
+        ----------
+        value : float
+            The observed value.
+        **labels : str
+            The label values of the sample.
+
+        Returns
+        -------
+        None
+
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self: object, **labels: str) -> int:
+        """Returns the number of observations of a sample."""
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0))
+            return counts[-1]
+
+    def samples(self: object) -> List[str]:
+        """Returns the bucket, sum and count lines of the metric."""
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                for bound, count in zip(self.buckets, counts):
+                    lines.append('%s_bucket%s %d' % (
+                        self.name, self._labels(
+                            key, 'le="%s"' % _format_value(bound)), count))
+                lines.append('%s_sum%s %s' % (self.name, self._labels(key),
+                                              _format_value(total)))
+                lines.append('%s_count%s %d' % (self.name, self._labels(key),
+                                                counts[-1]))
+        return lines
+
+class Registry:
+    """A collection of metrics that are rendered together.
+
+    Attributes
+    ----------
+    metrics: Dict[str, _Metric]
+        The registered metrics by name.
+    """
+
+    def __init__(self: object) -> None:
+        """Class constructor.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.metrics = {}
+        self.__lock = threading.Lock()
+
+    def register(self: object, metric: _Metric) -> _Metric:
+        """Registers a metric, names must be unique inside a registry.
+
+        Parameters
+        ----------
+        metric : _Metric
+            The metric to register.
+
+        Returns
+        -------
+        _Metric
+            The registered metric.
+
+        """
+        with self.__lock:
+            if metric.name in self.metrics:
+                raise ValueError("Duplicated metric %s" % metric.name)
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self: object, openmetrics: bool=False) -> str:
+        """Renders all the metrics in the text exposition format.
+
+        Parameters
+        ----------
+        openmetrics : bool, optional
+            Whether to terminate the exposition with the OpenMetrics EOF
+            marker. The default is False.
+
+        Returns
+        -------
+        str
+            The exposition text.
+
+        """
+        with self.__lock:
+            metrics = list(self.metrics.values())
+        text = ''.join(metric.render(openmetrics) for metric in metrics)
+        return text + '# EOF\n' if openmetrics else text
+
+REGISTRY = Registry()
+
+COMPRESSED_BYTES = REGISTRY.register(Counter(
+    'genomeencode_compressed_bytes_total',
+    'Bytes read by the encoders.', ['controller']))
+DECOMPRESSED_BYTES = REGISTRY.register(Counter(
+    'genomeencode_decompressed_bytes_total',
+    'Bytes written by the decoders.', ['controller']))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'genomeencode_stage_seconds',
+    'Wall time of every controller stage.', ['controller', 'stage']))
+COMPRESSION_RATIO = REGISTRY.register(Histogram(
+    'genomeencode_compression_ratio',
+    'Input size over output size of every encoding.', ['controller'],
+    RATIO_BUCKETS))
+ERRORS = REGISTRY.register(Counter(
+    'genomeencode_errors_total',
+    'Failed controller stages.', ['controller', 'stage']))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'genomeencode_queue_depth',
+    'Jobs or blocks waiting to be processed.', ['queue']))
+
+class PrometheusSink(MetricsSink):
+    """A metrics sink that updates the process-wide metrics of the module
+    from the stage events of the controllers.
+    """
+
+    def record(self: object, event: Dict) -> None:
+        """Updates the metrics with a stage event.
+
+        Parameters
+        ----------
+        event : Dict
+            The stage event.
+
+        Returns
+        -------
+        None
+
+        """
+        controller, stage = event['controller'], event['stage']
+        STAGE_SECONDS.observe(event['seconds'], controller=controller,
+                              stage=stage)
+        if 'queue_depth' in event:
+            QUEUE_DEPTH.set(event['queue_depth'], queue=controller)
+        if 'error' in event:
+            ERRORS.inc(controller=controller, stage=stage)
+            return
+        # the bytes of a run are counted once, by its outermost controller
+        if stage != 'total' or event.get('nested'):
+            return
+        if controller.endswith('Encoder'):
+            COMPRESSED_BYTES.inc(event['bytes_in'], controller=controller)
+            if event['bytes_out']:
+                COMPRESSION_RATIO.observe(
+                    event['bytes_in'] / event['bytes_out'],
+                    controller=controller)
+        elif controller.endswith('Decoder'):
+            DECOMPRESSED_BYTES.inc(event['bytes_out'], controller=controller)
+
+def install() -> PrometheusSink:
+    """Makes a PrometheusSink the process-wide default sink, so that every
+    controller created afterwards feeds the metrics of the module.
+
+    Returns
+    -------
+    PrometheusSink
+        The installed sink.
+
+    """
+    sink = PrometheusSink()
+    set_default_sink(sink)
+    return sink
+
+class _ExpositionHandler(BaseHTTPRequestHandler):
+    """Serves the exposition of a registry on /metrics."""
+    registry = REGISTRY
+
+    def do_GET(self: object) -> None:
+        """Answers a scrape."""
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        openmetrics = 'application/openmetrics-text' in \
+            self.headers.get('Accept', '')
+        body = self.registry.render(openmetrics).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', (
+            'application/openmetrics-text; version=1.0.0; charset=utf-8'
+            if openmetrics else 'text/plain; version=0.0.4; charset=utf-8'))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self: object, *args: object) -> None:
+        """Silences the request logging of the base handler."""
+
+def start_http_server(port: int=9464, addr: str='127.0.0.1',
+                      registry: Registry=REGISTRY) -> ThreadingHTTPServer:
+    """Serves the metrics on http://addr:port/metrics from a daemon thread.
+
+    Parameters
+    ----------
+    port : int, optional
+        The port to listen on, 0 picks a free one. The default is 9464.
+    addr : str, optional
+        The address to bind. The default is '127.0.0.1'.
+    registry : Registry, optional
+        The registry to expose. The default is REGISTRY.
+
+    Returns
+    -------
+    ThreadingHTTPServer
+        The running server, server_address holds the bound port and
+        shutdown() stops it.
+
+    """
+    handler = type('ExpositionHandler', (_ExpositionHandler,),
+                   {'registry': registry})
+    server = ThreadingHTTPServer((addr, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def write_textfile(path: str, registry: Registry=REGISTRY) -> None:
+    """Writes the exposition to a file atomically, for the node exporter
+    textfile collector (the file name must end with .prom).
+
+    Parameters
+    ----------
+    path : str
+        The path of the output file.
+    registry : Registry, optional
+        The registry to expose. The default is REGISTRY.
+
+    Returns
+    -------
+    None
+
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, tmp = tempfile.mkstemp(dir=directory, prefix='.genomeencode')
+    try:
+        with os.fdopen(handle, 'w', encoding='utf-8') as file:
+            file.write(registry.render())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+class TextfileWriter(threading.Thread):
+    """A daemon thread that periodically rewrites a textfile-collector file.
+
+    Attributes
+    ----------
+    path: str
+        The path of the output file.
+    interval: float
+        The number of seconds between two writes.
+    registry: Registry
+        The registry to expose.
+    """
+
+    def __init__(self: object, path: str, interval: float=15.0,
+                 registry: Registry=REGISTRY) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        path : str
+            The path of the output file.
+        interval : float, optional
+            The number of seconds between two writes. The default is 15.
+        registry : Registry, optional
+            The registry to expose. The default is REGISTRY.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        super().__init__(daemon=True)
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.__stopped = threading.Event()
+
+    def run(self: object) -> None:
+        """Writes the file every interval until stopped."""
+        while True:
+            write_textfile(self.path, self.registry)
+            if self.__stopped.wait(self.interval):
+                break
+
+    def stop(self: object) -> None:
+        """Stops the thread after a final write."""
+        self.__stopped.set()
+        self.join()
+        write_textfile(self.path, self.registry)
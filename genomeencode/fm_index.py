@@ -0,0 +1,416 @@
+# -*- coding: utf-8 -*-
+"""
+A persistent FM-index: the Burros-Wheeler transform of a text with its C
+array, occurrence checkpoints and a sampled suffix array, enough to count and
+locate patterns without the text. The index is saved to a versioned file of
+aligned arrays that is loaded with numpy.memmap, so loading costs nothing and
+the processes that search the same index share its pages in the page cache.
+"""
+from __future__ import absolute_import
+import json
+import struct
+from typing import Dict, List, Tuple, Union
+import numpy as np
+
+MAGIC = b'FMIX'
+VERSION = 1
+ALIGNMENT = 64
+
+def suffix_array(symbols: np.ndarray, known: int=1) -> np.ndarray:
+    """Builds the suffix array of a text by prefix doubling, like
+    BurrosWheeler.int_suffix_array but with numpy sorts.
+
+    Parameters
+    ----------
+    symbols : np.ndarray
+        The ranks of the text characters, ending with a unique smallest
+        sentinel.
+    known : int, optional
+        The number of characters of every suffix its rank already orders,
+        the doubling starts from there. The default is 1.
+
+    Returns
+    -------
+    np.ndarray
+        The starting index of every suffix, in lexicographical order.
+
+    """
+    length = len(symbols)
+    rank = symbols.astype(np.int64)
+    k = known
+    while True:
+        # a suffix shorter than k characters sorts before its extensions
+        second = np.zeros(length, dtype=np.int64)
+        if k < length:
+            second[:length - k] = rank[k:] + 1
+        top = int(rank.max()) + 2 if length else 1
+        if top < 1 << 31:
+            # a single key sorts several times faster than two
+            suff_arr = np.argsort(rank * top + second)
+        else:
+            suff_arr = np.lexsort((second, rank))
+        differ = (np.diff(rank[suff_arr]) != 0) | \
+            (np.diff(second[suff_arr]) != 0)
+        rank = np.empty(length, dtype=np.int64)
+        rank[suff_arr] = np.concatenate(([0], np.cumsum(differ)))
+        if length <= 1 or rank[suff_arr[-1]] == length - 1:
+            return suff_arr
+        k *= 2
+
+def text_ranks(text: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Converts a text to the ranks of its characters, followed by the
+    sentinel '$' of rank 0.
+
+    Parameters
+    ----------
+    text : str
+        The text, at most 255 distinct characters.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        The code point of every rank (the sentinel first) and the ranks of
+        the text characters and of the sentinel.
+
+    """
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+    alphabet, symbols = np.unique(codes, return_inverse=True)
+    if len(alphabet) > 255:
+        raise ValueError("The text has more than 255 distinct characters")
+    alphabet = np.concatenate(([ord('$')], alphabet)).astype(np.uint32)
+    return alphabet, np.concatenate((symbols.reshape(-1) + 1, [0]))
+
+class FMIndex:
+    """An FM-index over a text, the sentinel '$' is appended like in
+    BurrosWheeler.bwt_advanced. Characters are stored as their rank in the
+    alphabet, the sentinel is rank 0.
+
+    Attributes
+    ----------
+    alphabet: np.ndarray
+        The code point of every rank, the sentinel first.
+    bwt: np.ndarray
+        The ranks of the Burros-Wheeler transform (uint8).
+    counts: np.ndarray
+        The C array, the first row of every rank in the first column.
+    occurrences: np.ndarray
+        The occurrences of every rank before each checkpoint row.
+    marks: np.ndarray
+        1 for the rows whose suffix array value is sampled.
+    mark_ranks: np.ndarray
+        The number of marked rows before each checkpoint row.
+    samples: np.ndarray
+        The sampled suffix array values, in row order.
+    sample: int
+        The suffix array keeps the positions that are multiples of sample.
+    checkpoint: int
+        The distance between two checkpoint rows.
+    """
+    SAMPLE = 32
+    CHECKPOINT = 128
+    ARRAYS = ('alphabet', 'bwt', 'counts', 'occurrences', 'marks',
+              'mark_ranks', 'samples')
+
+    def __init__(self: object, arrays: Dict[str, np.ndarray], sample: int,
+                 checkpoint: int) -> None:
+        """Class constructor, see FMIndex.build and FMIndex.load.
+
+        Parameters
+        ----------
+        arrays : Dict[str, np.ndarray]
+            The arrays of the index, by attribute name.
+        sample : int
+            The suffix array sampling rate.
+        checkpoint : int
+            The distance between two checkpoint rows.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.sample = sample
+        self.checkpoint = checkpoint
+        self.ranks = {chr(code): rank for rank, code in
+                      enumerate(self.alphabet.tolist()) if rank}
+
+    def __len__(self: object) -> int:
+        """The number of rows, the text length plus the sentinel."""
+        return len(self.bwt)
+
+    @staticmethod
+    def build(text: str, sample: int=SAMPLE,
+              checkpoint: int=CHECKPOINT) -> object:
+        """Indexes a text.
+
+        Parameters
+        ----------
+        text : str
+            The text, at most 255 distinct characters.
+        sample : int, optional
+            The suffix array keeps one position in sample, locating an
+            occurrence takes up to sample LF steps. The default is 32.
+        checkpoint : int, optional
+            The distance between two occurrence checkpoints, counting takes up
+            to checkpoint comparisons per character. The default is 128.
+
+        Returns
+        -------
+        FMIndex
+            The index.
+
+        """
+        alphabet, symbols = text_ranks(text)
+        suff_arr = suffix_array(symbols)
+        # the character before every suffix, the sentinel before the text
+        bwt = symbols[suff_arr - 1].astype(np.uint8)
+        marks = suff_arr % sample == 0
+        return FMIndex.from_bwt(alphabet, bwt, marks, suff_arr[marks], sample,
+                                checkpoint)
+
+    @staticmethod
+    def from_bwt(alphabet: np.ndarray, bwt: np.ndarray, marks: np.ndarray,
+                 samples: np.ndarray, sample: int=SAMPLE,
+                 checkpoint: int=CHECKPOINT) -> object:
+        """Builds the occurrence checkpoints of a BWT that was built elsewhere,
+        e.g; the BWT of a read collection (see multi_bwt.MultiBWT).
+
+        Parameters
+        ----------
+        alphabet : np.ndarray
+            The code point of every rank, the sentinel first.
+        bwt : np.ndarray
+            The ranks of the BWT.
+        marks : np.ndarray
+            True for the rows whose position is sampled, every LF walk must
+            reach one within sample steps.
+        samples : np.ndarray
+            The position of every marked row, in row order.
+        sample : int, optional
+            The sampling rate of the positions. The default is 32.
+        checkpoint : int, optional
+            The distance between two occurrence checkpoints. The default is
+            128.
+
+        Returns
+        -------
+        FMIndex
+            The index.
+
+        """
+        sigma = len(alphabet)
+        bwt = bwt.astype(np.uint8)
+        frequencies = np.bincount(bwt, minlength=sigma)
+        counts = np.concatenate(([0], np.cumsum(frequencies))).astype(np.int64)
+        rows = np.arange(0, len(bwt) + 1, checkpoint)
+        occurrences = np.zeros((len(rows), sigma), dtype=np.int64)
+        for rank in range(sigma):
+            cumulative = np.concatenate(([0], np.cumsum(bwt == rank)))
+            occurrences[:, rank] = cumulative[rows]
+        marks = np.asarray(marks).astype(np.uint8)
+        mark_ranks = np.concatenate(([0], np.cumsum(marks)))[rows]
+        return FMIndex({'alphabet': np.asarray(alphabet, dtype=np.uint32),
+                        'bwt': bwt, 'counts': counts,
+                        'occurrences': occurrences, 'marks': marks,
+                        'mark_ranks': mark_ranks.astype(np.int64),
+                        'samples': np.asarray(samples, dtype=np.int64)},
+                       sample, checkpoint)
+
+    def save(self: object, path: str) -> None:
+        """Saves the index. The file starts with the magic bytes, the version
+        and the length of a JSON header that describes every array, the
+        arrays follow at aligned offsets.
+
+        Parameters
+        ----------
+        path : str
+            The path of the index file.
+
+        Returns
+        -------
+        None
+
+        """
+        arrays = [np.ascontiguousarray(getattr(self, name))
+                  for name in self.ARRAYS]
+        layout = {}
+        offset = 0
+        for name, array in zip(self.ARRAYS, arrays):
+            layout[name] = {'dtype': array.dtype.str, 'shape': array.shape,
+                            'offset': offset}
+            offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+        header = json.dumps({'sample': self.sample,
+                             'checkpoint': self.checkpoint,
+                             'arrays': layout}).encode('utf-8')
+        start = -(-(len(MAGIC) + 5 + len(header)) // ALIGNMENT) * ALIGNMENT
+        with open(path, 'wb') as file:
+            file.write(MAGIC + struct.pack('<BI', VERSION, len(header)))
+            file.write(header)
+            for name, array in zip(self.ARRAYS, arrays):
+                file.seek(start + layout[name]['offset'])
+                file.write(array.tobytes())
+            file.truncate(start + offset)
+
+    @staticmethod
+    def load(path: str) -> object:
+        """Maps an index file in memory, read-only.
+
+        Parameters
+        ----------
+        path : str
+            The path of the index file.
+
+        Returns
+        -------
+        FMIndex
+            The index, its arrays are numpy.memmap views of the file.
+
+        """
+        with open(path, 'rb') as file:
+            start = file.read(9)
+            if len(start) < 9 or start[:4] != MAGIC:
+                raise ValueError("%s is not an FM-index file" % path)
+            _, version, size = struct.unpack('<4sBI', start)
+            if version != VERSION:
+                raise ValueError("Unsupported FM-index version %d" % version)
+            header = json.loads(file.read(size).decode('utf-8'))
+        start = -(-(9 + size) // ALIGNMENT) * ALIGNMENT
+        arrays = {}
+        for name, layout in header['arrays'].items():
+            shape = tuple(layout['shape'])
+            if np.prod(shape) == 0: # numpy cannot map an empty array
+                arrays[name] = np.zeros(shape, dtype=layout['dtype'])
+                continue
+            arrays[name] = np.memmap(path, dtype=layout['dtype'], mode='r',
+                                     offset=start + layout['offset'],
+                                     shape=shape)
+        return FMIndex(arrays, header['sample'], header['checkpoint'])
+
+    def occ(self: object, rank: Union[int, np.ndarray],
+            row: Union[int, np.ndarray]) -> np.ndarray:
+        """Counts the occurrences of ranks in the BWT before rows.
+
+        Parameters
+        ----------
+        rank : Union[int, np.ndarray]
+            The rank of the characters.
+        row : Union[int, np.ndarray]
+            The rows, between 0 and len(self).
+
+        Returns
+        -------
+        np.ndarray
+            The occurrences of every rank before its row.
+
+        """
+        rank = np.asarray(rank, dtype=np.int64)
+        row = np.asarray(row, dtype=np.int64)
+        block = row // self.checkpoint
+        base = block * self.checkpoint
+        window = base[..., None] + np.arange(self.checkpoint)
+        found = (self.bwt[np.minimum(window, len(self.bwt) - 1)] ==
+                 rank[..., None]) & (window < row[..., None])
+        return self.occurrences[block, rank] + found.sum(axis=-1)
+
+    def lf(self: object, row: np.ndarray) -> np.ndarray:
+        """The Last-to-First mapping of rows, see BurrosWheeler.lf_mapping.
+
+        Parameters
+        ----------
+        row : np.ndarray
+            The rows.
+
+        Returns
+        -------
+        np.ndarray
+            The row of the suffix that starts one character before.
+
+        """
+        rank = self.bwt[row].astype(np.int64)
+        return self.counts[rank] + self.occ(rank, row)
+
+    def backward_search(self: object, pattern: str) -> Tuple[int, int]:
+        """Finds the rows of the suffixes that start with a pattern.
+
+        Parameters
+        ----------
+        pattern : str
+            The pattern.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The first row and the row after the last one, equal when the
+            pattern does not occur.
+
+        """
+        low, high = 0, len(self.bwt)
+        for char in reversed(pattern):
+            rank = self.ranks.get(char)
+            if rank is None:
+                return 0, 0
+            low, high = (int(self.counts[rank] + occ) for occ in
+                         self.occ(np.array([rank, rank]),
+                                  np.array([low, high])))
+            if low >= high:
+                return 0, 0
+        return low, high
+
+    def count(self: object, pattern: str) -> int:
+        """Counts the occurrences of a pattern in the text."""
+        low, high = self.backward_search(pattern)
+        return high - low
+
+    def locate_rows(self: object, rows: np.ndarray) -> np.ndarray:
+        """Finds the text positions of rows, walking LF to a sampled row.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            The rows.
+
+        Returns
+        -------
+        np.ndarray
+            The suffix array value of every row.
+
+        """
+        rows = np.asarray(rows, dtype=np.int64).copy()
+        steps = np.zeros(len(rows), dtype=np.int64)
+        positions = np.empty(len(rows), dtype=np.int64)
+        waiting = np.arange(len(rows))
+        while len(waiting):
+            current = rows[waiting]
+            marked = self.marks[current].astype(bool)
+            done, current = waiting[marked], current[marked]
+            block = current // self.checkpoint
+            window = block[:, None] * self.checkpoint + \
+                np.arange(self.checkpoint)
+            before = (self.marks[np.minimum(window, len(self.marks) - 1)]
+                      .astype(bool) & (window < current[:, None])).sum(axis=1)
+            positions[done] = self.samples[self.mark_ranks[block] + before] + \
+                steps[done]
+            waiting = waiting[~marked]
+            rows[waiting] = self.lf(rows[waiting])
+            steps[waiting] += 1
+        return positions
+
+    def locate(self: object, pattern: str) -> List[int]:
+        """Finds the positions of a pattern in the text.
+
+        Parameters
+        ----------
+        pattern : str
+            The pattern.
+
+        Returns
+        -------
+        List[int]
+            The sorted starting positions of its occurrences.
+
+        """
+        low, high = self.backward_search(pattern)
+        return sorted(self.locate_rows(np.arange(low, high)).tolist())
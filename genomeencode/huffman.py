@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
-"""Huffman coding algorithm classes, contains node and tree separate classes."""
+"""Huffman coding algorithm classes, contains node and tree separate classes
+as well as the multiple tables variant."""
 from __future__ import absolute_import
-from typing import Dict
+import heapq
+import struct
+import zlib
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+from genomeencode.progress import report
 
 class HuffmanNode:
     """A class to represent heap nodes of a huffman coding tree.
@@ -146,6 +152,11 @@ class HuffmanTree:
         to the end of sequence until it was divisible by 8 (coding in 8 bits).
 
     """
+    # the longest codes decoded with a single lookup table
+    TABLE_BITS = 16
+    # binstr_to_seq reports its progress every REPORT_EVERY characters
+    REPORT_EVERY = 1 << 16
+
     def __init__(self: object, sequence: str) -> None:
         """The class constructor.
 
@@ -345,9 +356,106 @@ class HuffmanTree:
         return bin_str[:-pad] # take all the sequence without the padding
 
     @staticmethod
-    def binstr_to_seq(bin_str: str, codes: Dict[str, str]) -> str:
+    def package_merge(weights: List[int], max_length: int) -> List[int]:
+        """The package-merge algorithm, it finds the optimal code lengths of
+        a prefix code whose codes are not longer than a maximum length.
+
+        Parameters
+        ----------
+        weights : List[int]
+            The (positive) frequency of every symbol.
+        max_length : int
+            The maximum length of a code.
+
+        Returns
+        -------
+        List[int]
+            The code length of every symbol.
+
+        """
+        if len(weights) == 1:
+            return [1]
+        if len(weights) > 1 << max_length:
+            raise ValueError("%d symbols do not fit in codes of %d bits" % (
+                len(weights), max_length))
+        # every item is a (weight, symbols) pair, a package holds the symbols
+        # of both its items, a symbol gets one more bit per selected item
+        leaves = sorted((weight, [symbol])
+                        for symbol, weight in enumerate(weights))
+        items = leaves
+        for _ in range(max_length - 1):
+            packages = [(first[0] + second[0], first[1] + second[1])
+                        for first, second in zip(items[0::2], items[1::2])]
+            items = list(heapq.merge(leaves, packages, key=lambda x: x[0]))
+        lengths = [0] * len(weights)
+        for _, symbols in items[:2 * len(weights) - 2]:
+            for symbol in symbols:
+                lengths[symbol] += 1
+        return lengths
+
+    @staticmethod
+    def limited_codes(frequency: Dict[str, int],
+                      max_length: int) -> Dict[str, str]:
+        """Builds canonical Huffman codes that are not longer than a maximum
+        length (package-merge), an alternative to the tree paths of
+        get_codings when the frequencies are very skewed (long N runs, rare
+        IUPAC symbols).
+
+        Parameters
+        ----------
+        frequency : Dict[str, int]
+            The frequency of every character, see freq_dict.
+        max_length : int
+            The maximum length of a code.
+
+        Returns
+        -------
+        Dict[str, str]
+            The codes dictionary, characters alongside their paths.
+
+        """
+        chars = sorted(frequency)
+        lengths = HuffmanTree.package_merge(
+            [frequency[char] for char in chars], max_length)
+        codes = MultiHuffman.canonical_codes(np.array(lengths))
+        return {char: '{:0{}b}'.format(int(code), length)
+                for char, code, length in zip(chars, codes, lengths)}
+
+    @staticmethod
+    def decoding_table(codes: Dict[str, str]) -> Tuple[int, List[str]]:
+        """Builds a single-level lookup table of a codes dictionary: the
+        entry of every window of width bits is the character whose code
+        starts the window, with the length of the code.
+
+        Parameters
+        ----------
+        codes : Dict[str, str]
+            A dictionary of characters alongside their paths, the padding
+            entry is ignored.
+
+        Returns
+        -------
+        Tuple[int, List[str]]
+            The width of a window and the table, None for windows that start
+            with no code.
+
+        """
+        paths = {char: path for char, path in codes.items() if char != 'pad'}
+        width = max([len(path) for path in paths.values()], default=0)
+        table = [None] * (1 << width)
+        for char, path in paths.items():
+            spread = 1 << (width - len(path))
+            start = int(path, 2) * spread if path else 0
+            table[start:start + spread] = [(char, len(path))] * spread
+        return width, table
+
+    @staticmethod
+    def binstr_to_seq(bin_str: str, codes: Dict[str, str], count: int=None,
+                      progress: Callable[[float], None]=None) -> str:
         """Transforms a binary string to a sequence given a codes dictionary
-        of paths.
+        of paths. Codes up to TABLE_BITS bits long are decoded with a single
+        lookup table (see decoding_table), longer codes are matched bit by
+        bit.
 
         Parameters
         ----------
@@ -355,6 +463,12 @@ class HuffmanTree:
             The binary string to be transformed.
         codes : Dict[str, str]
             A dictionary of characters alongside their paths.
+        count : int, optional
+            The number of characters to decode, the rest of the binary string
+            is ignored. The default is None, i.e; the whole string.
+        progress : Callable[[float], None], optional
+            The progress callback, it receives the fraction of the binary
+            string read every REPORT_EVERY characters. The default is None.
 
         Returns
         -------
@@ -362,18 +476,41 @@ class HuffmanTree:
             The original sequence.
 
         """
+        paths = {path: char for char, path in codes.items() if char != 'pad'}
+        if len(paths) == 1 and '' in paths: # a single character, no bits
+            return ''
+        width, table = HuffmanTree.decoding_table(codes) \
+            if max(map(len, paths), default=0) <= HuffmanTree.TABLE_BITS \
+            else (0, None)
+
+        if count is None:
+            count = len(bin_str)
+        original_seq = []
+        if table is not None:
+            padded = bin_str + '0' * width
+            position = 0
+            while position < len(bin_str) and len(original_seq) < count:
+                chunk = min(count,
+                            len(original_seq) + HuffmanTree.REPORT_EVERY)
+                while position < len(bin_str) and len(original_seq) < chunk:
+                    char, length = table[int(padded[position:position + width],
+                                             2)]
+                    original_seq.append(char)
+                    position += length
+                report(progress, min(position / len(bin_str), 1.0))
+            return ''.join(original_seq)
 
-        original_seq = ""
         reading_stream = ""
-        for num in bin_str:
+        for position, num in enumerate(bin_str):
+            if position % HuffmanTree.REPORT_EVERY == 0:
+                report(progress, position / len(bin_str))
             reading_stream += num
-            for char, path in codes.items():
-                if path == reading_stream:
-                    original_seq += char
-                    reading_stream = ""
+            if reading_stream in paths:
+                original_seq.append(paths[reading_stream])
+                reading_stream = ""
+                if len(original_seq) == count:
                     break
-
-        return original_seq
+        return ''.join(original_seq)
 
     def codes_to_header(self: object) -> str:
         """This method transforms the codes of a given Huffman tree object
@@ -414,3 +551,645 @@ class HuffmanTree:
             char, path = code.split(",")
             reconstructed_codes[char] = path
         return reconstructed_codes
+
+class SyncIndex:
+    """A sync point index of a stream coded with a single HuffmanTree: the
+    bit offset of every EVERY-th character. The stream can then be cut at the
+    sync points and its pieces decoded independently, e.g; on several
+    processes, or a region decoded from the sync point before it.
+
+    The index is saved next to the compressed file (see SIDECAR), with the
+    magic bytes, the version, the interval, the number of characters and of
+    bits of the stream and the CRC-32 of its 8-bits characters followed by
+    the offsets as 64 bits integers.
+
+    Attributes
+    ----------
+    every: int
+        The number of characters between two sync points.
+    symbols: int
+        The number of characters of the stream.
+    bits: int
+        The number of bits of the stream, without the padding.
+    crc: int
+        The CRC-32 of the 8-bits characters of the stream, an index only
+        matches the stream it was built for.
+    offsets: np.ndarray
+        The bit offset of characters 0, every, 2 * every...
+    """
+    MAGIC = b'HIDX'
+    VERSION = 1
+    HEADER = struct.Struct('<4sBQQQI')
+    EVERY = 1 << 16
+    SIDECAR = '.idx'
+
+    def __init__(self: object, every: int, symbols: int, bits: int,
+                 crc: int, offsets: np.ndarray) -> None:
+        """Class constructor, see SyncIndex.build and SyncIndex.load.
+
+        Parameters
+        ----------
+        every : int
+            The number of characters between two sync points.
+        symbols : int
+            The number of characters of the stream.
+        bits : int
+            The number of bits of the stream.
+        crc : int
+            The CRC-32 of the 8-bits characters of the stream.
+        offsets : np.ndarray
+            The bit offset of every sync point.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.every = every
+        self.symbols = symbols
+        self.bits = bits
+        self.crc = crc
+        self.offsets = offsets
+
+    def __len__(self: object) -> int:
+        """The number of sync points."""
+        return len(self.offsets)
+
+    @staticmethod
+    def checksum(unicode: str) -> int:
+        """The CRC-32 of the 8-bits characters of a stream."""
+        return zlib.crc32(unicode.encode('latin-1'))
+
+    def matches(self: object, unicode: str, padding: int) -> bool:
+        """Whether the index was built for a stream.
+
+        Parameters
+        ----------
+        unicode : str
+            The 8-bits characters of the stream.
+        padding : int
+            The number of padding bits of the stream.
+
+        Returns
+        -------
+        bool
+            True when the number of bits and the CRC-32 of the stream are
+            the ones of the index.
+
+        """
+        return self.bits == 8 * len(unicode) - padding and \
+            self.crc == SyncIndex.checksum(unicode)
+
+    @staticmethod
+    def build(sequence: str, codes: Dict[str, str], unicode: str,
+              every: int=EVERY) -> object:
+        """Indexes the stream of a sequence coded with a codes dictionary.
+
+        Parameters
+        ----------
+        sequence : str
+            The coded sequence.
+        codes : Dict[str, str]
+            The codes dictionary, characters alongside their paths.
+        unicode : str
+            The 8-bits characters of the stream, see
+            HuffmanTree.binstr_to_unicode.
+        every : int, optional
+            The number of characters between two sync points. The default is
+            EVERY.
+
+        Returns
+        -------
+        SyncIndex
+            The index.
+
+        """
+        if every <= 0:
+            raise ValueError("The sync interval must be positive")
+        points = np.frombuffer(sequence.encode('utf-32-le'), dtype='<u4')
+        chars = sorted(char for char in codes if char != 'pad')
+        code_points = np.array([ord(char) for char in chars], dtype=np.uint32)
+        lengths = np.array([len(codes[char]) for char in chars],
+                           dtype=np.int64)
+        bits = lengths[np.searchsorted(code_points, points)] \
+            if len(points) else np.zeros(0, dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(bits)))
+        return SyncIndex(every, len(points), int(offsets[-1]),
+                         SyncIndex.checksum(unicode),
+                         offsets[:-1][::every].astype(np.int64))
+
+    def save(self: object, path: str) -> None:
+        """Writes the index to a file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the index, usually the compressed file path followed
+            by SIDECAR.
+
+        Returns
+        -------
+        None
+
+        """
+        with open(path, 'wb') as file:
+            file.write(SyncIndex.HEADER.pack(
+                SyncIndex.MAGIC, SyncIndex.VERSION, self.every, self.symbols,
+                self.bits, self.crc))
+            file.write(self.offsets.astype('<u8').tobytes())
+
+    @staticmethod
+    def load(path: str) -> object:
+        """Reads an index file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the index.
+
+        Returns
+        -------
+        SyncIndex
+            The index.
+
+        """
+        with open(path, 'rb') as file:
+            data = file.read()
+        if len(data) < SyncIndex.HEADER.size or \
+                not data.startswith(SyncIndex.MAGIC):
+            raise ValueError("%s is not a sync point index" % path)
+        _, version, every, symbols, bits, crc = \
+            SyncIndex.HEADER.unpack_from(data)
+        if version != SyncIndex.VERSION:
+            raise ValueError("Unsupported sync point index version %d" %
+                             version)
+        # one offset per sync point of the characters
+        if not every or len(data) - SyncIndex.HEADER.size != \
+                8 * -(-symbols // every):
+            raise ValueError("%s is a truncated sync point index" % path)
+        offsets = np.frombuffer(data, dtype='<u8',
+                                offset=SyncIndex.HEADER.size)
+        return SyncIndex(every, symbols, bits, crc,
+                         offsets.astype(np.int64))
+
+    def segments(self: object) -> List[Tuple[int, int, int]]:
+        """Cuts the stream at the sync points.
+
+        Returns
+        -------
+        List[Tuple[int, int, int]]
+            The first bit, the bit after the last one and the number of
+            characters of every piece.
+
+        """
+        stops = self.offsets[1:].tolist() + [self.bits]
+        return [(start, stop, min(self.every, self.symbols - number *
+                                  self.every))
+                for number, (start, stop) in enumerate(
+                    zip(self.offsets.tolist(), stops))]
+
+    @staticmethod
+    def decode_segment(unicode: str, skip: int, count: int,
+                       codes: Dict[str, str]) -> str:
+        """Decodes a piece of a stream, from its 8-bits characters.
+
+        Parameters
+        ----------
+        unicode : str
+            The 8-bits characters that hold the piece.
+        skip : int
+            The number of bits of the first character before the piece.
+        count : int
+            The number of characters of the piece.
+        codes : Dict[str, str]
+            The codes dictionary.
+
+        Returns
+        -------
+        str
+            The decoded characters.
+
+        """
+        bin_str = HuffmanTree.unicode_to_binstr(unicode)[skip:]
+        return HuffmanTree.binstr_to_seq(bin_str, codes, count)
+
+    def piece(self: object, unicode: str, start: int,
+              stop: int) -> Tuple[str, int]:
+        """The 8-bits characters of the stream between two bits.
+
+        Parameters
+        ----------
+        unicode : str
+            The 8-bits characters of the whole stream.
+        start : int
+            The first bit.
+        stop : int
+            The bit after the last one.
+
+        Returns
+        -------
+        Tuple[str, int]
+            The characters and the number of bits of the first one before
+            start.
+
+        """
+        return unicode[start // 8:-(-stop // 8)], start % 8
+
+    def extract(self: object, unicode: str, codes: Dict[str, str],
+                start: int, stop: int) -> str:
+        """Decodes a region of the stream from the sync point before it.
+
+        Parameters
+        ----------
+        unicode : str
+            The 8-bits characters of the whole stream.
+        codes : Dict[str, str]
+            The codes dictionary.
+        start : int
+            The first character of the region.
+        stop : int
+            The character after the region.
+
+        Returns
+        -------
+        str
+            The characters of the region.
+
+        """
+        start, stop, _ = slice(start, stop).indices(self.symbols)
+        if start >= stop:
+            return ''
+        point = start // self.every
+        last = (stop - 1) // self.every + 1
+        end = int(self.offsets[last]) if last < len(self) else self.bits
+        piece, skip = self.piece(unicode, int(self.offsets[point]), end)
+        first = point * self.every
+        region = SyncIndex.decode_segment(piece, skip, stop - first, codes)
+        return region[start - first:]
+
+class MultiHuffman:
+    """A class to represent bzip2-style Huffman coding with several code
+    tables, all methods are static like in BurrosWheeler.
+
+    A block is cut into groups of GROUP symbols and every group is coded with
+    the table that codes it in the fewest bits, so that local changes of
+    composition (GC-rich islands, repeats) get their own codes. Tables are
+    trained by iterative refinement and stored as canonical code lengths,
+    the table of each group (its selector) is move-to-front and unary coded.
+    The decoder peeks a fixed window of bits at every symbol and looks the
+    symbol and the code length up in the table of the current group, the
+    windows of a slice of the stream are peeked at once.
+    """
+    MAGIC = b'MHUF'
+    VERSION = 1
+    HEADER = struct.Struct('<4sBHHQ')
+    BLOCK = struct.Struct('<BQQQ')
+    GROUP = 50
+    MAX_TABLES = 6
+    ITERATIONS = 4
+    # the decoder looks every code up in a single table of 2^max_length
+    # entries, so codes are not longer than HuffmanTree.TABLE_BITS
+    MAX_LENGTH = HuffmanTree.TABLE_BITS
+    BLOCK_SIZE = 900000
+    # the number of bit positions of the stream peeked at once
+    SLICE_BITS = 1 << 16
+
+    @staticmethod
+    def code_lengths(counts: np.ndarray, limit: int) -> np.ndarray:
+        """Computes the optimal code length of every symbol with codes no
+        longer than the limit (see HuffmanTree.package_merge).
+
+        Parameters
+        ----------
+        counts : np.ndarray
+            The number of occurrences of every symbol, zero counts get a code
+            anyway.
+        limit : int
+            The maximum length of a code.
+
+        Returns
+        -------
+        np.ndarray
+            The code length of every symbol.
+
+        """
+        weights = [max(int(count), 0) + 1 for count in counts]
+        return np.array(HuffmanTree.package_merge(weights, limit),
+                        dtype=np.int64)
+
+    @staticmethod
+    def canonical_codes(lengths: np.ndarray) -> np.ndarray:
+        """Assigns canonical codes to code lengths: shorter codes come first
+        and codes of the same length follow the symbol order.
+
+        Parameters
+        ----------
+        lengths : np.ndarray
+            The code length of every symbol.
+
+        Returns
+        -------
+        np.ndarray
+            The code of every symbol.
+
+        """
+        codes = np.zeros(len(lengths), dtype=np.int64)
+        code = 0
+        previous = 0
+        for symbol in np.lexsort((np.arange(len(lengths)), lengths)):
+            code <<= int(lengths[symbol]) - previous
+            previous = int(lengths[symbol])
+            codes[symbol] = code
+            code += 1
+        return codes
+
+    @staticmethod
+    def train(groups: np.ndarray, tables: int,
+              max_length: int=MAX_LENGTH) -> Tuple[np.ndarray, np.ndarray]:
+        """Trains code tables on the symbol counts of the groups of a block:
+        like in bzip2 every table starts by favouring its own range of the
+        alphabet (ranges of about the same frequency), then every table is
+        rebuilt from the groups it codes best, a few times over.
+
+        Parameters
+        ----------
+        groups : np.ndarray
+            The symbol counts of every group, one line per group.
+        tables : int
+            The number of tables.
+        max_length : int, optional
+            The maximum length of a code. The default is 16.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The code lengths of every table (one line per table) and the
+            selector of every group.
+
+        """
+        totals = groups.sum(axis=0)
+        ranges = np.cumsum(totals) - totals / 2
+        ranges = np.minimum(ranges * tables // max(totals.sum(), 1),
+                            tables - 1).astype(np.int64)
+        lengths = np.where(ranges[None, :] == np.arange(tables)[:, None], 0,
+                           max_length)
+        for _ in range(MultiHuffman.ITERATIONS):
+            selectors = (groups @ lengths.T).argmin(axis=1)
+            lengths = np.array([MultiHuffman.code_lengths(
+                groups[selectors == table].sum(axis=0), max_length)
+                                for table in range(tables)])
+        return lengths, (groups @ lengths.T).argmin(axis=1)
+
+    @staticmethod
+    def pack_selectors(selectors: np.ndarray, tables: int) -> bytes:
+        """Stores selectors compactly: move-to-front then unary coding, a
+        selector that repeats the previous one costs a single bit.
+
+        Parameters
+        ----------
+        selectors : np.ndarray
+            The table of every group.
+        tables : int
+            The number of tables.
+
+        Returns
+        -------
+        bytes
+            The packed selectors.
+
+        """
+        order = list(range(tables))
+        bits = []
+        for selector in selectors.tolist():
+            rank = order.index(selector)
+            order.insert(0, order.pop(rank))
+            bits.extend([1] * rank + [0])
+        return np.packbits(np.array(bits, dtype=np.uint8)).tobytes()
+
+    @staticmethod
+    def unpack_selectors(data: bytes, count: int,
+                         tables: int) -> List[int]:
+        """Reads the selectors stored with MultiHuffman.pack_selectors.
+
+        Parameters
+        ----------
+        data : bytes
+            The packed selectors.
+        count : int
+            The number of groups.
+        tables : int
+            The number of tables.
+
+        Returns
+        -------
+        List[int]
+            The table of every group.
+
+        """
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+        ends = np.flatnonzero(bits == 0)[:count]
+        ranks = np.diff(ends, prepend=-1) - 1
+        order = list(range(tables))
+        selectors = []
+        for rank in ranks.tolist():
+            selector = order.pop(rank)
+            order.insert(0, selector)
+            selectors.append(selector)
+        return selectors
+
+    @staticmethod
+    def encode_block(symbols: np.ndarray, size: int, tables: int,
+                     max_length: int=MAX_LENGTH) -> bytes:
+        """Codes a block of symbols.
+
+        Parameters
+        ----------
+        symbols : np.ndarray
+            The symbol indexes of the block.
+        size : int
+            The size of the alphabet.
+        tables : int
+            The maximum number of tables.
+        max_length : int, optional
+            The maximum length of a code, the decoding lookup tables have
+            2^max_length entries at most. The default is 16.
+
+        Returns
+        -------
+        bytes
+            The coded block, with its own header.
+
+        """
+        group_of = np.arange(len(symbols)) // MultiHuffman.GROUP
+        count = int(group_of[-1]) + 1
+        groups = np.bincount(group_of * size + symbols,
+                             minlength=count * size).reshape(count, size)
+        # bzip2 uses fewer tables for small blocks, tables cost their lengths
+        tables = max(1, min(tables, 2 + sum(len(symbols) >= limit for limit
+                                            in (200, 600, 1200, 2400))))
+        lengths, selectors = MultiHuffman.train(groups, tables, max_length)
+        codes = np.array([MultiHuffman.canonical_codes(line)
+                          for line in lengths])
+
+        table_of = selectors[group_of]
+        code = codes[table_of, symbols]
+        length = lengths[table_of, symbols]
+        # spread every code over its bits, most significant bit first
+        owner = np.repeat(np.arange(len(symbols)), length)
+        offset = np.arange(len(owner)) - np.repeat(np.cumsum(length) - length,
+                                                   length)
+        bits = (code[owner] >> (length[owner] - 1 - offset)) & 1
+        stream = np.packbits(bits.astype(np.uint8)).tobytes()
+        packed = MultiHuffman.pack_selectors(selectors, tables)
+        return b''.join([MultiHuffman.BLOCK.pack(tables, len(symbols),
+                                                 len(packed), len(stream)),
+                         lengths.astype(np.uint8).tobytes(), packed, stream])
+
+    @staticmethod
+    def decode_block(data: bytes, offset: int,
+                     size: int) -> Tuple[List[int], int]:
+        """Decodes a block coded with MultiHuffman.encode_block.
+
+        Parameters
+        ----------
+        data : bytes
+            The coded sequence.
+        offset : int
+            The offset of the block in the coded sequence.
+        size : int
+            The size of the alphabet.
+
+        Returns
+        -------
+        Tuple[List[int], int]
+            The symbol indexes of the block and the offset of the next block.
+
+        """
+        tables, length, packed, stream = MultiHuffman.BLOCK.unpack_from(
+            data, offset)
+        offset += MultiHuffman.BLOCK.size
+        lengths = np.frombuffer(data, np.uint8, tables * size,
+                                offset).astype(np.int64).reshape(tables, size)
+        offset += tables * size
+        count = -(-length // MultiHuffman.GROUP)
+        selectors = MultiHuffman.unpack_selectors(
+            data[offset:offset + packed], count, tables)
+        offset += packed
+        # the big-endian 32 bits word that starts at every byte, a window
+        # of at most MAX_LENGTH bits is peeked from the word of its first byte
+        padded = np.zeros(stream + 4, dtype=np.uint64)
+        padded[:stream] = np.frombuffer(data, np.uint8, stream, offset)
+        words = (padded[:-3] << np.uint64(24)) | \
+            (padded[1:-2] << np.uint64(16)) | \
+            (padded[2:-1] << np.uint64(8)) | padded[3:]
+        offset += stream
+        width = int(lengths.max())
+
+        # one lookup table per code table: window -> symbol << 5 | length
+        lookups = np.zeros((tables, 1 << width), dtype=np.int64)
+        for table, line in enumerate(lengths):
+            codes = MultiHuffman.canonical_codes(line)
+            spans = 1 << (width - line)
+            starts = np.repeat(codes << (width - line), spans)
+            lookups[table, starts + np.arange(len(starts)) -
+                    np.repeat(np.cumsum(spans) - spans, spans)] = \
+                np.repeat((np.arange(size) << 5) | line, spans)
+        lookups = lookups.tolist()
+
+        symbols = []
+        append = symbols.append
+        position = 0
+        remaining = length
+        # a slice always holds a whole group
+        span = max(MultiHuffman.SLICE_BITS, MultiHuffman.GROUP * width)
+        base, end = 0, -1
+        for selector in selectors:
+            steps = min(MultiHuffman.GROUP, remaining)
+            if position + steps * width > end:
+                base, end = position, position + span
+                positions = np.arange(base, min(end, 8 * stream),
+                                      dtype=np.uint64)
+                windows = (((words[positions >> np.uint64(3)] <<
+                             (positions & np.uint64(7))) &
+                            np.uint64(0xffffffff)) >>
+                           np.uint64(32 - width)).tolist()
+            lookup = lookups[selector]
+            at = position - base
+            for _ in range(steps):
+                entry = lookup[windows[at]]
+                append(entry >> 5)
+                at += entry & 31
+            position = base + at
+            remaining -= MultiHuffman.GROUP
+        return symbols, offset
+
+    @staticmethod
+    def encode(sequence: str, tables: int=MAX_TABLES,
+               max_length: int=MAX_LENGTH) -> bytes:
+        """Encodes a sequence with multiple Huffman tables.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence to be coded.
+        tables : int, optional
+            The maximum number of tables of a block. The default is 6.
+        max_length : int, optional
+            The maximum length of a code. The default is 16.
+
+        Returns
+        -------
+        bytes
+            The coded sequence, a self-describing binary container.
+
+        """
+        if not 1 <= tables <= 255:
+            raise ValueError("The number of tables must be between 1 and 255")
+        if not 1 <= max_length <= MultiHuffman.MAX_LENGTH:
+            raise ValueError("The maximum code length must be between 1 and "
+                             "%d" % MultiHuffman.MAX_LENGTH)
+        points = np.frombuffer(sequence.encode('utf-32-le'), dtype='<u4')
+        alphabet, symbols = np.unique(points, return_inverse=True)
+        symbols = symbols.astype(np.int64).ravel()
+        blocks = [MultiHuffman.HEADER.pack(MultiHuffman.MAGIC,
+                                           MultiHuffman.VERSION,
+                                           MultiHuffman.GROUP, len(alphabet),
+                                           len(symbols)),
+                  alphabet.astype('<u4').tobytes()]
+        for start in range(0, len(symbols), MultiHuffman.BLOCK_SIZE):
+            blocks.append(MultiHuffman.encode_block(
+                symbols[start:start + MultiHuffman.BLOCK_SIZE], len(alphabet),
+                tables, max_length))
+        return b''.join(blocks)
+
+    @staticmethod
+    def decode(data: bytes) -> str:
+        """Decodes a sequence coded with MultiHuffman.encode.
+
+        Parameters
+        ----------
+        data : bytes
+            The coded sequence.
+
+        Returns
+        -------
+        str
+            The original sequence.
+
+        """
+        magic, version, group, size, length = \
+            MultiHuffman.HEADER.unpack_from(data)
+        if magic != MultiHuffman.MAGIC or version != MultiHuffman.VERSION or \
+                group != MultiHuffman.GROUP:
+            raise ValueError("Not a multiple tables Huffman stream")
+        offset = MultiHuffman.HEADER.size
+        alphabet = np.frombuffer(data, '<u4', size, offset)
+        offset += 4 * size
+        symbols = []
+        while len(symbols) < length:
+            block, offset = MultiHuffman.decode_block(data, offset, size)
+            symbols.extend(block)
+        points = alphabet[np.array(symbols, dtype=np.int64)] if symbols else \
+            np.zeros(0, dtype='<u4')
+        return points.astype('<u4').tobytes().decode('utf-32-le')
@@ -3,13 +3,154 @@
 """View architecture of the main application, i.e; a GUI."""
 from __future__ import absolute_import
 import os
+import queue
+import threading
+from functools import partial
 from tkinter import Tk, Toplevel, filedialog, Menu, messagebox, ttk
-from tkinter import Label, Entry, Button, StringVar, Text, Scrollbar
-from tkinter import RIGHT, Y, X,  HORIZONTAL, BOTTOM, NONE, END
-from typing import Iterator, Generator
+from tkinter import Label, Entry, Button, StringVar, Text, Scrollbar, Frame
+from tkinter import RIGHT, LEFT, TOP, X, HORIZONTAL, NONE, END
+from typing import Callable, Iterator, Generator, Union
 from genomeencode.sequence import Sequence
 from genomeencode.decoder import HuffDecoder, BWDecoder, FullDecoder
 from genomeencode.encoder import HuffEncoder, BWEncoder, FullEncoder
+from genomeencode.trace import EncodeTrace, DecodeTrace, LazyMatrix
+from genomeencode.progress import Cancelled
+
+class MatrixView(Frame):
+    """A scrollable Text widget that only holds the visible window of a
+    matrix, the window is rendered again from a LazyMatrix on every scroll so
+    that huge matrices never reach Tk as a whole.
+
+    Attributes
+    ----------
+    matrix: LazyMatrix
+        The matrix that is shown.
+    top: int
+        The first visible line of the matrix.
+    left: int
+        The first visible column of the matrix.
+    rows: int
+        The number of visible lines.
+    columns: int
+        The number of visible columns.
+    """
+
+    def __init__(self: object, master: Tk, width: int=100,
+                 height: int=40) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        master : Tk
+            The parent widget.
+        width : int, optional
+            The number of visible columns. The default is 100.
+        height : int, optional
+            The number of visible lines. The default is 40.
+
+        Returns
+        -------
+        None
+            A widget instance.
+
+        """
+        super().__init__(master)
+        self.matrix = LazyMatrix.from_text('')
+        self.top = 0
+        self.left = 0
+        self.rows = height
+        self.columns = width
+        self.text = Text(self, wrap=NONE, width=width, height=height)
+        self.yscrollbar = Scrollbar(self, command=self.yview)
+        self.xscrollbar = Scrollbar(self, orient=HORIZONTAL,
+                                    command=self.xview)
+        self.text.grid(row=0, column=0)
+        self.yscrollbar.grid(row=0, column=1, sticky='ns')
+        self.xscrollbar.grid(row=1, column=0, sticky='ew')
+
+        # the Text widget never scrolls by itself, its content is the window
+        self.text.bind("<MouseWheel>", lambda e: self.yview(
+            'scroll', -1 if e.delta > 0 else 1, 'units') or 'break')
+        self.text.bind("<Button-4>", lambda e: self.yview(
+            'scroll', -1, 'units') or 'break')
+        self.text.bind("<Button-5>", lambda e: self.yview(
+            'scroll', 1, 'units') or 'break')
+        self.text.bind("<Shift-MouseWheel>", lambda e: self.xview(
+            'scroll', -1 if e.delta > 0 else 1, 'units') or 'break')
+
+    def show(self: object, matrix: LazyMatrix) -> None:
+        """Shows a new matrix from its top left corner.
+
+        Parameters
+        ----------
+        matrix : LazyMatrix
+            The matrix to be shown.
+
+        Returns
+        -------
+        None
+
+        """
+        self.matrix = matrix
+        self.top = 0
+        self.left = 0
+        self.render()
+
+    @staticmethod
+    def scrolled(args: tuple, current: int, total: int, visible: int) -> int:
+        """Computes the new first visible line (or column) from the arguments
+        of a Scrollbar command.
+
+        Parameters
+        ----------
+        args : tuple
+            ('moveto', fraction) or ('scroll', number, 'units' or 'pages').
+        current : int
+            The current first visible line.
+        total : int
+            The number of lines of the matrix.
+        visible : int
+            The number of visible lines.
+
+        Returns
+        -------
+        int
+            The new first visible line.
+
+        """
+        if args[0] == 'moveto':
+            position = int(float(args[1]) * total)
+        else:
+            step = visible if args[2] == 'pages' else 1
+            position = current + int(args[1]) * step
+        return max(0, min(position, total - visible))
+
+    def yview(self: object, *args: object) -> None:
+        """The command of the vertical scrollbar."""
+        self.top = self.scrolled(args, self.top, self.matrix.height,
+                                 self.rows)
+        self.render()
+
+    def xview(self: object, *args: object) -> None:
+        """The command of the horizontal scrollbar."""
+        self.left = self.scrolled(args, self.left, self.matrix.width,
+                                  self.columns)
+        self.render()
+
+    def render(self: object) -> None:
+        """Renders the visible window of the matrix into the Text widget and
+        updates the scrollbars."""
+        window = self.matrix.window(self.top, self.top + self.rows,
+                                    self.left, self.left + self.columns)
+        self.text.delete("1.0", END)
+        self.text.insert(END, '\n'.join(window))
+
+        height = max(self.matrix.height, 1)
+        width = max(self.matrix.width, 1)
+        self.yscrollbar.set(self.top / height,
+                            min((self.top + self.rows) / height, 1.0))
+        self.xscrollbar.set(self.left / width,
+                            min((self.left + self.columns) / width, 1.0))
 
 class Interface(Tk):
     """View class of the application using a Tkinter interface."""
@@ -119,6 +260,25 @@ class Interface(Tk):
         """
         self.random.set(Sequence.generate(length=50))
 
+    def render_step(self: object, step: Union[str, LazyMatrix, Callable]
+                    ) -> Union[str, LazyMatrix]:
+        """This method renders a step of a protocol, steps of a trace are
+        callables that create a lazy view of the step only when it is shown.
+
+        Parameters
+        ----------
+        step : Union[str, LazyMatrix, Callable]
+            The step to be rendered.
+
+        Returns
+        -------
+        Union[str, LazyMatrix]
+            The step to be shown.
+        """
+        if callable(step):
+            step = step()
+        return step
+
     def next_btn(self: object, controller: Iterator[str]) -> str:
         """This method is used to create the output of a universal next button
         for all protocols of the program, it will be passed to a given label
@@ -135,11 +295,7 @@ class Interface(Tk):
             Every step to be shown, one at a time.
         """
         try:
-            to_print = next(controller)
-            if isinstance(to_print, list):
-                return '\n'.join(to_print)
-            else:  
-                return to_print
+            return self.render_step(next(controller))
 
         except StopIteration:
             return "The protocole is finished"
@@ -159,13 +315,13 @@ class Interface(Tk):
         str
             The final step to be shown.
         """
-        
-        try:
-            to_print = list(controller)[-1] # Getting the final result of a generator
-            return to_print
+        to_print = None
+        for to_print in controller: # Skipping to the final result of a generator
+            pass
 
-        except IndexError:
+        if to_print is None:
             return "The protocole is finished, please refer to the main menu."
+        return self.render_step(to_print)
 
     def step_by_step(self: object, window: Tk, protocol: Iterator[str], names: Generator)-> None:
         """This method creates a universal step by step advancing interface
@@ -186,25 +342,13 @@ class Interface(Tk):
                      font=(None, 9, "bold"), borderwidth=2)
         current_step.place(relx = 0.5, 
                    rely = 0.1, anchor="center")
-        xscrollbar = Scrollbar(window, orient=HORIZONTAL)
-        xscrollbar.pack(side=BOTTOM, fill=X)
-
-        # Vertical (y) Scroll Bar
-        yscrollbar = Scrollbar(window)
-        yscrollbar.pack(side=RIGHT, fill=Y)
 
-        # Text Widget
-        text = Text(window, wrap=NONE, width=100, height=40,
-                    xscrollcommand=xscrollbar.set,
-                    yscrollcommand=yscrollbar.set)
+        # Only the visible part of a step is rendered in the Text widget
+        text = MatrixView(window, width=100, height=40)
         text.place(relx = 0.5,
                    rely = 0.5,
                    anchor = 'center')
 
-        # Configure the scrollbars
-        xscrollbar.config(command=text.xview)
-        yscrollbar.config(command=text.yview)
-
         Button(window, text="Next",
                command=lambda : [self.update_text(text,
                    self.next_btn(protocol)),steps.set(
@@ -215,34 +359,123 @@ class Interface(Tk):
             self.final_btn(protocol)), steps.set(
                        self.final_btn(names))]).pack(side="bottom")
 
-    def update_text(self: object, widget: Text, new_text: str) -> None:
-        """This method updates the Text tkinter widget with every step
-        in every protocol. it deletes its contents and then replaces it with
-        new_text parameter.
+    def update_text(self: object, widget: MatrixView,
+                    new_text: Union[str, LazyMatrix]) -> None:
+        """This method updates the matrix view with every step in every
+        protocol. it replaces its contents with new_text parameter.
+
+        Parameters
+        ----------
+        widget : MatrixView
+            The matrix view of the protocol.
+        new_text : Union[str, LazyMatrix]
+            The new text (or lazy matrix) to be shown in the widget.
+
+        Returns
+        -------
+        None
+            Replaces the matrix of a given MatrixView widget.
+
+        """
+        if not isinstance(new_text, LazyMatrix):
+            new_text = LazyMatrix.from_text(new_text)
+        widget.show(new_text)
+
+    def run_in_background(self: object, window: Toplevel, controller: object,
+                          task: Callable[[], None],
+                          on_done: Callable[[], None]) -> None:
+        """This method runs a controller operation on a worker thread so that
+        the interface stays responsive. A progress bar fed by the progress
+        callback of the controller and a cancel button are shown until the
+        operation ends, the results are then handed back to the Tk main
+        thread with after().
 
         Parameters
         ----------
-        widget : Text
-            Tkinter's Text widget.
-        new_text : str
-            The new text to be shown in the widget.
+        window : Toplevel
+            The window of the protocol.
+        controller : object
+            The controller, its progress callback is replaced.
+        task : Callable[[], None]
+            The operation to run, e.g; controller.encode.
+        on_done : Callable[[], None]
+            Called on the main thread when the operation succeeded.
 
         Returns
         -------
         None
-            Replaces text in a given Text widget.
 
         """
-        widget.delete("1.0", END)   #Clear the text window so we can write.
-        widget.insert(END,new_text) 
+        updates = queue.Queue() # the only channel between the two threads
+        cancel = threading.Event()
+
+        frame = Frame(window, bg='#ebebeb')
+        frame.pack(side=TOP, fill=X, padx=5, pady=6)
+        status = StringVar(value="Running...")
+        Label(frame, textvariable=status, bg='#ebebeb').pack(side=LEFT)
+        bar = ttk.Progressbar(frame, orient=HORIZONTAL, mode='determinate',
+                              maximum=1.0)
+        bar.pack(side=LEFT, fill=X, expand=True, padx=5)
+        cancel_btn = Button(frame, text="Cancel", command=lambda : [
+            cancel.set(), status.set("Cancelling...")])
+        cancel_btn.pack(side=RIGHT)
+
+        def progress(fraction: float) -> None:
+            """Called on the worker thread after every stage."""
+            if cancel.is_set():
+                raise Cancelled()
+            updates.put(("progress", fraction))
+
+        def work() -> None:
+            """The body of the worker thread."""
+            try:
+                task()
+            except Cancelled:
+                updates.put(("cancelled", None))
+            except Exception as err: # shown to the user in the main thread
+                updates.put(("error", err))
+            else:
+                updates.put(("done", None))
+
+        def poll() -> None:
+            """Applies the updates of the worker on the main thread."""
+            if not window.winfo_exists(): # closed while running
+                cancel.set()
+                return
+            try:
+                while True:
+                    kind, value = updates.get_nowait()
+                    if kind != "progress":
+                        break
+                    bar['value'] = value
+            except queue.Empty:
+                window.after(50, poll)
+                return
+
+            frame.destroy()
+            if kind == "done":
+                on_done()
+            elif kind == "cancelled":
+                messagebox.showinfo(parent=window, title="Cancelled",
+                                    message="The protocol was cancelled")
+                window.destroy()
+            else:
+                messagebox.showerror(parent=window, title="Error",
+                                     message="The protocol failed: %s" % value)
+                window.destroy()
+
+        controller.progress = progress
+        threading.Thread(target=work, daemon=True).start()
+        window.after(50, poll)
 
     def BW_output(self: object, controller: BWEncoder) -> Iterator[str]:
-        """This method is used to collect all output for the BW encoding.
+        """This method is used to collect all output for the BW encoding,
+        the steps of the trace are rendered only when shown.
 
         Parameters
         ----------
         controller : BWEncoder
-            The given controller.
+            The given controller, with a recorded trace.
 
         Yields
         ------
@@ -251,9 +484,9 @@ class Interface(Tk):
 
         """
         yield controller.seq.read()
-        for rot in controller.rotations:
-            yield rot
-        yield controller.bwm
+        for step in range(0, len(controller.trace), 1):
+            yield partial(controller.trace.rotations_view, step)
+        yield controller.trace.bwm_view
         yield controller.bwt
 
     def bwt_window(self: object) -> None:
@@ -267,32 +500,36 @@ class Interface(Tk):
             bwt_window.title("Burros-Wheeler Transform")
             bwt_window.geometry("1000x1000")
             bwt_window.configure(bg='#ebebeb')
-            controller = BWEncoder(self.file)
-            controller.encode()
-            protocol = self.BW_output(controller)
-            prot= list(protocol)
+            controller = BWEncoder(self.file, trace=EncodeTrace())
 
-            rots = ["Step 2: Generating all rotations of the sequence" for n in range(len(prot) - 3)]
-            
-            names = (step for step in ["Step 1 : Visualizing the sequence",
-                     *rots,
-                     "Step 3: Creating the Burros-Wheeler matrix by sorting all rotations",
-                     "Step 4: The Burros-Wheeler transform is the last column of the matrix",
-                     "Please refer to the main menu to select another sequence"])
-            
-            self.step_by_step(bwt_window, iter(prot), names)
-            self.program_output(bwt_window, controller.bwt_output)
+            def show() -> None:
+                """Shows the protocol once the controller is done."""
+                protocol = self.BW_output(controller)
+
+                rots = ["Step 2: Generating all rotations of the sequence" for n in range(len(controller.trace))]
+
+                names = (step for step in ["Step 1 : Visualizing the sequence",
+                         *rots,
+                         "Step 3: Creating the Burros-Wheeler matrix by sorting all rotations",
+                         "Step 4: The Burros-Wheeler transform is the last column of the matrix",
+                         "Please refer to the main menu to select another sequence"])
+
+                self.step_by_step(bwt_window, protocol, names)
+                self.program_output(bwt_window, controller.bwt_output)
+
+            self.run_in_background(bwt_window, controller, controller.encode, show)
 
         else:
             self.no_file_error()
 
     def DeBW_output(self: object, controller: BWDecoder) -> Iterator[str]:
-        """This method is used to collect all output for the BW decoding.
+        """This method is used to collect all output for the BW decoding,
+        the steps of the trace are rendered only when shown.
 
         Parameters
         ----------
         controller : BWDecoder
-            The given controller.
+            The given controller, with a recorded trace.
 
         Yields
         ------
@@ -301,8 +538,8 @@ class Interface(Tk):
 
         """
         yield controller.seq.read()
-        for mat in controller.bwm:
-            yield mat
+        for step in range(0, len(controller.trace), 1):
+            yield partial(controller.trace.matrix_view, step)
         yield controller.original
 
     def debwt_window(self: object) -> None:
@@ -316,20 +553,23 @@ class Interface(Tk):
             debwt_window.title("Reversing Burros-Wheeler Transform")
             debwt_window.geometry("1000x1000")
             debwt_window.configure(bg='#ebebeb')
-            controller = BWDecoder(self.file)
-            controller.decode()
-            protocol = self.DeBW_output(controller)
-            prot= list(protocol)
+            controller = BWDecoder(self.file, trace=DecodeTrace())
 
-            reconstructed = ["Step 2: Creating the Burros-Wheeler Matrix" for n in range(len(prot) - 2)]
+            def show() -> None:
+                """Shows the protocol once the controller is done."""
+                protocol = self.DeBW_output(controller)
 
-            names = (step for step in ["Step 1 : Visualizing the sequence",
-                     *reconstructed,
-                     "Step 3: The original sequence is the one that has a $ sign as a last column",
-                     "Please refer to the main menu to select another sequence"])
+                reconstructed = ["Step 2: Creating the Burros-Wheeler Matrix" for n in range(len(controller.trace))]
+
+                names = (step for step in ["Step 1 : Visualizing the sequence",
+                         *reconstructed,
+                         "Step 3: The original sequence is the one that has a $ sign as a last column",
+                         "Please refer to the main menu to select another sequence"])
+
+                self.step_by_step(debwt_window, protocol, names)
+                self.program_output(debwt_window, controller.debwt_output)
 
-            self.step_by_step(debwt_window, iter(prot), names)
-            self.program_output(debwt_window, controller.debwt_output)
+            self.run_in_background(debwt_window, controller, controller.decode, show)
 
         else:
             self.no_file_error()
@@ -372,10 +612,14 @@ class Interface(Tk):
                      "Step 5: Writing paths and unicode to an output file",
                      "Please refer to the main menu to select another sequence"])
             controller = HuffEncoder(self.file)
-            controller.encode()
-            protocol = self.Huff_output(controller)
-            self.step_by_step(huff_code_window, protocol, names)
-            self.program_output(huff_code_window, controller.huff_output)
+
+            def show() -> None:
+                """Shows the protocol once the controller is done."""
+                protocol = self.Huff_output(controller)
+                self.step_by_step(huff_code_window, protocol, names)
+                self.program_output(huff_code_window, controller.huff_output)
+
+            self.run_in_background(huff_code_window, controller, controller.encode, show)
 
         else:
             self.no_file_error()
@@ -418,10 +662,14 @@ class Interface(Tk):
                      "Step 5: The decompressed sequence : ",
                      "Please refer to the main menu to select another sequence"])
             controller = HuffDecoder(self.file)
-            controller.decode()
-            protocol = self.deHuff_output(controller)
-            self.step_by_step(huff_decode_window, protocol, names)
-            self.program_output(huff_decode_window, controller.dehuffman_output)
+
+            def show() -> None:
+                """Shows the protocol once the controller is done."""
+                protocol = self.deHuff_output(controller)
+                self.step_by_step(huff_decode_window, protocol, names)
+                self.program_output(huff_decode_window, controller.dehuffman_output)
+
+            self.run_in_background(huff_decode_window, controller, controller.decode, show)
 
         else:
             self.no_file_error()   
@@ -442,9 +690,9 @@ class Interface(Tk):
 
         """
         yield controller.bw_encoder.seq.read()
-        for rot in controller.bw_encoder.rotations:
-            yield rot
-        yield controller.bw_encoder.bwm
+        for step in range(0, len(controller.trace), 1):
+            yield partial(controller.trace.rotations_view, step)
+        yield controller.trace.bwm_view
         yield controller.bw_encoder.bwt
         yield controller.huff_encoder.header
         yield controller.huff_encoder.binary
@@ -462,26 +710,29 @@ class Interface(Tk):
             fullzip_window.title("Burrow-Wheeler Transform + Huffman coding")
             fullzip_window.geometry("1000x1000")
             fullzip_window.configure(bg='#ebebeb')
-            controller = FullEncoder(self.file)
-            controller.full_zip()
-            protocol = self.fullzip_output(controller)
-            prot= list(protocol)
-
-            rots = ["Step 2: Generating all rotations of the sequence" for n in range(len(prot) - 7)]
-            names = (step for step in ["Step 1 : Visualizing the sequence",
-                     *rots,
-                     "Step 3: Creating the Burros-Wheeler matrix by sorting all rotations",
-                     "Step 4: The Burros-Wheeler transform is the last column of the matrix",
-                     "Step 5: Creating Huffman tree from Burros-Wheeler transform and calculating paths",
-                     "Step 6: Generating the binary sequence from paths and adding a padding",
-                     "Step 7: Coding the binary in 8-bits to unicode",
-                     "Step 8: Writing paths and unicode to an output file",
-                     "Please refer to the main menu to select another sequence"])
-
-            self.step_by_step(fullzip_window, iter(prot), names)
-            outputs = controller.bw_encoder.bwt_output + \
-                '\n' + controller.huff_encoder.huff_output
-            self.program_output(fullzip_window, outputs)
+            controller = FullEncoder(self.file, trace=EncodeTrace())
+
+            def show() -> None:
+                """Shows the protocol once the controller is done."""
+                protocol = self.fullzip_output(controller)
+
+                rots = ["Step 2: Generating all rotations of the sequence" for n in range(len(controller.trace))]
+                names = (step for step in ["Step 1 : Visualizing the sequence",
+                         *rots,
+                         "Step 3: Creating the Burros-Wheeler matrix by sorting all rotations",
+                         "Step 4: The Burros-Wheeler transform is the last column of the matrix",
+                         "Step 5: Creating Huffman tree from Burros-Wheeler transform and calculating paths",
+                         "Step 6: Generating the binary sequence from paths and adding a padding",
+                         "Step 7: Coding the binary in 8-bits to unicode",
+                         "Step 8: Writing paths and unicode to an output file",
+                         "Please refer to the main menu to select another sequence"])
+
+                self.step_by_step(fullzip_window, protocol, names)
+                outputs = controller.bw_encoder.bwt_output + \
+                    '\n' + controller.huff_encoder.huff_output
+                self.program_output(fullzip_window, outputs)
+
+            self.run_in_background(fullzip_window, controller, controller.full_zip, show)
 
         else:
             self.no_file_error()
@@ -506,8 +757,8 @@ class Interface(Tk):
         yield controller.huff_decoder.unicode
         yield controller.huff_decoder.binary 
         yield controller.huff_decoder.decompressed
-        for line in controller.bw_decoder.bwm:
-            yield line
+        for step in range(0, len(controller.trace), 1):
+            yield partial(controller.trace.matrix_view, step)
         yield controller.bw_decoder.original
 
     def fullunzip_window(self: object) -> None:
@@ -521,25 +772,29 @@ class Interface(Tk):
             fullunzip_window.title("Huffman decoding + reverse Burros-Wheeler transform")
             fullunzip_window.geometry("1000x1000")
             fullunzip_window.configure(bg='#ebebeb')
-            controller = FullDecoder(self.file)
-            controller.full_unzip()
-            protocol = self.fullunzip_output(controller)
-            prot= list(protocol)
+            controller = FullDecoder(self.file, trace=DecodeTrace())
 
-            reconstructed = ["Step 6: Creating the Burros-Wheeler Matrix" for n in range(len(prot) - 6)]
-            names = (step for step in ["Step 1 : Visualizing the compressed sequence",
-                     "Step 2: Reading the header of the file that corresponds to Huffman codes that where created with the tree during compression",
-                     "Step 3: Separating the unicode sequence",
-                     "Step 4: Transforming the unicode sequence to binary using huffman codes in the header and stripping padding",
-                     "Step 5: The decompressed sequence is the burros wheeler transform of the original sequence:",
-                     *reconstructed,
-                     "Step 7: The original sequence is the one that has a $ sign as a last column in the Burros-Wheeler Matrix",
-                     "Please refer to the main menu to select another sequence"])
+            def show() -> None:
+                """Shows the protocol once the controller is done."""
+                protocol = self.fullunzip_output(controller)
+
+                reconstructed = ["Step 6: Creating the Burros-Wheeler Matrix" for n in range(len(controller.trace))]
+                names = (step for step in ["Step 1 : Visualizing the compressed sequence",
+                         "Step 2: Reading the header of the file that corresponds to Huffman codes that where created with the tree during compression",
+                         "Step 3: Separating the unicode sequence",
+                         "Step 4: Transforming the unicode sequence to binary using huffman codes in the header and stripping padding",
+                         "Step 5: The decompressed sequence is the burros wheeler transform of the original sequence:",
+                         *reconstructed,
+                         "Step 7: The original sequence is the one that has a $ sign as a last column in the Burros-Wheeler Matrix",
+                         "Please refer to the main menu to select another sequence"])
+
+                self.step_by_step(fullunzip_window, protocol, names)
+                outputs = controller.huff_decoder.dehuffman_output + \
+                    '\n' + controller.bw_decoder.debwt_output
+                self.program_output(fullunzip_window, outputs)
+
+            self.run_in_background(fullunzip_window, controller, controller.full_unzip, show)
 
-            self.step_by_step(fullunzip_window, iter(prot), names)
-            outputs = controller.huff_decoder.dehuffman_output + \
-                '\n' + controller.bw_decoder.debwt_output
-            self.program_output(fullunzip_window, outputs)
         else:
             self.no_file_error()
 
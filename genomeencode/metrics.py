@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+"""
+Metrics sinks for the encoder and decoder controllers. Every controller
+reports one event per stage (wall time, bytes in and out, block count) to a
+sink; the default sink discards everything so that the instrumentation costs
+nothing when nobody is listening.
+"""
+from __future__ import absolute_import
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, IO, Iterator, List, Tuple, Union
+
+class MetricsSink:
+    """The base class of all metrics sinks, a sink receives stage events from
+    the controllers. An event is a dictionary with the following keys:
+    controller, stage, seconds, bytes_in, bytes_out, blocks and timestamp,
+    failed stages carry an additional error key (the exception class name),
+    the stages of a queue a queue_depth key (the waiting items) and the
+    total stage of a controller run by another one a nested key (True).
+    """
+
+    def record(self: object, event: Dict) -> None:
+        """Receives a stage event, the base sink discards it.
+
+        Parameters
+        ----------
+        event : Dict
+            The stage event.
+
+        Returns
+        -------
+        None
+
+        """
+
+class NullSink(MetricsSink):
+    """A no-op sink, the default sink of every controller."""
+
+class TeeSink(MetricsSink):
+    """A sink that forwards every event to several sinks.
+
+    Attributes
+    ----------
+    sinks: List[MetricsSink]
+        The sinks to forward events to.
+    """
+
+    def __init__(self: object, *sinks: MetricsSink) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        *sinks : MetricsSink
+            The sinks to forward events to.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.sinks = list(sinks)
+
+    def record(self: object, event: Dict) -> None:
+        """Forwards the event to all the sinks.
+
+        Parameters
+        ----------
+        event : Dict
+            The stage event.
+
+        Returns
+        -------
+        None
+
+        """
+        for sink in self.sinks:
+            sink.record(event)
+
+class JSONLinesSink(MetricsSink):
+    """A sink that writes every event as a JSON object on its own line.
+
+    Attributes
+    ----------
+    file: IO
+        The opened file object to write events to.
+    """
+
+    def __init__(self: object, target: Union[str, IO]) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        target : Union[str, IO]
+            A file path (opened in append mode) or a writable text file
+            object.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        if isinstance(target, str):
+            self.file = open(target, 'a', encoding='utf-8')
+            self.__owned = True
+        else:
+            self.file = target
+            self.__owned = False
+        self.__lock = threading.Lock()
+
+    def record(self: object, event: Dict) -> None:
+        """Writes the event as a JSON line and flushes the file.
+
+        Parameters
+        ----------
+        event : Dict
+            The stage event.
+
+        Returns
+        -------
+        None
+
+        """
+        line = json.dumps(event, sort_keys=True)
+        with self.__lock:
+            self.file.write(line + '\n')
+            self.file.flush()
+
+    def close(self: object) -> None:
+        """Closes the underlying file if it was opened by the sink."""
+        if self.__owned:
+            self.file.close()
+
+class MemorySink(MetricsSink):
+    """An in-memory aggregator, it sums up events per (controller, stage)
+    pair.
+
+    Attributes
+    ----------
+    totals: Dict[Tuple[str, str], Dict[str, float]]
+        The aggregated counters; calls, seconds, bytes_in, bytes_out, blocks
+        and errors for every (controller, stage) pair.
+    """
+
+    def __init__(self: object) -> None:
+        """Class constructor.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.totals = {}
+        self.__lock = threading.Lock()
+
+    def record(self: object, event: Dict) -> None:
+        """Adds the event to the aggregated counters.
+
+        Parameters
+        ----------
+        event : Dict
+            The stage event.
+
+        Returns
+        -------
+        None
+
+        """
+        key = (event['controller'], event['stage'])
+        with self.__lock:
+            total = self.totals.setdefault(key, {
+                'calls': 0, 'seconds': 0.0, 'bytes_in': 0, 'bytes_out': 0,
+                'blocks': 0, 'errors': 0})
+            total['calls'] += 1
+            total['seconds'] += event['seconds']
+            total['bytes_in'] += event['bytes_in']
+            total['bytes_out'] += event['bytes_out']
+            total['blocks'] += event['blocks']
+            if 'error' in event:
+                total['errors'] += 1
+
+    def summary(self: object) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Returns a copy of the aggregated counters.
+
+        Returns
+        -------
+        Dict[Tuple[str, str], Dict[str, float]]
+            The counters for every (controller, stage) pair.
+
+        """
+        with self.__lock:
+            return {key: dict(total) for key, total in self.totals.items()}
+
+    def reset(self: object) -> None:
+        """Clears all the aggregated counters."""
+        with self.__lock:
+            self.totals.clear()
+
+_DEFAULT_SINK = NullSink()
+
+def get_default_sink() -> MetricsSink:
+    """Returns the process-wide default sink, used by every controller that
+    was not given an explicit sink.
+
+    Returns
+    -------
+    MetricsSink
+        The default sink, a NullSink unless another one was set.
+
+    """
+    return _DEFAULT_SINK
+
+def set_default_sink(sink: MetricsSink=None) -> MetricsSink:
+    """Sets the process-wide default sink.
+
+    Parameters
+    ----------
+    sink : MetricsSink, optional
+        The new default sink. The default is None, i.e; a NullSink.
+
+    Returns
+    -------
+    MetricsSink
+        The previous default sink.
+
+    """
+    global _DEFAULT_SINK
+    previous = _DEFAULT_SINK
+    _DEFAULT_SINK = sink if sink is not None else NullSink()
+    return previous
+
+# the total stages open in every thread
+_TOTALS = threading.local()
+
+@contextmanager
+def measure(sink: MetricsSink, controller: str, stage: str,
+            bytes_in: int=0, blocks: int=1) -> Iterator[Dict]:
+    """Times a stage of a controller and reports it to a sink. The yielded
+    event can be completed inside the block, usually with bytes_out. A total
+    stage opened inside another one in the same thread is marked as nested,
+    e.g; the BWEncoder run of a FullEncoder.
+
+    Parameters
+    ----------
+    sink : MetricsSink
+        The sink to report to.
+    controller : str
+        The name of the controller, i.e; its class name.
+    stage : str
+        The name of the stage.
+    bytes_in : int, optional
+        The size of the stage input. The default is 0.
+    blocks : int, optional
+        The number of blocks processed by the stage. The default is 1.
+
+    Yields
+    ------
+    Iterator[Dict]
+        The event to be reported.
+
+    """
+    event = {'controller': controller, 'stage': stage, 'bytes_in': bytes_in,
+             'bytes_out': 0, 'blocks': blocks, 'timestamp': time.time()}
+    total = stage == 'total'
+    if total:
+        depth = getattr(_TOTALS, 'depth', 0)
+        if depth:
+            event['nested'] = True
+        _TOTALS.depth = depth + 1
+    start = time.perf_counter()
+    try:
+        yield event
+    except BaseException as err:
+        event['error'] = type(err).__name__
+        raise
+    finally:
+        event['seconds'] = time.perf_counter() - start
+        if total:
+            _TOTALS.depth -= 1
+        sink.record(event)
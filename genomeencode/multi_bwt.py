@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+The extended Burros-Wheeler transform of a collection of strings, e.g; the
+reads of a sequencing run, built with the BCR algorithm (Bauer, Cox and
+Rosone). Every string ends with its own terminator, the terminators sort by
+string number before any character, so no separator is ever mistaken for a
+character. The suffixes of a batch of strings are inserted column by column
+from their ends, one LF step per column: every suffix of a batch is ranked
+among the rows of the strings already in the collection, its rank among the
+suffixes of the batch comes from a suffix sort of the batch, so the batch is
+merged into the BWT in one pass instead of one pass per column.
+"""
+from __future__ import absolute_import
+from typing import List, Sequence, Tuple
+import numpy as np
+from genomeencode.fm_index import FMIndex, suffix_array
+
+class MultiBWT:
+    """A multi-string BWT with a sampled document array.
+
+    Attributes
+    ----------
+    symbols: np.ndarray
+        The code point of the character before every suffix, 0 for a
+        terminator.
+    documents: np.ndarray
+        The string number of every sampled row, -1 for the other rows.
+    offsets: np.ndarray
+        The offset in its string of the suffix of every sampled row.
+    lengths: List[int]
+        The length of every string.
+    sample: int
+        The suffixes at offsets that are multiples of sample are sampled, the
+        document of a row is found within sample LF steps.
+    """
+    SAMPLE = 32
+
+    def __init__(self: object, strings: Sequence[str]=(),
+                 sample: int=SAMPLE) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        strings : Sequence[str], optional
+            The first batch of strings. The default is (), i.e; empty.
+        sample : int, optional
+            The document array sampling rate. The default is 32.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.symbols = np.zeros(0, dtype=np.uint32)
+        self.documents = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(0, dtype=np.int64)
+        self.lengths = []
+        self.sample = sample
+        self.__index = None
+        if len(strings):
+            self.add(strings)
+
+    def __len__(self: object) -> int:
+        """The number of rows, one per character and terminator."""
+        return len(self.symbols)
+
+    @property
+    def bwt(self: object) -> str:
+        """The BWT as a string, the terminators are '$' signs."""
+        codes = np.where(self.symbols == 0, ord('$'), self.symbols)
+        return codes.astype('<u4').tobytes().decode('utf-32-le')
+
+    @property
+    def document_sample(self: object) -> Tuple[np.ndarray, np.ndarray,
+                                               np.ndarray]:
+        """The sampled document array.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray, np.ndarray]
+            The sampled rows, the string number and the offset of each.
+
+        """
+        rows = np.flatnonzero(self.documents >= 0)
+        return rows, self.documents[rows], self.offsets[rows]
+
+    def add(self: object, strings: Sequence[str]) -> range:
+        """Inserts a batch of strings, their terminators sort after the ones
+        already in the collection. The suffixes of the batch are sorted
+        together, then every one is ranked among the rows already in the BWT
+        with one LF step from the suffix one character shorter, column by
+        column from the terminators, and the batch is merged in one pass.
+
+        Parameters
+        ----------
+        strings : Sequence[str]
+            The strings, without NUL characters.
+
+        Returns
+        -------
+        range
+            The numbers of the inserted strings.
+
+        """
+        first = len(self.lengths)
+        count = len(strings)
+        if not count:
+            return range(first, first)
+        if any('\0' in string for string in strings):
+            raise ValueError("Strings cannot hold NUL characters")
+        # the strings concatenated, each one followed by its terminator
+        text = np.frombuffer(('\0'.join(strings) + '\0').encode(
+            'utf-32-le'), dtype='<u4')
+        lengths = np.array([len(string) for string in strings], dtype=np.int64)
+        ends = np.cumsum(lengths + 1) - 1
+        numbers = np.repeat(np.arange(count), lengths + 1)
+        offsets = np.arange(len(text)) - (ends - lengths)[numbers]
+
+        order = MultiBWT.suffix_order(text, lengths)
+
+        # the rows of the BWT before every suffix of the batch, LF over the
+        # existing rows: keys sort them by symbol, then by row
+        rows = np.full(len(text), first, dtype=np.int64)
+        stride = len(self.symbols) + 1
+        keys = self.symbols.astype(np.int64) * stride + np.arange(stride - 1)
+        # the narrowest type sorts fastest, code points are mostly small
+        top = int(self.symbols.max()) if len(self.symbols) else 0
+        narrow = np.uint8 if top < 1 << 8 else np.uint16 if top < 1 << 16 \
+            else np.uint32
+        keys = keys[np.argsort(self.symbols.astype(narrow), kind='stable')]
+        longest = ends[np.argsort(-lengths, kind='stable')]
+        active = np.sort(lengths)[::-1]
+        for step in range(1, int(lengths.max()) + 1):
+            positions = longest[:np.searchsorted(-active, -step, 'right')] \
+                - step
+            rows[positions] = np.searchsorted(
+                keys, text[positions].astype(np.int64) * stride +
+                rows[positions + 1])
+
+        # the character before every suffix, the terminator of its string
+        # before the whole string
+        chars = np.where(offsets[order] == 0, 0, text[order - 1])
+        sampled = offsets[order] % self.sample == 0
+        targets = rows[order]
+        self.symbols = np.insert(self.symbols, targets, chars)
+        self.documents = np.insert(self.documents, targets, np.where(
+            sampled, first + numbers[order], -1))
+        self.offsets = np.insert(self.offsets, targets, offsets[order])
+        self.lengths.extend(lengths.tolist())
+        self.__index = None
+        return range(first, first + count)
+
+    @staticmethod
+    def suffix_order(text: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """Sorts the suffixes of a batch of strings, the terminators sort by
+        string number before any character. The first characters of every
+        suffix, up to its terminator, are packed in an integer so that the
+        prefix doubling starts from there.
+
+        Parameters
+        ----------
+        text : np.ndarray
+            The code points of the strings, each one followed by a 0
+            terminator.
+        lengths : np.ndarray
+            The length of every string.
+
+        Returns
+        -------
+        np.ndarray
+            The position in the text of every suffix, in order.
+
+        """
+        alphabet, packed = np.unique(text, return_inverse=True)
+        packed = packed.reshape(-1).astype(np.int64)
+        bits = max(1, (len(alphabet) - 1).bit_length())
+        # whether a window holds no terminator
+        open_ = packed != 0
+        width = 1
+        while 2 * width * bits <= 62 and width <= lengths.max():
+            # the window twice as long, the characters after a terminator
+            # do not count
+            following = np.zeros(len(text), dtype=np.int64)
+            following[:len(text) - width] = packed[width:]
+            packed = (packed << width * bits) | np.where(open_, following, 0)
+            closed = np.zeros(len(text), dtype=bool)
+            closed[:len(text) - width] = ~open_[width:]
+            open_ &= ~closed
+            width *= 2
+        # the windows that hold a terminator are unique, in text order like
+        # the string numbers
+        order = np.argsort(packed, kind='stable')
+        differ = (np.diff(packed[order]) != 0) | ~open_[order][1:]
+        ranks = np.empty(len(text), dtype=np.int64)
+        ranks[order] = np.concatenate(([0], np.cumsum(differ)))
+        return suffix_array(ranks, width)
+
+    def index(self: object) -> FMIndex:
+        """The FM-index of the BWT, its positions are the ones of the strings
+        concatenated with their terminators (see MultiBWT.locate).
+
+        Returns
+        -------
+        FMIndex
+            The index, rebuilt after every batch.
+
+        """
+        if self.__index is None:
+            alphabet, ranks = np.unique(self.symbols, return_inverse=True)
+            if len(alphabet) and alphabet[0] != 0:
+                alphabet = np.concatenate(([0], alphabet))
+                ranks = ranks + 1
+            alphabet = np.where(alphabet == 0, ord('$'), alphabet)
+            starts = np.concatenate(([0], np.cumsum(
+                np.array(self.lengths, dtype=np.int64) + 1)))
+            marks = self.documents >= 0
+            samples = starts[self.documents[marks]] + self.offsets[marks]
+            self.__index = FMIndex.from_bwt(
+                alphabet if len(alphabet) else np.array([ord('$')]),
+                ranks.reshape(-1), marks, samples, self.sample)
+            self.__starts = starts
+        return self.__index
+
+    def count(self: object, pattern: str) -> int:
+        """Counts the occurrences of a pattern in the strings."""
+        if not pattern:
+            return len(self)
+        return self.index().count(pattern)
+
+    def locate(self: object, pattern: str) -> List[Tuple[int, int]]:
+        """Finds the occurrences of a pattern in the strings.
+
+        Parameters
+        ----------
+        pattern : str
+            The pattern, not empty.
+
+        Returns
+        -------
+        List[Tuple[int, int]]
+            The string number and offset of every occurrence, sorted.
+
+        """
+        index = self.index()
+        low, high = index.backward_search(pattern)
+        positions = index.locate_rows(np.arange(low, high))
+        numbers = np.searchsorted(self.__starts, positions, 'right') - 1
+        return sorted(zip(numbers.tolist(),
+                          (positions - self.__starts[numbers]).tolist()))
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+A pipelined encoder that overlaps disk and CPU: a reader thread cuts the
+sequence file into blocks, compute workers compress them and the calling
+thread writes them in order to a blocked file (see blocks.BlockReader). At
+most in_flight blocks are read and not yet written, the reader waits for the
+writer beyond that, so memory stays bounded whatever the file size and the
+throughput approaches the one of the slowest stage.
+"""
+from __future__ import absolute_import
+import os
+import queue
+import struct
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, \
+    ThreadPoolExecutor
+from typing import Callable, Iterator, List
+from genomeencode import codec
+from genomeencode.blocks import HEADER, MAGIC, SAMPLING, VERSION
+from genomeencode.metrics import MetricsSink, get_default_sink, measure
+from genomeencode.progress import report
+
+class PipelineEncoder:
+    """An encoder controller that compresses a sequence file into a blocked
+    file with a reader thread, compute workers and an ordered writer.
+
+    Attributes
+    ----------
+    path: str
+        The path of the sequence file.
+    output: str
+        The path of the blocked file.
+    block_size: int
+        The number of characters of a block.
+    entropy: str
+        The codec backend of the blocks, see codec.compress.
+    workers: int
+        The number of compute processes, 1 to compress on a single thread.
+    in_flight: int
+        The maximum number of blocks read and not yet written.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every stage.
+    progress: Callable[[float], None]
+        The progress callback, it receives the done fraction after every
+        written block and can raise progress.Cancelled to abort.
+    """
+    BLOCK_SIZE = 1 << 20
+    IN_FLIGHT = 4
+
+    def __init__(self: object, path: str, output: str=None,
+                 block_size: int=BLOCK_SIZE, entropy: str='rans',
+                 workers: int=1, in_flight: int=IN_FLIGHT,
+                 metrics: MetricsSink=None,
+                 progress: Callable[[float], None]=None) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        path : str
+            The path of the sequence file.
+        output : str, optional
+            The path of the blocked file. The default is None, i.e; the path
+            of the sequence with a .gblk extension.
+        block_size : int, optional
+            The number of characters of a block. The default is 1 Mi.
+        entropy : str, optional
+            The codec backend of the blocks. The default is 'rans'.
+        workers : int, optional
+            The number of compute processes. The default is 1, i.e; a single
+            compute thread.
+        in_flight : int, optional
+            The maximum number of blocks in memory. The default is 4.
+        metrics : MetricsSink, optional
+            The metrics sink. The default is None, i.e; the default sink.
+        progress : Callable[[float], None], optional
+            The progress callback. The default is None.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        if block_size <= 0:
+            raise ValueError("The block size must be positive")
+        if in_flight <= 0:
+            raise ValueError("At least one block must be in flight")
+        if entropy not in codec.BACKENDS:
+            raise ValueError("Unknown entropy coder %s" % entropy)
+        self.path = path
+        self.output = output if output is not None else \
+            os.path.splitext(path)[0] + '.gblk'
+        self.block_size = block_size
+        self.entropy = entropy
+        self.workers = workers
+        self.in_flight = in_flight
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.progress = progress
+
+    def blocks(self: object) -> Iterator[str]:
+        """Reads the sequence block by block, the line breaks are dropped like
+        in Sequence.read.
+
+        Returns
+        -------
+        Iterator[str]
+            The blocks, all of block_size characters but the last one.
+
+        """
+        pending = ''
+        with open(self.path, 'r', encoding='utf-8', errors='ignore') as file:
+            while True:
+                text = file.read(self.block_size)
+                if not text:
+                    break
+                pending += text.replace('\n', '')
+                while len(pending) >= self.block_size:
+                    yield pending[:self.block_size]
+                    pending = pending[self.block_size:]
+        if pending:
+            yield pending
+
+    def start(self: object, size: int) -> int:
+        """The file offset of the first block, after the room reserved for
+        the offset tables.
+
+        Parameters
+        ----------
+        size : int
+            The size of the sequence file, a character takes at least a byte.
+
+        Returns
+        -------
+        int
+            The offset.
+
+        """
+        reserved = -(-size // self.block_size)
+        return HEADER.size + SAMPLING.size + 16 * (reserved + 1)
+
+    def header(self: object, offsets: List[int], length: int) -> bytes:
+        """The header and the offset tables of the blocked file, written last
+        at the start of the file.
+
+        Parameters
+        ----------
+        offsets : List[int]
+            The file offset of every block, and of the end of the last one.
+        length : int
+            The number of characters of the sequence.
+
+        Returns
+        -------
+        bytes
+            The header and the tables.
+
+        """
+        count = len(offsets) - 1
+        # no inverse suffix array samples, the sections are empty
+        tables = offsets + [offsets[-1]] * (count + 1)
+        return HEADER.pack(MAGIC, VERSION, self.block_size, length, count) + \
+            SAMPLING.pack(0) + struct.pack('<%dQ' % len(tables), *tables)
+
+    def executor(self: object) -> Executor:
+        """The compute workers, processes when there are several."""
+        if self.workers > 1:
+            return ProcessPoolExecutor(self.workers)
+        return ThreadPoolExecutor(1)
+
+    def read(self: object, executor: Executor, ordered: queue.Queue,
+             slots: threading.Semaphore, stop: threading.Event) -> None:
+        """The reader thread, it submits every block to the workers and
+        queues the futures in block order, then None.
+
+        Parameters
+        ----------
+        executor : Executor
+            The compute workers.
+        ordered : queue.Queue
+            The futures of the compressed blocks.
+        slots : threading.Semaphore
+            The free in-flight slots, released by the writer.
+        stop : threading.Event
+            Set by the writer when it gives up.
+
+        Returns
+        -------
+        None
+
+        """
+        name = type(self).__name__
+        try:
+            blocks = self.blocks()
+            while True:
+                while not slots.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    return
+                with measure(self.metrics, name, 'read') as event:
+                    block = next(blocks, None)
+                    event['bytes_out'] = len(block or '')
+                if block is None:
+                    break
+                ordered.put((len(block), executor.submit(
+                    codec.compress, block, self.entropy)))
+        except BaseException as err:
+            ordered.put(err)
+            return
+        ordered.put(None)
+
+    def encode(self: object) -> None:
+        """Compresses the sequence file into the blocked file. The offset
+        tables are written last, at the start of the file, in the room
+        reserved for the largest possible number of blocks.
+
+        Returns
+        -------
+        None
+            Writes out the blocked file.
+
+        """
+        name = type(self).__name__
+        size = os.path.getsize(self.path)
+        start = self.start(size)
+        ordered = queue.Queue()
+        slots = threading.Semaphore(self.in_flight)
+        stop = threading.Event()
+        executor = self.executor()
+        reader = threading.Thread(target=self.read, daemon=True,
+                                  args=(executor, ordered, slots, stop))
+        with measure(self.metrics, name, 'total', size) as total:
+            try:
+                offsets = [start]
+                length = 0
+                with open(self.output, 'wb') as file:
+                    file.seek(start)
+                    reader.start()
+                    while True:
+                        item = ordered.get()
+                        if item is None:
+                            break
+                        if isinstance(item, BaseException):
+                            raise item
+                        characters, future = item
+                        with measure(self.metrics, name, 'wait',
+                                     characters) as event:
+                            event['queue_depth'] = ordered.qsize()
+                            data = future.result()
+                        with measure(self.metrics, name, 'write',
+                                     len(data)) as event:
+                            file.write(data)
+                            event['bytes_out'] = len(data)
+                        slots.release()
+                        offsets.append(offsets[-1] + len(data))
+                        length += characters
+                        report(self.progress, min(length / size, 1.0))
+                    file.seek(0)
+                    file.write(self.header(offsets, length))
+                total['bytes_out'] = offsets[-1]
+                total['blocks'] = len(offsets) - 1
+                total['queue_depth'] = 0
+            except BaseException:
+                stop.set()
+                if reader.ident is not None:
+                    reader.join()
+                # the blocks that no worker started yet are dropped
+                while not ordered.empty():
+                    item = ordered.get()
+                    if isinstance(item, tuple):
+                        item[1].cancel()
+                if os.path.exists(self.output):
+                    os.remove(self.output)
+                raise
+            finally:
+                if reader.ident is not None:
+                    reader.join()
+                executor.shutdown(wait=True)
+            report(self.progress, 1.0)
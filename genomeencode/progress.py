@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Progress reporting of the encoder and decoder controllers. A progress callback
+receives the done fraction of an operation (between 0 and 1) after every
+stage, it can abort the operation by raising Cancelled.
+"""
+from __future__ import absolute_import
+from typing import Callable, Optional
+
+class Cancelled(Exception):
+    """Raised by a progress callback to abort the running operation."""
+
+def report(progress: Optional[Callable[[float], None]],
+           fraction: float) -> None:
+    """Reports a done fraction to a progress callback, if any.
+
+    Parameters
+    ----------
+    progress : Callable[[float], None]
+        The progress callback, None when nobody is listening.
+    fraction : float
+        The done fraction of the operation, between 0 and 1.
+
+    Returns
+    -------
+    None
+
+    """
+    if progress is not None:
+        progress(fraction)
+
+def scale(progress: Optional[Callable[[float], None]], start: float,
+          stop: float) -> Optional[Callable[[float], None]]:
+    """Maps the progress of a sub-operation to a slice of the progress of the
+    operation that runs it, e.g; the BWT half of a full zip.
+
+    Parameters
+    ----------
+    progress : Callable[[float], None]
+        The progress callback of the operation, None when nobody is listening.
+    start : float
+        The fraction of the operation done when the sub-operation starts.
+    stop : float
+        The fraction of the operation done when the sub-operation ends.
+
+    Returns
+    -------
+    Callable[[float], None]
+        The progress callback of the sub-operation.
+
+    """
+    if progress is None:
+        return None
+    return lambda fraction: progress(start + (stop - start) * fraction)
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+An r-index (Gagie, Navarro and Prezza) for highly repetitive collections: the
+Burros-Wheeler transform is stored as its r runs, and the suffix array is only
+sampled at the run boundaries. Counting follows the backward search of the
+FM-index with a rank over the runs, locating keeps one suffix array value (the
+toehold) along the search and derives the others with the phi function, so
+every query structure takes O(r) memory instead of O(n).
+"""
+from __future__ import absolute_import
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from genomeencode.fm_index import suffix_array, text_ranks
+
+class RIndex:
+    """A run-length compressed FM-index with a toroidal suffix array sample.
+
+    Attributes
+    ----------
+    alphabet: np.ndarray
+        The code point of every rank, the sentinel '$' first.
+    length: int
+        The number of rows, the text length plus the sentinel.
+    run_starts: np.ndarray
+        The first row of every run of the BWT.
+    run_symbols: np.ndarray
+        The rank of the character of every run.
+    counts: np.ndarray
+        The C array, the first row of every rank in the first column.
+    symbol_runs: List[np.ndarray]
+        The runs of every rank, in row order.
+    symbol_before: List[np.ndarray]
+        The occurrences of every rank before each of its runs.
+    run_ends: np.ndarray
+        The suffix array value of the last row of every run.
+    phi_keys: np.ndarray
+        The sorted suffix array values of the first rows of the runs (but
+        row 0).
+    phi_values: np.ndarray
+        The suffix array value of the row before each of them.
+    starts: List[int]
+        The text position of every sequence of a collection, see
+        RIndex.from_collection.
+    """
+
+    def __init__(self: object, text: str) -> None:
+        """Class constructor, indexes a text. The suffix array is built once
+        and thrown away, only its samples at the run boundaries are kept.
+
+        Parameters
+        ----------
+        text : str
+            The text, at most 255 distinct characters.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.alphabet, symbols = text_ranks(text)
+        suff_arr = suffix_array(symbols)
+        bwt = symbols[suff_arr - 1].astype(np.uint8)
+        self.length = len(bwt)
+        self.ranks = {chr(code): rank for rank, code in
+                      enumerate(self.alphabet.tolist()) if rank}
+        self.starts = [0]
+
+        # 32 bits per row or position when they fit
+        dtype = np.uint32 if self.length < 2 ** 32 else np.int64
+        heads = np.flatnonzero(np.concatenate(([True], bwt[1:] != bwt[:-1])))
+        self.run_starts = heads.astype(dtype)
+        self.run_symbols = bwt[heads]
+        lengths = np.diff(np.concatenate((heads, [self.length])))
+        sigma = len(self.alphabet)
+        frequencies = np.bincount(bwt, minlength=sigma)
+        self.counts = np.concatenate(([0], np.cumsum(frequencies))) \
+            .astype(np.int64)
+        self.symbol_runs = []
+        self.symbol_before = []
+        for rank in range(sigma):
+            runs = np.flatnonzero(self.run_symbols == rank)
+            self.symbol_runs.append(runs.astype(dtype))
+            self.symbol_before.append(np.concatenate((
+                [0], np.cumsum(lengths[runs])[:-1])).astype(dtype))
+
+        ends = np.concatenate((heads[1:], [self.length])) - 1
+        self.run_ends = suff_arr[ends].astype(dtype)
+        keys = suff_arr[heads[1:]]
+        order = np.argsort(keys, kind='stable')
+        self.phi_keys = keys[order].astype(dtype)
+        self.phi_values = suff_arr[heads[1:] - 1][order].astype(dtype)
+
+    @staticmethod
+    def from_collection(sequences: Sequence[str],
+                        separator: str='#') -> object:
+        """Indexes a collection of sequences, e.g; the genomes of a
+        pangenome, concatenated with a separator.
+
+        Parameters
+        ----------
+        sequences : Sequence[str]
+            The sequences, they must not contain the separator.
+        separator : str, optional
+            The separator. The default is '#'.
+
+        Returns
+        -------
+        RIndex
+            The index, its starts attribute holds the text position of every
+            sequence (see RIndex.document).
+
+        """
+        index = RIndex(separator.join(sequences))
+        starts = [0]
+        for sequence in sequences[:-1]:
+            starts.append(starts[-1] + len(sequence) + len(separator))
+        index.starts = starts
+        return index
+
+    def __len__(self: object) -> int:
+        """The number of rows, the text length plus the sentinel."""
+        return self.length
+
+    @property
+    def runs(self: object) -> int:
+        """The number of runs of the BWT."""
+        return len(self.run_starts)
+
+    def nbytes(self: object) -> int:
+        """The memory taken by the query structures, in bytes."""
+        arrays = [self.run_starts, self.run_symbols, self.counts,
+                  self.run_ends, self.phi_keys, self.phi_values] + \
+            self.symbol_runs + self.symbol_before
+        return sum(array.nbytes for array in arrays)
+
+    def run(self: object, row: int) -> int:
+        """The run that holds a row."""
+        return int(np.searchsorted(self.run_starts, row, 'right')) - 1
+
+    def occ(self: object, rank: int, row: int) -> int:
+        """Counts the occurrences of a rank in the BWT before a row, with a
+        binary search over the runs.
+
+        Parameters
+        ----------
+        rank : int
+            The rank of the character.
+        row : int
+            The row, between 0 and len(self).
+
+        Returns
+        -------
+        int
+            The number of occurrences.
+
+        """
+        if row >= self.length:
+            return int(self.counts[rank + 1] - self.counts[rank])
+        run = self.run(row)
+        runs = self.symbol_runs[rank]
+        before = int(np.searchsorted(runs, run))
+        if before < len(runs) and runs[before] == run:
+            return int(self.symbol_before[rank][before]) + row - \
+                int(self.run_starts[run])
+        if before == len(runs):
+            return int(self.counts[rank + 1] - self.counts[rank])
+        return int(self.symbol_before[rank][before])
+
+    def backward_search(self: object, pattern: str) -> Tuple[int, int, int]:
+        """Finds the rows of the suffixes that start with a pattern, and the
+        suffix array value of the last one (the toehold).
+
+        Parameters
+        ----------
+        pattern : str
+            The pattern.
+
+        Returns
+        -------
+        Tuple[int, int, int]
+            The first row, the row after the last one and the toehold; the
+            rows are equal when the pattern does not occur.
+
+        """
+        low, high = 0, self.length
+        toehold = int(self.run_ends[-1])
+        for char in reversed(pattern):
+            rank = self.ranks.get(char)
+            if rank is None:
+                return 0, 0, -1
+            last = self.run(high - 1)
+            if self.run_symbols[last] == rank:
+                toehold -= 1
+            else:
+                # the last occurrence in the rows ends a run of the character
+                runs = self.symbol_runs[rank]
+                before = int(np.searchsorted(runs, last))
+                if before == 0 or \
+                        self.run_starts[int(runs[before - 1]) + 1] <= low:
+                    return 0, 0, -1
+                previous = int(runs[before - 1])
+                toehold = int(self.run_ends[previous]) - 1
+            low = int(self.counts[rank]) + self.occ(rank, low)
+            high = int(self.counts[rank]) + self.occ(rank, high)
+        return low, high, toehold
+
+    def count(self: object, pattern: str) -> int:
+        """Counts the occurrences of a pattern in the text."""
+        low, high, _ = self.backward_search(pattern)
+        return high - low
+
+    def phi(self: object, position: int) -> int:
+        """The suffix array value of the row before the row of a position,
+        from the sampled run boundaries.
+
+        Parameters
+        ----------
+        position : int
+            The text position, not the one of row 0.
+
+        Returns
+        -------
+        int
+            The text position of the previous row.
+
+        """
+        key = int(np.searchsorted(self.phi_keys, position, 'right')) - 1
+        return int(self.phi_values[key]) + position - int(self.phi_keys[key])
+
+    def locate(self: object, pattern: str) -> List[int]:
+        """Finds the positions of a pattern in the text.
+
+        Parameters
+        ----------
+        pattern : str
+            The pattern.
+
+        Returns
+        -------
+        List[int]
+            The sorted starting positions of its occurrences.
+
+        """
+        low, high, position = self.backward_search(pattern)
+        positions = []
+        for _ in range(high - low):
+            positions.append(position)
+            if len(positions) < high - low:
+                position = self.phi(position)
+        return sorted(positions)
+
+    def document(self: object, position: int) -> Tuple[int, int]:
+        """Maps a text position to a sequence of the collection.
+
+        Parameters
+        ----------
+        position : int
+            The text position.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The number of the sequence and the offset in it.
+
+        """
+        number = int(np.searchsorted(self.starts, position, 'right')) - 1
+        return number, position - self.starts[number]
+
+    def stats(self: object) -> Dict[str, float]:
+        """Sums up the index size.
+
+        Returns
+        -------
+        Dict[str, float]
+            The number of rows and runs, the average run length and the bytes
+            of the query structures.
+
+        """
+        return {'rows': self.length, 'runs': self.runs,
+                'run_length': self.length / self.runs, 'bytes': self.nbytes()}
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Interleaved range Asymmetric Numeral Systems (rANS) entropy coder, an
+alternative to Huffman coding that spends a fractional number of bits per
+symbol. Symbols are dealt round-robin to several coder states (lanes) that
+share one stream of 16-bit words, so that every decoding step updates all the
+lanes at once with vectorized NumPy operations.
+"""
+from __future__ import absolute_import
+import struct
+from typing import Tuple
+import numpy as np
+
+class RansCoder:
+    """A class to represent the interleaved rANS algorithm, all methods are
+    static like in BurrosWheeler.
+
+    Every lane has a 32-bit state kept in [L, 2^32) with L = 2^16, it is
+    renormalized one 16-bit word at a time. Frequencies are quantized to a
+    total of 2^SCALE_BITS. The encoder goes through the symbols backwards, one
+    group of lanes at a time, and the decoder reads them forwards.
+    """
+    MAGIC = b'RANS'
+    VERSION = 1
+    SCALE_BITS = 12
+    LOWER_BOUND = 1 << 16
+    DEFAULT_LANES = 64
+    HEADER = struct.Struct('<4sBBHQH')
+
+    @staticmethod
+    def symbols(sequence: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Maps the characters of a sequence to symbol indexes.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence to be coded.
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            The sorted code points of the alphabet and the symbol index of
+            every character.
+
+        """
+        points = np.frombuffer(sequence.encode('utf-32-le'), dtype='<u4')
+        alphabet, indexes = np.unique(points, return_inverse=True)
+        return alphabet, indexes.astype(np.int64)
+
+    @staticmethod
+    def quantize(counts: np.ndarray, scale_bits: int) -> np.ndarray:
+        """Scales symbol counts to frequencies that sum up to 2^scale_bits,
+        every symbol keeps a frequency of at least 1.
+
+        Parameters
+        ----------
+        counts : np.ndarray
+            The number of occurrences of every symbol.
+        scale_bits : int
+            The precision of the frequencies.
+
+        Returns
+        -------
+        np.ndarray
+            The quantized frequencies.
+
+        """
+        total = 1 << scale_bits
+        if len(counts) > total:
+            raise ValueError("The alphabet has more than %d symbols" % total)
+        freqs = np.maximum(counts * total // counts.sum(), 1)
+        # the rounding error is given to (or taken from) the largest symbols
+        while freqs.sum() != total:
+            order = np.argsort(-freqs, kind='stable')
+            if freqs.sum() < total:
+                freqs[order[0]] += total - freqs.sum()
+            else:
+                for i in order:
+                    excess = freqs.sum() - total
+                    if excess == 0:
+                        break
+                    freqs[i] -= min(excess, freqs[i] - 1)
+        return freqs.astype(np.int64)
+
+    @staticmethod
+    def encode(sequence: str, lanes: int=DEFAULT_LANES) -> bytes:
+        """Encodes a sequence with interleaved rANS.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence to be coded.
+        lanes : int, optional
+            The number of interleaved coder states. The default is 64.
+
+        Returns
+        -------
+        bytes
+            The coded sequence, a self-describing binary container.
+
+        """
+        scale_bits = RansCoder.SCALE_BITS
+        alphabet, symbols = RansCoder.symbols(sequence)
+        counts = np.bincount(symbols, minlength=len(alphabet))
+        freqs = RansCoder.quantize(counts, scale_bits) if len(alphabet) else \
+            np.zeros(0, dtype=np.int64)
+        cums = np.concatenate(([0], np.cumsum(freqs)[:-1])).astype(np.int64)
+
+        states = np.full(lanes, RansCoder.LOWER_BOUND, dtype=np.uint64)
+        words = []
+        length = len(symbols)
+        for start in range(((length - 1) // lanes) * lanes, -1, -lanes):
+            group = symbols[start:start + lanes]
+            active = len(group)
+            x = states[:active]
+            freq = freqs[group].astype(np.uint64)
+            cum = cums[group].astype(np.uint64)
+            emit = x >= (freq << np.uint64(20)) # (L >> scale_bits) << 16
+            # groups are emitted backwards but the lanes of a group are read
+            # forwards, reversing the list of groups restores both orders
+            words.append((x[emit] & np.uint64(0xffff)).astype('<u2'))
+            x = np.where(emit, x >> np.uint64(16), x)
+            states[:active] = ((x // freq) << np.uint64(scale_bits)) + \
+                (x % freq) + cum
+
+        stream = np.concatenate(words[::-1]) if words else \
+            np.zeros(0, dtype='<u2')
+        header = RansCoder.HEADER.pack(RansCoder.MAGIC, RansCoder.VERSION,
+                                       scale_bits, lanes, length,
+                                       len(alphabet))
+        return b''.join([header,
+                         alphabet.astype('<u4').tobytes(),
+                         freqs.astype('<u2').tobytes(),
+                         states.astype('<u4').tobytes(),
+                         stream.tobytes()])
+
+    @staticmethod
+    def decode(data: bytes) -> str:
+        """Decodes a sequence coded with RansCoder.encode.
+
+        Parameters
+        ----------
+        data : bytes
+            The coded sequence.
+
+        Returns
+        -------
+        str
+            The original sequence.
+
+        """
+        magic, version, scale_bits, lanes, length, size = \
+            RansCoder.HEADER.unpack_from(data)
+        if magic != RansCoder.MAGIC or version != RansCoder.VERSION:
+            raise ValueError("Not an rANS stream (version %d)" % version)
+        offset = RansCoder.HEADER.size
+        alphabet = np.frombuffer(data, '<u4', size, offset)
+        offset += 4 * size
+        freqs = np.frombuffer(data, '<u2', size, offset).astype(np.uint64)
+        offset += 2 * size
+        states = np.frombuffer(data, '<u4', lanes, offset).astype(np.uint64)
+        offset += 4 * lanes
+        stream = np.frombuffer(data, '<u2', -1, offset).astype(np.uint64)
+
+        cums = np.concatenate(([0], np.cumsum(freqs)[:-1])).astype(np.uint64)
+        # slot to symbol lookup table, one entry per quantized frequency unit
+        slot_symbol = np.repeat(np.arange(size), freqs.astype(np.int64))
+        mask = np.uint64((1 << scale_bits) - 1)
+        shift = np.uint64(scale_bits)
+        lower = np.uint64(RansCoder.LOWER_BOUND)
+
+        symbols = np.empty(length, dtype=np.int64)
+        position = 0
+        for start in range(0, length, lanes):
+            active = min(lanes, length - start)
+            x = states[:active]
+            slot = x & mask
+            group = slot_symbol[slot]
+            x = freqs[group] * (x >> shift) + slot - cums[group]
+            need = x < lower
+            count = int(need.sum())
+            x[need] = (x[need] << np.uint64(16)) | \
+                stream[position:position + count]
+            position += count
+            states[:active] = x
+            symbols[start:start + active] = group
+
+        points = alphabet[symbols] if size else np.zeros(0, dtype='<u4')
+        return points.astype('<u4').tobytes().decode('utf-32-le')
@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+"""
+Reference-based compression of resequenced genomes. A reference is indexed
+once (a k-mer hash index), then a target sequence is coded as matches against
+the reference plus literal edits: a substitution keeps following the same
+diagonal of the alignment and anything else is re-seeded from the index.
+Decoding replays the edits over the reference.
+"""
+from __future__ import absolute_import
+import struct
+import zlib
+from typing import List, Tuple
+import numpy as np
+
+def text_codes(text: str) -> np.ndarray:
+    """Converts a text to its array of code points.
+
+    Parameters
+    ----------
+    text : str
+        The text.
+
+    Returns
+    -------
+    np.ndarray
+        The code point of every character.
+
+    """
+    return np.frombuffer(text.encode('utf-32-le'), dtype='<u4')
+
+def kmer_hashes(codes: np.ndarray, k: int) -> np.ndarray:
+    """Hashes every k-mer of a sequence (a polynomial hash modulo 2^64).
+
+    Parameters
+    ----------
+    codes : np.ndarray
+        The code points of the sequence.
+    k : int
+        The length of a k-mer.
+
+    Returns
+    -------
+    np.ndarray
+        The hash of the k-mer that starts at every position, there are
+        len(codes) - k + 1 of them.
+
+    """
+    count = len(codes) - k + 1
+    if count <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    hashes = np.zeros(count, dtype=np.uint64)
+    base = np.uint64(0x100000001B3)
+    for shift in range(k):
+        hashes = hashes * base + codes[shift:shift + count].astype(np.uint64)
+    return hashes
+
+def put_varint(out: bytearray, value: int) -> None:
+    """Appends an unsigned LEB128 integer to a buffer.
+
+    Parameters
+    ----------
+    out : bytearray
+        The buffer.
+    value : int
+        The non-negative integer.
+
+    Returns
+    -------
+    None
+
+    """
+    while value >= 0x80:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+
+def get_varint(data: bytes, offset: int) -> Tuple[int, int]:
+    """Reads an unsigned LEB128 integer.
+
+    Parameters
+    ----------
+    data : bytes
+        The buffer.
+    offset : int
+        The offset of the integer.
+
+    Returns
+    -------
+    Tuple[int, int]
+        The integer and the offset after it.
+
+    """
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, offset
+
+class ReferenceIndex:
+    """A k-mer hash index of a reference sequence: the sorted hashes of the
+    k-mers that start every step positions, with their positions.
+
+    Attributes
+    ----------
+    reference: str
+        The reference sequence.
+    k: int
+        The length of the indexed k-mers.
+    step: int
+        The distance between two indexed positions, larger steps save memory.
+    codes: np.ndarray
+        The code points of the reference.
+    hashes: np.ndarray
+        The sorted k-mer hashes.
+    positions: np.ndarray
+        The position of the k-mer of every hash.
+    checksum: int
+        The CRC-32 of the reference, decoding checks it.
+    """
+    K = 20
+    MAX_CANDIDATES = 8
+
+    def __init__(self: object, reference: str, k: int=K,
+                 step: int=1) -> None:
+        """Class constructor, indexes the reference.
+
+        Parameters
+        ----------
+        reference : str
+            The reference sequence.
+        k : int, optional
+            The length of the indexed k-mers. The default is 20.
+        step : int, optional
+            The distance between two indexed positions. The default is 1.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.reference = reference
+        self.k = k
+        self.step = step
+        self.codes = text_codes(reference)
+        self.checksum = ReferenceIndex.crc(reference)
+        hashes = kmer_hashes(self.codes, k)[::step]
+        order = np.argsort(hashes, kind='stable')
+        self.hashes = hashes[order]
+        self.positions = (order * step).astype(np.int64)
+
+    @staticmethod
+    def crc(reference: str) -> int:
+        """The checksum of a reference.
+
+        Parameters
+        ----------
+        reference : str
+            The reference sequence.
+
+        Returns
+        -------
+        int
+            The CRC-32 of its UTF-8 encoding.
+
+        """
+        return zlib.crc32(reference.encode('utf-8'))
+
+    def save(self: object, path: str) -> None:
+        """Saves the index (without the reference) to a .npz file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the index file.
+
+        Returns
+        -------
+        None
+
+        """
+        with open(path, 'wb') as file:
+            np.savez(file, hashes=self.hashes, positions=self.positions,
+                     settings=np.array([self.k, self.step, self.checksum,
+                                        len(self.reference)], dtype=np.int64))
+
+    @staticmethod
+    def load(path: str, reference: str) -> object:
+        """Loads an index saved with ReferenceIndex.save.
+
+        Parameters
+        ----------
+        path : str
+            The path of the index file.
+        reference : str
+            The indexed reference sequence.
+
+        Returns
+        -------
+        ReferenceIndex
+            The index.
+
+        """
+        with np.load(path) as data:
+            k, step, checksum, size = data['settings'].tolist()
+            if size != len(reference) or \
+                    checksum != ReferenceIndex.crc(reference):
+                raise ValueError("The index was built for another reference")
+            index = ReferenceIndex.__new__(ReferenceIndex)
+            index.reference = reference
+            index.k = k
+            index.step = step
+            index.codes = text_codes(reference)
+            index.checksum = checksum
+            index.hashes = data['hashes']
+            index.positions = data['positions']
+        return index
+
+    def candidates(self: object, kmer_hash: int) -> np.ndarray:
+        """Finds the reference positions of a k-mer hash.
+
+        Parameters
+        ----------
+        kmer_hash : int
+            The hash of the k-mer.
+
+        Returns
+        -------
+        np.ndarray
+            At most MAX_CANDIDATES positions, hash collisions included.
+
+        """
+        key = np.uint64(kmer_hash)
+        start = np.searchsorted(self.hashes, key, 'left')
+        stop = np.searchsorted(self.hashes, key, 'right')
+        return self.positions[start:min(stop, start + self.MAX_CANDIDATES)]
+
+class ReferenceCoder:
+    """A class to represent the reference-based codec, all methods are static
+    like in RansCoder.
+
+    A coded target is a list of (literals, delta, length) operations: first
+    copy a number of literal characters, then copy length characters of the
+    reference starting delta characters away from where the previous match
+    ended. The operations are LEB128 integers (zig-zag for the deltas), they
+    are deflated along with the literals.
+    """
+    MAGIC = b'REFC'
+    VERSION = 1
+    HEADER = struct.Struct('<4sBIQQQ')
+    MIN_MATCH = 8
+
+    @staticmethod
+    def match_length(index: ReferenceIndex, target: np.ndarray, start: int,
+                     position: int) -> int:
+        """Measures how far the target and the reference match.
+
+        Parameters
+        ----------
+        index : ReferenceIndex
+            The index of the reference.
+        target : np.ndarray
+            The code points of the target.
+        start : int
+            The position in the target.
+        position : int
+            The position in the reference.
+
+        Returns
+        -------
+        int
+            The length of the match.
+
+        """
+        length = 0
+        window = 256
+        while True:
+            stop = min(window, len(target) - start - length,
+                       len(index.codes) - position - length)
+            if stop <= 0:
+                return length
+            differ = np.flatnonzero(
+                target[start + length:start + length + stop] !=
+                index.codes[position + length:position + length + stop])
+            if len(differ):
+                return length + int(differ[0])
+            length += stop
+            window *= 4
+
+    @staticmethod
+    def seed(index: ReferenceIndex, target: np.ndarray, hashes: np.ndarray,
+             start: int, expected: int) -> Tuple[int, int]:
+        """Finds the longest match of the target at a position, with the
+        k-mers that start at the next step positions (an index with a step
+        only holds some of the reference k-mers).
+
+        Parameters
+        ----------
+        index : ReferenceIndex
+            The index of the reference.
+        target : np.ndarray
+            The code points of the target.
+        hashes : np.ndarray
+            The k-mer hashes of the target.
+        start : int
+            The position in the target.
+        expected : int
+            The reference position that follows the previous match, it wins
+            ties.
+
+        Returns
+        -------
+        Tuple[int, int]
+            The reference position and the length of the match, (-1, 0)
+            when there is none.
+
+        """
+        best = (-1, 0)
+        for offset in range(min(index.step, len(hashes) - start)):
+            for position in index.candidates(hashes[start + offset]).tolist():
+                position -= offset
+                if position < 0:
+                    continue
+                length = ReferenceCoder.match_length(index, target, start,
+                                                     position)
+                if length > best[1] or (length == best[1] and
+                                        position == expected):
+                    best = (position, length)
+            if best[1] >= index.k:
+                return best
+        return best if best[1] >= index.k else (-1, 0)
+
+    @staticmethod
+    def operations(index: ReferenceIndex,
+                   target: str) -> Tuple[List[Tuple[int, int, int]], str]:
+        """Aligns a target greedily against the reference.
+
+        Parameters
+        ----------
+        index : ReferenceIndex
+            The index of the reference.
+        target : str
+            The target sequence.
+
+        Returns
+        -------
+        Tuple[List[Tuple[int, int, int]], str]
+            The (literals, position, length) operations, with the absolute
+            reference position of every match, and the literal characters.
+
+        """
+        codes = text_codes(target)
+        hashes = kmer_hashes(codes, index.k)
+        operations = []
+        literals = []
+        start = 0
+        run = 0 # literals waiting for the next match
+        position = -1 # the reference position of the current diagonal
+        while start < len(codes):
+            length = 0
+            if position >= 0:
+                length = ReferenceCoder.match_length(index, codes, start,
+                                                     position)
+            if length < index.k and start < len(hashes):
+                # a short match on the diagonal, look for a better one
+                found, found_length = ReferenceCoder.seed(
+                    index, codes, hashes, start, position)
+                if found_length > length:
+                    position, length = found, found_length
+            if length < ReferenceCoder.MIN_MATCH:
+                literals.append(target[start])
+                run += 1
+                start += 1
+                # a substitution keeps the diagonal
+                position = position + 1 if position >= 0 else -1
+                continue
+            operations.append((run, position, length))
+            run = 0
+            start += length
+            position += length
+            if start < len(codes): # the mismatch is a literal
+                literals.append(target[start])
+                run = 1
+                start += 1
+                position += 1
+        if run:
+            operations.append((run, 0, 0))
+        return operations, ''.join(literals)
+
+    @staticmethod
+    def encode(index: ReferenceIndex, target: str) -> bytes:
+        """Encodes a target against an indexed reference.
+
+        Parameters
+        ----------
+        index : ReferenceIndex
+            The index of the reference.
+        target : str
+            The target sequence.
+
+        Returns
+        -------
+        bytes
+            The coded target, a self-describing binary container.
+
+        """
+        operations, literals = ReferenceCoder.operations(index, target)
+        stream = bytearray()
+        expected = 0
+        for run, position, length in operations:
+            delta = position - expected if length else 0
+            put_varint(stream, run)
+            put_varint(stream, delta << 1 if delta >= 0 else -delta << 1 | 1)
+            put_varint(stream, length)
+            expected = position + length
+        stream = zlib.compress(bytes(stream), 9)
+        return b''.join([ReferenceCoder.HEADER.pack(
+            ReferenceCoder.MAGIC, ReferenceCoder.VERSION, index.checksum,
+            len(index.reference), len(target), len(operations)),
+                         struct.pack('<Q', len(stream)), stream,
+                         zlib.compress(literals.encode('utf-8'), 9)])
+
+    @staticmethod
+    def decode(reference: str, data: bytes) -> str:
+        """Decodes a target by replaying its edits over the reference.
+
+        Parameters
+        ----------
+        reference : str
+            The reference sequence the target was coded against.
+        data : bytes
+            The coded target.
+
+        Returns
+        -------
+        str
+            The target sequence.
+
+        """
+        magic, version, checksum, size, length, count = \
+            ReferenceCoder.HEADER.unpack_from(data)
+        if magic != ReferenceCoder.MAGIC or version != ReferenceCoder.VERSION:
+            raise ValueError("Not a reference-based stream")
+        if size != len(reference) or checksum != ReferenceIndex.crc(reference):
+            raise ValueError("The target was coded against another reference")
+        offset = ReferenceCoder.HEADER.size
+        stream_size, = struct.unpack_from('<Q', data, offset)
+        offset += 8
+        stream = zlib.decompress(data[offset:offset + stream_size])
+        literals = zlib.decompress(data[offset + stream_size:]).decode('utf-8')
+
+        pieces = []
+        cursor = read = expected = 0
+        for _ in range(count):
+            run, cursor = get_varint(stream, cursor)
+            delta, cursor = get_varint(stream, cursor)
+            match, cursor = get_varint(stream, cursor)
+            pieces.append(literals[read:read + run])
+            read += run
+            position = expected + (-(delta >> 1) if delta & 1 else delta >> 1)
+            pieces.append(reference[position:position + match])
+            expected = position + match
+        target = ''.join(pieces)
+        if len(target) != length:
+            raise ValueError("The stream is corrupted")
+        return target
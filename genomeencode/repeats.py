@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+Repeat analysis on the suffix array that the Burros-Wheeler transform is built
+from. The LCP array (Kasai et al.) gives the longest common prefix of every
+two consecutive suffixes, the repeats of a sequence are the intervals of the
+suffix array where it stays high, and they are enumerated with a single stack
+pass over the LCP array.
+"""
+from __future__ import absolute_import
+from typing import List, Sequence, Tuple
+import numpy as np
+from genomeencode.fm_index import suffix_array
+
+# The left context of an interval whose suffixes follow different characters
+DIVERSE = object()
+
+class RepeatAnalysis:
+    """The repeat analyses of a sequence, from its suffix array and LCP array.
+
+    Attributes
+    ----------
+    sequence: str
+        The sequence, without the '$' sign.
+    suff_arr: List[int]
+        The suffix array of the sequence and the '$' sign, like
+        BurrosWheeler.int_suffix_array; suff_arr[0] is len(sequence).
+    lcp: List[int]
+        The length of the longest common prefix of every suffix and the
+        previous one in the suffix array, lcp[0] is 0.
+    """
+
+    def __init__(self: object, sequence: str,
+                 suff_arr: Sequence[int]=None) -> None:
+        """Class constructor, computes the LCP array.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence.
+        suff_arr : Sequence[int], optional
+            The suffix array of the sequence, e.g; BWEncoder.suff_arr after
+            encoding. The default is None, i.e; it is computed.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        if suff_arr is None:
+            codes = np.frombuffer(sequence.encode('utf-32-le'), dtype='<u4')
+            suff_arr = suffix_array(np.concatenate((codes.astype(np.int64) + 1,
+                                                    [0])))
+        self.sequence = sequence
+        self.suff_arr = suff_arr.tolist() \
+            if isinstance(suff_arr, np.ndarray) else list(suff_arr)
+        self.lcp = RepeatAnalysis.lcp_array(sequence, self.suff_arr)
+
+    @staticmethod
+    def lcp_array(sequence: str, suff_arr: List[int]) -> List[int]:
+        """Kasai's algorithm, the suffixes are visited in text order so that
+        the common prefix length drops by at most one from a suffix to the
+        next.
+        - Complexity of the algorithm O(n)
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence, without the '$' sign.
+        suff_arr : List[int]
+            The suffix array of the sequence and the '$' sign.
+
+        Returns
+        -------
+        List[int]
+            The LCP array.
+
+        """
+        length = len(suff_arr)
+        rank = [0] * length
+        for row, position in enumerate(suff_arr):
+            rank[position] = row
+        lcp = [0] * length
+        common = 0
+        for position in range(0, length - 1, 1):
+            row = rank[position]
+            previous = suff_arr[row - 1] # row > 0, only '$' is at row 0
+            while position + common < length - 1 and \
+                    previous + common < length - 1 and \
+                    sequence[position + common] == sequence[previous + common]:
+                common += 1
+            lcp[row] = common
+            common = max(common - 1, 0)
+        return lcp
+
+    def distinct_substrings(self: object) -> int:
+        """Counts the distinct non-empty substrings of the sequence, every
+        suffix adds its length minus the prefix it shares with the previous
+        one.
+
+        Returns
+        -------
+        int
+            The number of distinct substrings.
+
+        """
+        length = len(self.sequence)
+        return length * (length + 1) // 2 - sum(self.lcp)
+
+    def longest_repeats(self: object
+                        ) -> Tuple[int, List[Tuple[str, List[int]]]]:
+        """Finds the longest substrings that occur at least twice.
+
+        Returns
+        -------
+        Tuple[int, List[Tuple[str, List[int]]]]
+            Their length, and every such substring with its sorted positions;
+            (0, []) when no character repeats.
+
+        """
+        longest = max(self.lcp, default=0)
+        if longest == 0:
+            return 0, []
+        repeats = []
+        row = 1
+        while row < len(self.lcp):
+            if self.lcp[row] != longest:
+                row += 1
+                continue
+            start = row - 1
+            while row < len(self.lcp) and self.lcp[row] == longest:
+                row += 1
+            positions = sorted(self.suff_arr[start:row])
+            repeats.append((self.sequence[positions[0]:positions[0] + longest],
+                            positions))
+        return longest, sorted(repeats)
+
+    def maximal_repeats(self: object,
+                        min_length: int=2) -> List[Tuple[int, List[int]]]:
+        """Finds the maximal repeats, the substrings that occur at least twice
+        and cannot be extended to the left or to the right without losing an
+        occurrence. Every LCP interval is right maximal, it is left maximal
+        when its suffixes follow different characters (or one starts the
+        sequence); the left contexts are merged from the child intervals up.
+        - Complexity of the algorithm O(n) plus the size of the output
+
+        Parameters
+        ----------
+        min_length : int, optional
+            The shortest reported repeat. The default is 2.
+
+        Returns
+        -------
+        List[Tuple[int, List[int]]]
+            The length and the sorted positions of every maximal repeat,
+            longest first.
+
+        """
+        def merge(left: object, other: object) -> object:
+            if left is None or left == other:
+                return other
+            if other is None:
+                return left
+            return DIVERSE
+
+        repeats = []
+        stack = [[0, 0, None]] # height, left bound, left context
+        rows = len(self.suff_arr)
+        for row in range(1, rows + 1, 1):
+            height = self.lcp[row] if row < rows else 0
+            bound = row - 1
+            position = self.suff_arr[row - 1]
+            carry = self.sequence[position - 1] if position > 0 else DIVERSE
+            while height < stack[-1][0]:
+                top_height, bound, left = stack.pop()
+                carry = merge(left, carry)
+                if top_height >= min_length and carry is DIVERSE:
+                    repeats.append((top_height,
+                                    sorted(self.suff_arr[bound:row])))
+            if height > stack[-1][0]:
+                stack.append([height, bound, carry])
+            else:
+                stack[-1][2] = merge(stack[-1][2], carry)
+        return sorted(repeats, key=lambda repeat: (-repeat[0], repeat[1]))
+
+    def tandem_repeats(self: object, max_period: int=6,
+                       min_copies: int=3) -> List[Tuple[int, int, int]]:
+        """Scans the sequence for tandem repeats, maximal runs of copies of a
+        primitive unit (a unit that is not itself a repetition). Every period
+        is one vectorized comparison of the sequence with its shifted copy,
+        i.e; O(n) per period.
+
+        Parameters
+        ----------
+        max_period : int, optional
+            The longest unit. The default is 6, i.e; microsatellites.
+        min_copies : int, optional
+            The fewest copies of the unit. The default is 3.
+
+        Returns
+        -------
+        List[Tuple[int, int, int]]
+            The start, period and number of whole copies of every tandem
+            repeat, sorted by start.
+
+        """
+        codes = np.frombuffer(self.sequence.encode('utf-32-le'), dtype='<u4')
+        repeats = []
+        for period in range(1, max_period + 1, 1):
+            if len(codes) <= period:
+                break
+            equal = np.concatenate(([False], codes[period:] == codes[:-period],
+                                    [False])).astype(np.int8)
+            edges = np.diff(equal)
+            starts = np.flatnonzero(edges == 1)
+            stops = np.flatnonzero(edges == -1)
+            for start, stop in zip(starts.tolist(), stops.tolist()):
+                copies = (stop - start + period) // period
+                unit = self.sequence[start:start + period]
+                if copies < min_copies or any(
+                        period % smaller == 0 and
+                        unit == unit[:smaller] * (period // smaller)
+                        for smaller in range(1, period)):
+                    continue
+                repeats.append((start, period, copies))
+        return sorted(repeats)
@@ -126,6 +126,37 @@ class Sequence:
         with open(self.path, 'wb') as file:
             file.write(content.encode("utf-8"))
 
+    def read_raw(self: object) -> bytes:
+        """This method is used to read a binary file as it is, useful when
+        reading files that were written by binary entropy coders (rANS).
+
+        Returns
+        -------
+        bytes
+            The contents of the file.
+
+        """
+        with open(self.path, 'rb') as file:
+            return file.read()
+
+    def write_raw(self: object, content: bytes) -> None:
+        """This method is used to write out binary content to a new file as
+        it is.
+
+        Parameters
+        ----------
+        content : bytes
+            The contents of the file.
+
+        Returns
+        -------
+        None
+            Writes out to a new file.
+
+        """
+        with open(self.path, 'wb') as file:
+            file.write(content)
+
     @staticmethod
     def generate(length: int) -> str:
         """This method is used to generate a random DNA sequence using the
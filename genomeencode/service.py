@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+A long-running compression service, so that the tools that compress many
+small sequences pay the interpreter start and the imports once. It speaks
+HTTP/1.1 with keep-alive, on localhost or on a Unix socket:
+
+    POST /compress?entropy=rans   sequence -> compressed bytes
+    POST /decompress              compressed bytes -> sequence
+    GET  /extract?path=P&start=I&stop=J   a region of a blocked file
+
+The compress and decompress requests run on warm worker processes, small
+ones are gathered by a Batcher into shared worker calls. The regions are
+read in the service, through the shared block cache (see blocks.BlockReader).
+Errors are answered with 400 (invalid input), 404 (missing file) or 500 and a
+text message, see client.Client.
+
+Usage: python -m genomeencode.service [--host H] [--port P | --socket S]
+"""
+from __future__ import absolute_import
+import argparse
+import os
+import queue
+import signal
+import socketserver
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+from genomeencode import codec
+from genomeencode.blocks import BlockReader
+from genomeencode.metrics import MetricsSink, get_default_sink, measure
+
+# A job of the workers: (operation, payload, entropy)
+Job = Tuple[str, Union[str, bytes], str]
+
+def run_batch(jobs: List[Job]) -> List[object]:
+    """Runs a batch of jobs in a worker, a failed job does not fail the
+    others.
+
+    Parameters
+    ----------
+    jobs : List[Job]
+        The compress or decompress jobs.
+
+    Returns
+    -------
+    List[object]
+        The result of every job, or the exception it raised.
+
+    """
+    results = []
+    for operation, payload, entropy in jobs:
+        try:
+            if operation == 'compress':
+                results.append(codec.compress(payload, entropy))
+            else:
+                results.append(codec.decompress(payload))
+        except Exception as err:
+            results.append(err)
+    return results
+
+def start_worker() -> None:
+    """Initializes a worker, an interrupt only stops the service, which
+    then shuts the workers down."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def warm() -> int:
+    """Starts a worker, the codecs are imported with this module."""
+    return os.getpid()
+
+class Batcher:
+    """Gathers the small jobs submitted within a short delay into one worker
+    call, the larger jobs get a call of their own.
+
+    Attributes
+    ----------
+    executor: Executor
+        The workers.
+    delay: float
+        The seconds a batch waits for more jobs.
+    batch_bytes: int
+        The payload size that closes a batch before the delay.
+    small: int
+        The largest payload size of a batched job.
+    metrics: MetricsSink
+        The sink that receives the size and timing of every worker call.
+    """
+    DELAY = 0.002
+    BATCH_BYTES = 1 << 20
+    SMALL = 64 << 10
+
+    def __init__(self: object, executor: Executor, delay: float=DELAY,
+                 batch_bytes: int=BATCH_BYTES, small: int=SMALL,
+                 metrics: MetricsSink=None) -> None:
+        """Class constructor, starts the batching thread.
+
+        Parameters
+        ----------
+        executor : Executor
+            The workers.
+        delay : float, optional
+            The seconds a batch waits for more jobs. The default is 2 ms.
+        batch_bytes : int, optional
+            The payload size that closes a batch. The default is 1 Mi.
+        small : int, optional
+            The largest payload size of a batched job. The default is 64 Ki.
+        metrics : MetricsSink, optional
+            The metrics sink. The default is None, i.e; the default sink.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.executor = executor
+        self.delay = delay
+        self.batch_bytes = batch_bytes
+        self.small = small
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.__queue = queue.Queue()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def submit(self: object, operation: str, payload: Union[str, bytes],
+               entropy: str='rans') -> Future:
+        """Submits a job.
+
+        Parameters
+        ----------
+        operation : str
+            'compress' or 'decompress'.
+        payload : Union[str, bytes]
+            The sequence to compress or the data to decompress.
+        entropy : str, optional
+            The codec backend of a compression. The default is 'rans'.
+
+        Returns
+        -------
+        Future
+            The future of the compressed data or the sequence.
+
+        """
+        item = ((operation, payload, entropy), Future())
+        if len(payload) > self.small:
+            self.__dispatch([item])
+        else:
+            self.__queue.put(item)
+        return item[1]
+
+    def __run(self: object) -> None:
+        """The batching thread, it closes a batch after the delay, at the
+        size limit or when the batcher closes."""
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                return
+            batch = [item]
+            size = len(item[0][1])
+            deadline = time.monotonic() + self.delay
+            while size < self.batch_bytes:
+                try:
+                    item = self.__queue.get(
+                        timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self.__dispatch(batch)
+                    return
+                batch.append(item)
+                size += len(item[0][1])
+            self.__dispatch(batch)
+
+    def __dispatch(self: object, batch: List[Tuple[Job, Future]]) -> None:
+        """Submits a batch to the workers."""
+        event = {'controller': type(self).__name__, 'stage': 'batch',
+                 'bytes_in': sum(len(job[1]) for job, _ in batch),
+                 'bytes_out': 0, 'blocks': len(batch),
+                 'queue_depth': self.__queue.qsize(),
+                 'timestamp': time.time()}
+        started = time.perf_counter()
+        try:
+            future = self.executor.submit(run_batch,
+                                          [job for job, _ in batch])
+        except BaseException as err:
+            future = Future()
+            future.set_exception(err)
+        future.add_done_callback(partial(self.__done, batch, event, started))
+
+    def __done(self: object, batch: List[Tuple[Job, Future]], event: dict,
+               started: float, future: Future) -> None:
+        """Hands the results of a worker call to the futures of its jobs."""
+        try:
+            results = future.result()
+        except BaseException as err:
+            event['error'] = type(err).__name__
+            results = [err] * len(batch)
+        for (_, target), result in zip(batch, results):
+            if isinstance(result, BaseException):
+                target.set_exception(result)
+            else:
+                event['bytes_out'] += len(result)
+                target.set_result(result)
+        event['seconds'] = time.perf_counter() - started
+        self.metrics.record(event)
+
+    def close(self: object) -> None:
+        """Dispatches the pending jobs and stops the batching thread."""
+        if self.__thread.is_alive():
+            self.__queue.put(None)
+            self.__thread.join()
+
+class Handler(BaseHTTPRequestHandler):
+    """The request handler, a connection is kept alive between requests."""
+    protocol_version = 'HTTP/1.1'
+    # the headers and the body are sent apart, Nagle would delay the body
+    disable_nagle_algorithm = True
+
+    def do_GET(self: object) -> None:
+        self.respond()
+
+    def do_POST(self: object) -> None:
+        self.respond()
+
+    def respond(self: object) -> None:
+        """Answers a request with the result of Service.handle."""
+        url = urlsplit(self.path)
+        query = {key: values[-1]
+                 for key, values in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            status = 200
+            data = self.server.service.handle(self.command, url.path.strip(
+                '/'), query, body)
+        except FileNotFoundError as err:
+            status, data = 404, str(err).encode('utf-8')
+        except (KeyError, ValueError, IndexError) as err:
+            status, data = 400, str(err).encode('utf-8')
+        except Exception as err:
+            status, data = 500, ('%s: %s' % (type(err).__name__,
+                                             err)).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream'
+                         if status == 200 else 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self: object, format: str, *args: object) -> None:
+        """Requests are reported to the metrics sink, not logged."""
+
+class UnixHandler(Handler):
+    """The request handler of a Unix socket, which has no Nagle."""
+    disable_nagle_algorithm = False
+
+class UnixHTTPServer(socketserver.ThreadingMixIn,
+                     socketserver.UnixStreamServer):
+    """An HTTP server on a Unix socket, a thread per connection."""
+    daemon_threads = True
+
+class Service:
+    """The compression service, see the module docstring for the protocol.
+
+    Attributes
+    ----------
+    address: Union[str, Tuple[str, int]]
+        The address the service listens on, a Unix socket path or a host and
+        port.
+    executor: ProcessPoolExecutor
+        The warm workers.
+    batcher: Batcher
+        The batcher of the compress and decompress requests.
+    metrics: MetricsSink
+        The sink that receives the timings and counters of every request.
+    """
+
+    def __init__(self: object,
+                 address: Union[str, Tuple[str, int]]=('127.0.0.1', 0),
+                 workers: int=1, delay: float=Batcher.DELAY,
+                 small: int=Batcher.SMALL,
+                 metrics: MetricsSink=None) -> None:
+        """Class constructor, starts the workers and binds the address.
+
+        Parameters
+        ----------
+        address : Union[str, Tuple[str, int]], optional
+            A Unix socket path, or a host and port. The default is a free
+            port of localhost.
+        workers : int, optional
+            The number of worker processes. The default is 1.
+        delay : float, optional
+            The seconds a batch waits for more requests. The default is 2 ms.
+        small : int, optional
+            The largest batched payload size. The default is 64 Ki.
+        metrics : MetricsSink, optional
+            The metrics sink. The default is None, i.e; the default sink.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.metrics = metrics if metrics is not None else get_default_sink()
+        self.executor = ProcessPoolExecutor(workers,
+                                            initializer=start_worker)
+        # one call per worker, so that no request waits for a process start
+        for future in [self.executor.submit(warm) for _ in range(workers)]:
+            future.result()
+        self.batcher = Batcher(self.executor, delay, small=small,
+                               metrics=self.metrics)
+        try:
+            if isinstance(address, str):
+                if os.path.exists(address):
+                    os.remove(address)
+                self.server = UnixHTTPServer(address, UnixHandler)
+            else:
+                self.server = ThreadingHTTPServer(address, Handler)
+        except BaseException:
+            self.batcher.close()
+            self.executor.shutdown()
+            raise
+        self.server.service = self
+        self.address = self.server.server_address
+        self.__thread = None
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self: object, *args: object) -> None:
+        self.close()
+
+    def handle(self: object, method: str, operation: str, query: dict,
+               body: bytes) -> bytes:
+        """Answers a request.
+
+        Parameters
+        ----------
+        method : str
+            The HTTP method.
+        operation : str
+            'compress', 'decompress' or 'extract'.
+        query : dict
+            The query parameters.
+        body : bytes
+            The request body.
+
+        Returns
+        -------
+        bytes
+            The response body.
+
+        """
+        with measure(self.metrics, type(self).__name__, operation,
+                     len(body)) as event:
+            if method == 'POST' and operation == 'compress':
+                data = self.batcher.submit(
+                    operation, body.decode('utf-8'),
+                    query.get('entropy', 'rans')).result()
+            elif method == 'POST' and operation == 'decompress':
+                data = self.batcher.submit(operation, body).result().encode(
+                    'utf-8')
+            elif method == 'GET' and operation == 'extract':
+                stop = query.get('stop')
+                with BlockReader(query['path'], readahead=False,
+                                 metrics=self.metrics) as reader:
+                    data = reader.read(int(query.get('start', 0)),
+                                       None if stop is None else int(stop))
+                data = data.encode('utf-8')
+            else:
+                raise ValueError("Unknown request %s /%s" % (method,
+                                                            operation))
+            event['bytes_out'] = len(data)
+        return data
+
+    def serve_forever(self: object) -> None:
+        """Answers requests until shutdown is called."""
+        self.server.serve_forever()
+
+    def start(self: object) -> None:
+        """Answers requests on a background thread."""
+        self.__thread = threading.Thread(target=self.serve_forever,
+                                         daemon=True)
+        self.__thread.start()
+
+    def shutdown(self: object) -> None:
+        """Stops answering requests."""
+        self.server.shutdown()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def close(self: object) -> None:
+        """Stops the service, the workers and removes the Unix socket."""
+        if self.__thread is not None:
+            self.shutdown()
+        self.server.server_close()
+        self.batcher.close()
+        self.executor.shutdown()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+def main(args: List[str]=None) -> None:
+    """Runs the service until interrupted.
+
+    Parameters
+    ----------
+    args : List[str], optional
+        The command line arguments. The default is None, i.e; sys.argv.
+
+    Returns
+    -------
+    None
+
+    """
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='the host to listen on')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='the port to listen on')
+    parser.add_argument('--socket', help='a Unix socket to listen on instead')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='the number of worker processes')
+    parser.add_argument('--delay', type=float, default=Batcher.DELAY * 1000,
+                        help='the milliseconds a batch waits for requests')
+    options = parser.parse_args(args)
+    address = options.socket or (options.host, options.port)
+    with Service(address, options.workers, options.delay / 1000) as service:
+        try:
+            service.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == '__main__':
+    main()
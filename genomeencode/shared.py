@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Zero-copy data exchange with worker processes. The inputs and outputs of the
+parallel modes (see blocks.BlockReader.invert and decoder.HuffDecoder) are
+numpy arrays placed in multiprocessing.shared_memory segments: a worker only
+receives the spec of every segment (its name, shape and type) with the
+offsets of its slice, reads the inputs and writes its results in place.
+"""
+from __future__ import absolute_import
+from multiprocessing import shared_memory
+from typing import Tuple
+import numpy as np
+
+# The picklable description of a segment: (name, shape, dtype)
+Spec = Tuple[str, Tuple[int, ...], str]
+
+class SharedArray:
+    """A numpy array backed by a shared memory segment. The process that
+    creates the segment owns it and unlinks it when closing, the workers only
+    attach to it.
+
+    Attributes
+    ----------
+    memory: shared_memory.SharedMemory
+        The segment.
+    array: np.ndarray
+        The array, a view of the segment, None once closed.
+    owner: bool
+        Whether this process created the segment.
+    """
+
+    def __init__(self: object, shape: Tuple[int, ...], dtype: str,
+                 name: str=None) -> None:
+        """Class constructor, creates a segment or attaches to one.
+
+        Parameters
+        ----------
+        shape : Tuple[int, ...]
+            The shape of the array.
+        dtype : str
+            The type of the array, e.g; '<u4'.
+        name : str, optional
+            The name of the segment to attach to. The default is None, i.e;
+            a new segment.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        shape = tuple(shape)
+        self.owner = name is None
+        # an empty segment is not allowed
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        self.memory = shared_memory.SharedMemory(name, self.owner, size)
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.memory.buf)
+
+    @staticmethod
+    def copy(array: np.ndarray) -> object:
+        """Creates a segment that holds a copy of an array.
+
+        Parameters
+        ----------
+        array : np.ndarray
+            The array.
+
+        Returns
+        -------
+        SharedArray
+            The owned shared array.
+
+        """
+        shared = SharedArray(array.shape, array.dtype.str)
+        shared.array[...] = array
+        return shared
+
+    @staticmethod
+    def attach(spec: Spec) -> object:
+        """Attaches to the segment of a spec, in a worker."""
+        name, shape, dtype = spec
+        return SharedArray(shape, dtype, name)
+
+    @property
+    def spec(self: object) -> Spec:
+        """The spec a worker attaches to the segment with."""
+        return (self.memory.name, self.array.shape, self.array.dtype.str)
+
+    def __enter__(self: object) -> object:
+        return self
+
+    def __exit__(self: object, *args: object) -> None:
+        self.close()
+
+    def close(self: object) -> None:
+        """Drops the array and detaches from the segment, the owner also
+        unlinks it. The views of the array must not outlive this call."""
+        if self.array is None:
+            return
+        self.array = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
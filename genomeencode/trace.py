@@ -0,0 +1,426 @@
+# -*- coding: utf-8 -*-
+"""
+Compact step-by-step traces of the Burrows-Wheeler protocols for the View
+class (the GUI). A trace only keeps the sequence and a permutation of its
+rotations (the suffix array), every step of the naive protocols is rendered
+again on demand instead of being stored as a copy of the whole matrix.
+Controllers only record a trace when one is given to them. Steps can also be
+rendered as lazy matrices, of which only a window of rows and columns is
+rendered at a time (the visible part of the GUI).
+"""
+from __future__ import absolute_import
+from typing import Callable, Iterator, List
+from genomeencode.burros_wheeler import BurrosWheeler
+
+def cyclic_slice(text: str, start: int, length: int) -> str:
+    """Returns length characters of a text read as a circular string, from a
+    given start, without copying the whole rotation.
+
+    Parameters
+    ----------
+    text : str
+        The circular text.
+    start : int
+        The index of the first character.
+    length : int
+        The number of characters, at most the length of the text.
+
+    Returns
+    -------
+    str
+        The characters.
+
+    """
+    start %= len(text)
+    end = start + length
+    if end <= len(text):
+        return text[start:end]
+    return text[start:] + text[:end - len(text)]
+
+class LazyMatrix:
+    """A matrix of characters (a list of lines) whose lines are only rendered
+    on demand, piece by piece.
+
+    Attributes
+    ----------
+    height: int
+        The number of lines.
+    width: int
+        The length of the longest line.
+    render: Callable[[int, int, int], str]
+        Renders the characters [start, stop) of a given line.
+    """
+
+    def __init__(self: object, height: int, width: int,
+                 render: Callable[[int, int, int], str]) -> None:
+        """Class constructor.
+
+        Parameters
+        ----------
+        height : int
+            The number of lines.
+        width : int
+            The length of the longest line.
+        render : Callable[[int, int, int], str]
+            Renders the characters [start, stop) of the line given first.
+
+        Returns
+        -------
+        None
+            A class instance.
+
+        """
+        self.height = height
+        self.width = width
+        self.render = render
+
+    @staticmethod
+    def from_lines(lines: List[str]) -> object:
+        """Wraps an already rendered list of lines.
+
+        Parameters
+        ----------
+        lines : List[str]
+            The lines of the matrix.
+
+        Returns
+        -------
+        LazyMatrix
+            The matrix.
+
+        """
+        width = max([len(line) for line in lines], default=0)
+        return LazyMatrix(len(lines), width,
+                          lambda i, start, stop: lines[i][start:stop])
+
+    @staticmethod
+    def from_text(text: str) -> object:
+        """Wraps an already rendered text, one line of the matrix per line of
+        the text.
+
+        Parameters
+        ----------
+        text : str
+            The text.
+
+        Returns
+        -------
+        LazyMatrix
+            The matrix.
+
+        """
+        return LazyMatrix.from_lines(text.split('\n'))
+
+    def __len__(self: object) -> int:
+        """The number of lines of the matrix."""
+        return self.height
+
+    def window(self: object, top: int, bottom: int, left: int,
+               right: int) -> List[str]:
+        """Renders a rectangular window of the matrix.
+
+        Parameters
+        ----------
+        top : int
+            The first line of the window.
+        bottom : int
+            The line after the last line of the window.
+        left : int
+            The first column of the window.
+        right : int
+            The column after the last column of the window.
+
+        Returns
+        -------
+        List[str]
+            The lines of the window.
+
+        """
+        return [self.render(i, left, right)
+                for i in range(max(top, 0), min(bottom, self.height), 1)]
+
+    def lines(self: object) -> List[str]:
+        """Renders the whole matrix.
+
+        Returns
+        -------
+        List[str]
+            All the lines of the matrix.
+
+        """
+        return self.window(0, self.height, 0, self.width)
+
+class EncodeTrace:
+    """A trace of the Burrows-Wheeler transform protocol: generating all the
+    rotations of the sequence, sorting them into the Burrows-Wheeler Matrix
+    and taking the last column.
+
+    Attributes
+    ----------
+    text: str
+        The sequence followed by the '$' sign.
+    order: List[int]
+        The starting index of the rotation of every row of the matrix, i.e;
+        the suffix array of the sequence.
+    bwt: str
+        The Burros-Wheeler transform of the sequence.
+    """
+
+    def __init__(self: object) -> None:
+        """Class constructor.
+
+        Returns
+        -------
+        None
+            An empty trace, filled by the controller.
+
+        """
+        self.text = None
+        self.order = None
+        self.bwt = None
+
+    def record(self: object, sequence: str, suff_arr: List[int]) -> None:
+        """Records the sequence and its suffix array, called by the encoder.
+
+        Parameters
+        ----------
+        sequence : str
+            The sequence to be transformed, without the '$' sign.
+        suff_arr : List[int]
+            The integer suffix array of the sequence.
+
+        Returns
+        -------
+        None
+
+        """
+        self.text = sequence + '$'
+        self.order = suff_arr
+        self.bwt = BurrosWheeler.bwt_from_suffix_array(sequence, suff_arr)
+
+    def rotation(self: object, index: int) -> str:
+        """Renders the rotation of the sequence that starts at a given index.
+
+        Parameters
+        ----------
+        index : int
+            The starting index of the rotation.
+
+        Returns
+        -------
+        str
+            The rotation.
+
+        """
+        return self.text[index:] + self.text[:index]
+
+    def __len__(self: object) -> int:
+        """The number of rotation steps, i.e; the length of the sequence
+        with the '$' sign."""
+        return len(self.text)
+
+    def _rotation_slice(self: object, index: int, start: int,
+                        stop: int) -> str:
+        """Renders the characters [start, stop) of a rotation."""
+        stop = min(stop, len(self.text))
+        if stop <= start:
+            return ''
+        return cyclic_slice(self.text, index + start, stop - start)
+
+    def rotations_view(self: object, step: int) -> LazyMatrix:
+        """A lazy view of a step of the rotations generation.
+
+        Parameters
+        ----------
+        step : int
+            The step to be rendered.
+
+        Returns
+        -------
+        LazyMatrix
+            The rotations generated so far.
+
+        """
+        return LazyMatrix(step + 1, len(self.text), self._rotation_slice)
+
+    def rotations(self: object, step: int) -> List[str]:
+        """Renders a step of the rotations generation, the step-th step holds
+        the first step + 1 rotations (like BurrosWheeler.string_rotations).
+
+        Parameters
+        ----------
+        step : int
+            The step to be rendered.
+
+        Returns
+        -------
+        List[str]
+            The rotations generated so far.
+
+        """
+        return self.rotations_view(step).lines()
+
+    def bwm_view(self: object) -> LazyMatrix:
+        """A lazy view of the Burrows-Wheeler Matrix.
+
+        Returns
+        -------
+        LazyMatrix
+            The Burrows-Wheeler Matrix.
+
+        """
+        return LazyMatrix(len(self.text), len(self.text),
+                          lambda i, start, stop: self._rotation_slice(
+                              self.order[i], start, stop))
+
+    def bwm(self: object) -> List[str]:
+        """Renders the Burrows-Wheeler Matrix, i.e; all sorted rotations.
+
+        Returns
+        -------
+        List[str]
+            The Burrows-Wheeler Matrix.
+
+        """
+        return self.bwm_view().lines()
+
+    def steps(self: object) -> Iterator[List[str]]:
+        """Renders the rotation steps one at a time.
+
+        Yields
+        ------
+        Iterator[List[str]]
+            Every step of the rotations generation.
+
+        """
+        for step in range(0, len(self), 1):
+            yield self.rotations(step)
+
+class DecodeTrace:
+    """A trace of the naive inverse Burrows-Wheeler transform protocol: the
+    transform is repeatedly added as a left column to the matrix which is
+    sorted after every addition.
+
+    Attributes
+    ----------
+    bwt: str
+        The Burros-Wheeler transform.
+    text: str
+        The original sequence followed by the '$' sign.
+    order: List[int]
+        The starting index of the rotation of every row of the matrix, it is
+        found while following the LF mapping.
+    original: str
+        The original sequence.
+    """
+
+    def __init__(self: object) -> None:
+        """Class constructor.
+
+        Returns
+        -------
+        None
+            An empty trace, filled by the controller.
+
+        """
+        self.bwt = None
+        self.text = None
+        self.order = None
+        self.original = None
+
+    def record(self: object, bwt: str) -> None:
+        """Records the transform, the rows of the matrix are found by walking
+        the LF mapping once, called by the decoder.
+
+        Parameters
+        ----------
+        bwt : str
+            The Burros-Wheeler transform.
+
+        Returns
+        -------
+        None
+
+        """
+        length = len(bwt)
+        lf_map = BurrosWheeler.lf_mapping(bwt)
+        order = [0] * length
+        reverse = []
+        row = bwt.index('$')
+        order[row] = 0 # the row that ends with '$' is the sequence itself
+        row = lf_map[row]
+        for position in range(length - 1, 0, -1):
+            order[row] = position
+            reverse.append(bwt[row])
+            row = lf_map[row]
+
+        self.bwt = bwt
+        self.original = ''.join(reversed(reverse))
+        self.text = self.original + '$'
+        self.order = order
+
+    def __len__(self: object) -> int:
+        """The number of steps, a column is added then sorted for every
+        character of the transform."""
+        return 2 * len(self.bwt)
+
+    def matrix_view(self: object, step: int) -> LazyMatrix:
+        """A lazy view of a step of the matrix reconstruction, even steps show
+        the matrix right after adding a column and odd steps show it sorted
+        (like BurrosWheeler.reconstruct_bwm).
+
+        Parameters
+        ----------
+        step : int
+            The step to be rendered.
+
+        Returns
+        -------
+        LazyMatrix
+            The partially reconstructed matrix.
+
+        """
+        width = step // 2 + 1
+
+        def render(i: int, start: int, stop: int) -> str:
+            stop = min(stop, width)
+            if stop <= start:
+                return ''
+            if step % 2: # sorted rows are the prefixes of the sorted rotations
+                return cyclic_slice(self.text, self.order[i] + start,
+                                    stop - start)
+            # unsorted rows are the transform followed by the previous step
+            row = self.bwt[i] if start == 0 else ''
+            return row + cyclic_slice(self.text,
+                                      self.order[i] + max(start - 1, 0),
+                                      stop - max(start, 1))
+
+        return LazyMatrix(len(self.bwt), width, render)
+
+    def matrix(self: object, step: int) -> List[str]:
+        """Renders a step of the matrix reconstruction, see matrix_view.
+
+        Parameters
+        ----------
+        step : int
+            The step to be rendered.
+
+        Returns
+        -------
+        List[str]
+            The partially reconstructed matrix.
+
+        """
+        return self.matrix_view(step).lines()
+
+    def steps(self: object) -> Iterator[List[str]]:
+        """Renders the reconstruction steps one at a time.
+
+        Yields
+        ------
+        Iterator[List[str]]
+            Every step of the matrix reconstruction.
+
+        """
+        for step in range(0, len(self), 1):
+            yield self.matrix(step)
@@ -3,6 +3,9 @@ import setuptools
 with open("README.md", "r") as fh:
     long_description = fh.read()
 
+with open("requirements.txt", "r") as fh:
+    REQUIREMENTS = [line.strip() for line in fh if line.strip()]
+
 setuptools.setup(
     name='genomeencode',
     version='1.0.0',
@@ -20,7 +23,7 @@ setuptools.setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    #install_requires=REQUIREMENTS,
+    install_requires=REQUIREMENTS,
     extras_require={
         'dev': [
             'pytest >= 6.0.0',
@@ -33,7 +36,10 @@ setuptools.setup(
     entry_points={
         'gui_scripts': [
             'genomeencode=genomeencode.interface:Interface.main'
+        ],
+        'console_scripts': [
+            'genomeencode-serve=genomeencode.service:main'
         ]
     },
-    python_requires='>=3.6',
+    python_requires='>=3.8',
 )
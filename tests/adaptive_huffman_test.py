@@ -0,0 +1,74 @@
+# coding: utf-8
+"""Unitary test for the streaming adaptive Huffman coder."""
+from __future__ import absolute_import
+import io
+import random
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode.sequence import Sequence
+from genomeencode.adaptive_huffman import AdaptiveHuffmanEncoder, \
+    AdaptiveHuffmanDecoder, compress_stream, decompress_stream
+
+class AdaptiveHuffmanTest(unittest.TestCase):
+    """Test class to try out the one-pass adaptive Huffman coding."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.sequence = '\n'.join(Sequence.generate(80) for _ in range(300))
+
+    def test_pieces(self: object) -> None:
+
+        for sequence in ["", "A", "ACGT", "h\xe9llo \U0001f9ec" * 20,
+                         self.sequence]:
+            encoder = AdaptiveHuffmanEncoder()
+            coded = b''.join([encoder.feed(sequence[i:i + 37])
+                              for i in range(0, len(sequence), 37)])
+            coded += encoder.flush()
+
+            decoder = AdaptiveHuffmanDecoder()
+            decoded = ''.join([decoder.feed(coded[i:i + 5])
+                               for i in range(0, len(coded), 5)])
+            decoded += decoder.flush()
+            self.assertEqual(decoded, sequence)
+            self.assertTrue(decoder.finished)
+
+    def test_incremental(self: object) -> None:
+
+        encoder = AdaptiveHuffmanEncoder()
+        first = encoder.feed(self.sequence[:10000])
+        # output starts before the end of the input is known
+        self.assertGreater(len(first), 2000)
+        coded = first + encoder.feed(self.sequence[10000:]) + encoder.flush()
+        with self.assertRaises(ValueError):
+            encoder.feed("A")
+
+        decoder = AdaptiveHuffmanDecoder()
+        decoded = decoder.feed(coded[:len(first)])
+        self.assertTrue(self.sequence.startswith(decoded))
+        self.assertGreater(len(decoded), 8000)
+
+    def test_truncated(self: object) -> None:
+
+        encoder = AdaptiveHuffmanEncoder()
+        coded = encoder.feed(self.sequence) + encoder.flush()
+        decoder = AdaptiveHuffmanDecoder()
+        decoder.feed(coded[:-10])
+        with self.assertRaises(ValueError):
+            decoder.flush()
+
+    def test_streams(self: object) -> None:
+
+        coded = io.BytesIO()
+        size = compress_stream(io.StringIO(self.sequence), coded, 1000)
+        self.assertEqual(size, len(coded.getvalue()))
+        # about 2.3 bits per character for 5 bases and newlines
+        self.assertLess(size, len(self.sequence) * 3 / 8)
+        coded.seek(0)
+        decoded = io.StringIO()
+        decompress_stream(coded, decoded, 1000)
+        self.assertEqual(decoded.getvalue(), self.sequence)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# coding: utf-8
+"""Unitary test for the asyncio compression and decompression API."""
+from __future__ import absolute_import
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append('../')
+from genomeencode.aio import compress_async, decompress_async, iter_blocks
+from genomeencode.blocks import BlockCache, BlockReader, BlockWriter
+from genomeencode.metrics import MemorySink
+from genomeencode.sequence import Sequence
+
+class AsyncTest(unittest.TestCase):
+    """Test class to try out many jobs on one event loop."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.directory = tempfile.mkdtemp()
+        self.sequences = [Sequence.generate(random.randrange(1, 20000))
+                          for _ in range(8)]
+        self.paths = []
+        for number, sequence in enumerate(self.sequences):
+            path = os.path.join(self.directory, "seq%d.txt" % number)
+            Sequence(path).write('\n'.join(
+                sequence[start:start + 70]
+                for start in range(0, len(sequence), 70)) + '\n')
+            self.paths.append(path)
+
+    def test_jobs(self: object) -> None:
+
+        sink = MemorySink()
+
+        async def job(path: str) -> str:
+            output = await compress_async(path, block_size=3000,
+                                          metrics=sink)
+            return await decompress_async(output, metrics=sink)
+
+        async def jobs() -> list:
+            return await asyncio.gather(*[job(path) for path in self.paths])
+
+        decoded = asyncio.run(jobs())
+        for path, sequence in zip(decoded, self.sequences):
+            self.assertEqual(Sequence(path).read(), sequence)
+        summary = sink.summary()
+        self.assertEqual(summary[('compress_async', 'total')]['calls'], 8)
+        self.assertEqual(summary[('compress_async', 'total')]['blocks'],
+                         sum(-(-len(sequence) // 3000)
+                             for sequence in self.sequences))
+        self.assertEqual(summary[('decompress_async', 'total')]['calls'], 8)
+        with BlockReader(os.path.splitext(self.paths[0])[0] + '.gblk') as \
+                reader:
+            self.assertEqual(reader.read(), self.sequences[0])
+
+    def test_executor(self: object) -> None:
+
+        sequence = Sequence.generate(25000)
+        blocked = os.path.join(self.directory, "seq.gblk")
+        BlockWriter(blocked, 4096, isa_sample=64).write(sequence)
+
+        async def regions(executor: ProcessPoolExecutor) -> list:
+            pieces = []
+            for start, stop in [(0, None), (5000, 13000), (4096, 4097),
+                                (100, 100)]:
+                pieces.append(''.join([piece async for piece in iter_blocks(
+                    blocked, start, stop, executor, in_flight=2)]))
+            return pieces
+
+        with ProcessPoolExecutor(2) as executor:
+            pieces = asyncio.run(regions(executor))
+            self.assertEqual(pieces, [sequence, sequence[5000:13000],
+                                      sequence[4096], ''])
+            output = asyncio.run(compress_async(
+                self.paths[1], entropy='context', executor=executor))
+        with BlockReader(output, BlockCache()) as reader:
+            self.assertEqual(reader.read(), self.sequences[1])
+
+    def test_cancel(self: object) -> None:
+
+        path = os.path.join(self.directory, "seq.txt")
+        Sequence(path).write(Sequence.generate(200000))
+        output = os.path.join(self.directory, "seq.gblk")
+
+        async def cancel() -> None:
+            task = asyncio.ensure_future(compress_async(
+                path, output, block_size=500, in_flight=1))
+            while not os.path.exists(output):
+                await asyncio.sleep(0.001)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel())
+        self.assertFalse(os.path.exists(output))
+        with self.assertRaises(ValueError):
+            asyncio.run(compress_async(self.paths[0], in_flight=0))
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -40,6 +40,20 @@ class AlgorithmsTest(unittest.TestCase):
         t = BurrosWheeler.bwt_advanced(self.sequence)
         self.assertEqual(t, self.transform)
         
+    def test_bw_int_suffix_array(self: object) -> None:
+
+        suff_arr = BurrosWheeler.int_suffix_array(self.sequence)
+        expected = [suff[1] for suff in
+                    BurrosWheeler.suffix_array(self.sequence)]
+        self.assertEqual(suff_arr, expected)
+        t = BurrosWheeler.bwt_from_suffix_array(self.sequence, suff_arr)
+        self.assertEqual(t, self.transform)
+
+    def test_bw_detransform_lf(self: object) -> None:
+
+        seq = BurrosWheeler.inverse_bwt(self.transform)
+        self.assertEqual(seq, self.sequence)
+
     def test_huffman_coding(self: object) -> None:
     
         tree = HuffmanTree(self.transform)
@@ -53,6 +67,32 @@ class AlgorithmsTest(unittest.TestCase):
         decoded = HuffmanTree.binstr_to_seq(binary_no_pad, tree.codes)
         self.assertEqual(decoded, self.transform)
 
+    def test_huffman_length_limited(self: object) -> None:
+
+        frequency = {chr(65 + i): 2 ** i for i in range(20)}
+        codes = HuffmanTree.limited_codes(frequency, 12)
+        self.assertLessEqual(max(map(len, codes.values())), 12)
+        self.assertLessEqual(sum(2 ** -len(path)
+                                 for path in codes.values()), 1)
+        for path in codes.values(): # a prefix code
+            self.assertFalse(any(other != path and other.startswith(path)
+                                 for other in codes.values()))
+
+        # without a limit package-merge finds the Huffman code lengths
+        tree = HuffmanTree(self.transform)
+        tree.get_codings(tree.root)
+        chars = sorted(tree.frequency)
+        lengths = HuffmanTree.package_merge(
+            [tree.frequency[char] for char in chars], 30)
+        self.assertEqual(sum(tree.frequency[char] * length
+                             for char, length in zip(chars, lengths)),
+                         sum(tree.frequency[char] * len(tree.codes[char])
+                             for char in chars))
+
+        binary = ''.join(codes[char] for char in "ABCDTTTA")
+        codes['pad'] = '1' # the padding is not a code
+        self.assertEqual(HuffmanTree.binstr_to_seq(binary, codes), "ABCDTTTA")
+
     def tearDown(self: object) -> None:
         
         self.sequence = None
@@ -0,0 +1,224 @@
+# coding: utf-8
+"""Unitary test for the blocked files and their cache of decoded blocks."""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import tempfile
+import threading
+import unittest
+import sys
+sys.path.append('../')
+import numpy as np
+from genomeencode import codec
+from genomeencode.blocks import BlockCache, BlockReader, BlockWriter, \
+    invert_segments, invert_shared, lf_mapping
+from genomeencode.metrics import MemorySink
+from genomeencode.sequence import Sequence
+from genomeencode.shared import SharedArray
+
+class BlocksTest(unittest.TestCase):
+    """Test class to try out random access to blocked files."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.directory = tempfile.mkdtemp()
+        self.sequence = Sequence.generate(50000)
+        self.path = os.path.join(self.directory, "seq.gblk")
+        BlockWriter(self.path, 4096).write(self.sequence)
+
+    def test_read(self: object) -> None:
+
+        with BlockReader(self.path, BlockCache()) as reader:
+            self.assertEqual(len(reader), len(self.sequence))
+            self.assertEqual(reader.count, 13)
+            self.assertEqual(reader.read(), self.sequence)
+            for _ in range(50):
+                start = random.randrange(len(self.sequence))
+                stop = start + random.randrange(10000)
+                self.assertEqual(reader.read(start, stop),
+                                 self.sequence[start:stop])
+            self.assertEqual(reader.read(-100), self.sequence[-100:])
+            self.assertEqual(reader.read(10, 10), '')
+
+        for entropy in ['multihuffman', 'context']:
+            BlockWriter(self.path, 10000, entropy).write(self.sequence[:25000])
+            with BlockReader(self.path, BlockCache()) as reader:
+                self.assertEqual(reader.read(9000, 21000),
+                                 self.sequence[9000:21000])
+        BlockWriter(self.path).write("")
+        with BlockReader(self.path) as reader:
+            self.assertEqual(reader.read(), "")
+
+    def test_cache(self: object) -> None:
+
+        sink = MemorySink()
+        cache = BlockCache(3 * 4096)
+        with BlockReader(self.path, cache, False, sink) as reader:
+            for _ in range(3):
+                reader.read(100, 200)
+                reader.read(4000, 4200) # two blocks
+            decodes = sink.summary()[('BlockReader', 'decode')]
+            self.assertEqual(decodes['calls'], 2)
+            stats = cache.stats()
+            self.assertEqual((stats['hits'], stats['misses']), (7, 2))
+            self.assertAlmostEqual(stats['hit_rate'], 7 / 9)
+            reader.read(8192, 20000)
+            stats = cache.stats()
+            self.assertEqual(stats['blocks'], 3)
+            self.assertLessEqual(stats['size'], 3 * 4096)
+            self.assertGreater(stats['evictions'], 0)
+
+        # a rewritten file does not hit the old blocks
+        BlockWriter(self.path, 4096).write(self.sequence[::-1])
+        with BlockReader(self.path, cache) as reader:
+            self.assertEqual(reader.read(8192, 8292),
+                             self.sequence[::-1][8192:8292])
+
+    def test_readahead(self: object) -> None:
+
+        sink = MemorySink()
+        cache = BlockCache()
+        with BlockReader(self.path, cache, True, sink) as reader:
+            reader.block(0)
+            reader.block(1)
+            reader.close() # waits for the prefetch of the next block
+            self.assertIn(reader.key(2), cache)
+            decodes = sink.summary()[('BlockReader', 'decode')]
+            self.assertEqual(decodes['calls'], 3)
+
+    def test_threads(self: object) -> None:
+
+        cache = BlockCache(5 * 4096)
+        errors = []
+        with BlockReader(self.path, cache) as reader:
+            def work(seed: int) -> None:
+                generator = random.Random(seed)
+                for _ in range(100):
+                    start = generator.randrange(len(self.sequence))
+                    stop = start + generator.randrange(3000)
+                    if reader.read(start, stop) != self.sequence[start:stop]:
+                        errors.append((start, stop))
+            threads = [threading.Thread(target=work, args=(seed,))
+                       for seed in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
+
+    def test_sampled(self: object) -> None:
+
+        sink = MemorySink()
+        BlockWriter(self.path, 8192, 'multihuffman',
+                    isa_sample=64).write(self.sequence)
+        with BlockReader(self.path, BlockCache(), False, sink) as reader:
+            self.assertEqual(reader.isa_sample, 64)
+            for _ in range(50):
+                start = random.randrange(len(self.sequence))
+                stop = start + random.randrange(1000)
+                self.assertEqual(reader.read(start, stop),
+                                 self.sequence[start:stop])
+            # the end of the last block is extracted from the '$' row
+            self.assertEqual(reader.extract(6, 600, 848),
+                             self.sequence[-248:])
+            self.assertEqual(reader.extract(5, 100, 8100),
+                             self.sequence[41060:49060])
+            cache = reader.cache
+            cache.clear()
+            reader.transform(6)
+            # short regions of a block whose transform is cached
+            for _ in range(20):
+                start = 49152 + random.randrange(848)
+                stop = min(start + random.randrange(256), len(self.sequence))
+                self.assertEqual(reader.read(start, stop),
+                                 self.sequence[start:stop])
+            self.assertNotIn(reader.key(6), cache)
+            self.assertEqual(reader.read(), self.sequence)
+            self.assertIn(reader.key(6), cache)
+            summary = sink.summary()
+            # every block is decoded once per clear, the last one from its
+            # cached transform the second time
+            self.assertEqual(summary[('BlockReader', 'decode')]['calls'], 14)
+            self.assertEqual(summary[('BlockReader', 'transform')]['calls'],
+                             3)
+            self.assertEqual(summary[('BlockReader', 'extract')]['calls'],
+                             22)
+
+    def test_extract_read(self: object) -> None:
+
+        sink = MemorySink()
+        BlockWriter(self.path, 8192, 'multihuffman',
+                    isa_sample=64).write(self.sequence)
+        with BlockReader(self.path, BlockCache(), False, sink) as reader:
+            for start, stop in [(5, 5), (100, 50), (8192, 9000)]:
+                self.assertEqual(reader.extract(0, start, stop), '')
+            self.assertEqual(reader.extract(6, 840, 900),
+                             self.sequence[-8:])
+            for number in [-1, 7]:
+                with self.assertRaises(IndexError):
+                    reader.extract(number, 0, 10)
+
+            # the transform cached by an extraction serves the short reads
+            self.assertEqual(reader.extract(2, 0, 10),
+                             self.sequence[16384:16394])
+            for start in [16384, 16500, 17000, 24000, 24300]:
+                self.assertEqual(reader.read(start, start + 200),
+                                 self.sequence[start:start + 200])
+            summary = sink.summary()
+            self.assertEqual(summary[('BlockReader', 'extract')]['calls'], 7)
+            self.assertNotIn(('BlockReader', 'decode'), summary)
+            # a longer read inverts the block from the same transform
+            self.assertEqual(reader.read(16384, 20000),
+                             self.sequence[16384:20000])
+            summary = sink.summary()
+            self.assertEqual(summary[('BlockReader', 'decode')]['calls'], 1)
+            self.assertEqual(summary[('BlockReader', 'transform')]['calls'],
+                             2)
+
+    def test_parallel_inverse(self: object) -> None:
+
+        BlockWriter(self.path, 30000, isa_sample=64).write(self.sequence)
+        for workers in [1, 3]:
+            with BlockReader(self.path, BlockCache(),
+                             workers=workers) as reader:
+                self.assertEqual(reader.read(), self.sequence)
+        for length in [1, 63, 64, 65, 200]:
+            BlockWriter(self.path, 100, isa_sample=64).write(
+                self.sequence[:length])
+            with BlockReader(self.path, BlockCache(), workers=2) as reader:
+                self.assertEqual(reader.read(), self.sequence[:length])
+
+        # a worker walks its slice with the LF mapping of the parent
+        _, ranks = BlockReader.ranks(codec.compress(self.sequence[:5000]))
+        rows = np.arange(0, len(ranks), 100)
+        expected = invert_segments(ranks, rows, 64)
+        with SharedArray.copy(ranks) as shared_ranks, \
+                SharedArray.copy(lf_mapping(ranks)) as shared_lf_map, \
+                SharedArray.copy(rows) as shared_rows, \
+                SharedArray(expected.shape, expected.dtype.str) as output:
+            for first, stop in [(0, 20), (20, len(rows))]:
+                invert_shared(shared_ranks.spec, shared_lf_map.spec,
+                              shared_rows.spec, output.spec, first, stop, 64)
+            self.assertEqual(output.array.tolist(), expected.tolist())
+
+    def test_invalid(self: object) -> None:
+
+        with self.assertRaises(ValueError):
+            BlockWriter(self.path, 4096, 'context', isa_sample=64)
+        with BlockReader(self.path) as reader:
+            with self.assertRaises(ValueError):
+                reader.extract(0, 0, 10)
+        Sequence(self.path).write("ACGT" * 20)
+        with self.assertRaises(ValueError):
+            BlockReader(self.path)
+        with self.assertRaises(ValueError):
+            BlockWriter(self.path, 0)
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
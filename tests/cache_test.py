@@ -0,0 +1,93 @@
+# coding: utf-8
+"""Unitary test for the cache of compression results."""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import tempfile
+import time
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode.cache import ResultCache
+from genomeencode.sequence import Sequence
+from genomeencode.encoder import FullEncoder
+from genomeencode.decoder import FullDecoder
+from genomeencode.metrics import MemorySink
+
+class ResultCacheTest(unittest.TestCase):
+    """Test class to try out the content-addressed result cache."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.directory = tempfile.mkdtemp()
+        self.cache = ResultCache(os.path.join(self.directory, 'cache'))
+        self.sequence = Sequence.generate(3000)
+        self.path = os.path.join(self.directory, "seq.txt")
+        Sequence(self.path).write(self.sequence)
+
+    def test_controllers(self: object) -> None:
+
+        for entropy in ['huffman', 'rans', 'context']:
+            encoder = FullEncoder(self.path, entropy=entropy, cache=self.cache)
+            encoder.full_zip()
+            self.assertFalse(encoder.cached)
+            compressed = Sequence(encoder.output).read_raw()
+            os.remove(encoder.output)
+
+            sink = MemorySink()
+            encoder = FullEncoder(self.path, sink, entropy=entropy,
+                                  cache=self.cache)
+            encoder.full_zip()
+            self.assertTrue(encoder.cached)
+            self.assertEqual(Sequence(encoder.output).read_raw(), compressed)
+            # the encoders did not run
+            self.assertEqual(list(sink.summary()), [('FullEncoder', 'total')])
+
+            for cached in [False, True]:
+                decoder = FullDecoder(encoder.output, cache=self.cache)
+                decoder.full_unzip()
+                self.assertEqual(decoder.cached, cached)
+                self.assertEqual(Sequence(decoder.output).read(),
+                                 self.sequence)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (6, 6))
+        self.assertEqual(stats['entries'], 6)
+
+    def test_keys(self: object) -> None:
+
+        key = self.cache.key(self.path, 'FullEncoder', 'rans')
+        self.assertNotEqual(key, self.cache.key(self.path, 'FullEncoder',
+                                                'huffman'))
+        Sequence(self.path).write(self.sequence[::-1])
+        self.assertNotEqual(key, self.cache.key(self.path, 'FullEncoder',
+                                                'rans'))
+        self.assertFalse(self.cache.get(key,
+                                        os.path.join(self.directory, "x")))
+
+    def test_eviction(self: object) -> None:
+
+        cache = ResultCache(os.path.join(self.directory, 'small'), 2500)
+        for number in range(3):
+            path = os.path.join(self.directory, "artifact%d" % number)
+            Sequence(path).write_raw(bytes(1000))
+            cache.put('%064d' % number, path)
+            os.utime(cache.artifact('%064d' % number),
+                     (time.time() - 100 + number, time.time() - 100 + number))
+            if number == 1: # the first artifact is used again
+                self.assertTrue(cache.get('%064d' % 0, path))
+        self.assertFalse(os.path.exists(cache.artifact('%064d' % 1)))
+        self.assertTrue(os.path.exists(cache.artifact('%064d' % 0)))
+        stats = cache.stats()
+        self.assertEqual((stats['entries'], stats['evictions']), (2, 1))
+        cache.clear()
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# coding: utf-8
+"""Unitary test for the order-k context modelling codec."""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.append('../')
+import numpy as np
+from genomeencode.sequence import Sequence
+from genomeencode.context_model import ContextCoder, ContextModel, PRESETS
+from genomeencode.rans import RansCoder
+from genomeencode.encoder import FullEncoder
+from genomeencode.decoder import FullDecoder, ContextDecoder
+
+class ContextModelTest(unittest.TestCase):
+    """Test class to try out the context model codec and its controllers."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "seq.txt")
+        self.sequence = Sequence.generate(3000)
+        Sequence(self.path).write(self.sequence)
+
+    def test_roundtrip(self: object) -> None:
+
+        for sequence in ["", "A", "ACGT", "AC" * 100, self.sequence]:
+            for preset in PRESETS:
+                self.assertEqual(ContextCoder.decode(ContextCoder.encode(
+                    sequence, preset, block_size=1000)), sequence)
+
+    def test_repeats(self: object) -> None:
+
+        random.seed(0)
+        unit = ''.join(random.choice("ACGT") for _ in range(2000))
+        sequence = ''.join(unit[:random.randint(1000, 2000)]
+                           for _ in range(20))
+        coded = ContextCoder.encode(sequence, orders=(2, 12))
+        # a repeat is predicted by a long context but not by the base counts
+        self.assertEqual(ContextCoder.block_orders(coded), [12])
+        self.assertLess(len(coded), len(RansCoder.encode(sequence)) / 2)
+        self.assertEqual(ContextCoder.decode(coded), sequence)
+
+    def test_update(self: object) -> None:
+
+        rows = np.array([0, 0, 0, 1, 0])
+        symbols = np.array([2, 2, 2, 3, 1])
+        model = ContextModel(2, 4, 16)
+        model.update(rows, symbols)
+        # every lane that saw a symbol in a context counts
+        increment = ContextModel.INCREMENT
+        self.assertEqual(model.table[0].tolist(),
+                         [1, 1 + increment, 1 + 3 * increment, 1])
+        self.assertEqual(model.table[1].tolist(), [1, 1, 1, 1 + increment])
+
+        # many lanes on one context stay below the halving limit
+        rows = np.zeros(2048, dtype=np.int64)
+        for _ in range(3):
+            model.update(rows, np.zeros(2048, dtype=np.int64))
+            self.assertLessEqual(int(model.table[0].sum()),
+                                 ContextModel.LIMIT)
+        self.assertEqual(model.table[0].argmax(), 0)
+
+    def test_invalid(self: object) -> None:
+
+        with self.assertRaises(ValueError):
+            ContextCoder.encode(self.sequence, 'fastest')
+        with self.assertRaises(ValueError):
+            ContextCoder.encode(self.sequence, orders=(17,))
+
+    def test_full_context(self: object) -> None:
+
+        encoder = FullEncoder(self.path, entropy='context')
+        encoder.full_zip()
+        self.assertIsNone(encoder.bw_encoder)
+        decoder = FullDecoder(encoder.entropy_encoder.output)
+        decoder.full_unzip()
+        self.assertIsInstance(decoder.entropy_decoder, ContextDecoder)
+        self.assertIsNone(decoder.bw_decoder)
+        self.assertEqual(Sequence(decoder.output).read(), self.sequence)
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# coding: utf-8
+"""Unitary test for the encoder and decoder controllers."""
+from __future__ import absolute_import
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode.sequence import Sequence
+from genomeencode.encoder import FullEncoder
+from genomeencode.decoder import FullDecoder
+from genomeencode.metrics import MemorySink, JSONLinesSink
+from genomeencode.progress import Cancelled
+
+class ControllersTest(unittest.TestCase):
+    """Test class to try out the controllers and their hooks."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        self.directory = tempfile.mkdtemp()
+        self.sequence = "ACGTTGCAACGTNACGT"
+        self.path = os.path.join(self.directory, "seq.txt")
+        Sequence(self.path).write(self.sequence)
+
+    def test_full_roundtrip_metrics(self: object) -> None:
+
+        sink = MemorySink()
+        encoder = FullEncoder(self.path, sink)
+        encoder.full_zip()
+        decoder = FullDecoder(encoder.huff_encoder.huff_output, sink)
+        decoder.full_unzip()
+        self.assertEqual(decoder.bw_decoder.original, self.sequence)
+
+        summary = sink.summary()
+        self.assertIn(('BWEncoder', 'transform'), summary)
+        self.assertIn(('HuffDecoder', 'decode'), summary)
+        total = summary[('FullEncoder', 'total')]
+        self.assertEqual(total['calls'], 1)
+        self.assertEqual(total['blocks'], 1)
+        self.assertEqual(total['bytes_in'], os.path.getsize(self.path))
+        self.assertEqual(total['bytes_out'], os.path.getsize(
+            encoder.huff_encoder.huff_output))
+
+    def test_jsonlines_sink(self: object) -> None:
+
+        stream = io.StringIO()
+        FullEncoder(self.path, JSONLinesSink(stream)).full_zip()
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(events[-1]['controller'], 'FullEncoder')
+        for event in events:
+            self.assertGreaterEqual(event['seconds'], 0)
+            self.assertNotIn('error', event)
+
+    def test_progress_and_cancel(self: object) -> None:
+
+        fractions = []
+        FullEncoder(self.path, progress=fractions.append).full_zip()
+        self.assertEqual(fractions, sorted(fractions))
+        self.assertEqual(fractions[-1], 1.0)
+
+        def cancel(fraction: float) -> None:
+            if fraction >= 0.5:
+                raise Cancelled()
+
+        sink = MemorySink()
+        encoder = FullEncoder(self.path, sink, progress=cancel)
+        self.assertRaises(Cancelled, encoder.full_zip)
+        self.assertEqual(sink.summary()[('FullEncoder', 'total')]['errors'], 1)
+
+    def test_stage_progress(self: object) -> None:
+
+        sequence = Sequence.generate(100000)
+        Sequence(self.path).write(sequence)
+        stages = {0.1 * 0.7, 0.3 * 0.7, 0.9 * 0.7, 0.7}
+        fractions = []
+        encoder = FullEncoder(self.path, progress=fractions.append)
+        encoder.full_zip()
+        self.assertEqual(fractions, sorted(fractions))
+        # the suffix array rounds and the transform report inside the stage
+        self.assertGreater(len([fraction for fraction in fractions
+                                if 0.07 < fraction < 0.63 and
+                                fraction not in stages]), 3)
+        fractions = []
+        FullDecoder(encoder.huff_encoder.huff_output,
+                    progress=fractions.append).full_unzip()
+        self.assertEqual(fractions, sorted(fractions))
+        self.assertTrue(any(0.2 < fraction < 0.45 for fraction in fractions))
+        self.assertTrue(any(0.55 < fraction < 0.95 for fraction in fractions))
+
+        def cancel(fraction: float) -> None:
+            if fraction > 0.2:
+                raise Cancelled()
+
+        sink = MemorySink()
+        encoder = FullEncoder(self.path, sink, progress=cancel)
+        self.assertRaises(Cancelled, encoder.full_zip)
+        # cancelled while the suffix array is built
+        self.assertEqual(sink.summary()[('BWEncoder', 'transform')]['errors'],
+                         1)
+
+    def tearDown(self: object) -> None:
+
+        shutil.rmtree(self.directory)
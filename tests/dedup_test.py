@@ -0,0 +1,107 @@
+# coding: utf-8
+"""Unitary test for the in-memory codec and the deduplicating store."""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode import codec
+from genomeencode.dedup import DedupStore, chunk_boundaries
+from genomeencode.metrics import MemorySink
+from genomeencode.sequence import Sequence
+
+class DedupTest(unittest.TestCase):
+    """Test class to try out content-defined chunking and deduplication."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.directory = tempfile.mkdtemp()
+        self.sequence = Sequence.generate(200000)
+        # a variant with a few substitutions and an insertion
+        variant = list(self.sequence)
+        for position in [20000, 90000, 150000]:
+            variant[position] = 'A' if variant[position] != 'A' else 'C'
+        self.variant = ''.join(variant[:60000]) + "GATTACA" + \
+            ''.join(variant[60000:])
+
+    def test_codec(self: object) -> None:
+
+        for entropy in codec.BACKENDS:
+            for sequence in ["", "A", self.sequence[:5000]]:
+                data = codec.compress(sequence, entropy)
+                self.assertEqual(codec.backend(data), entropy)
+                self.assertEqual(codec.decompress(data), sequence)
+        with self.assertRaises(ValueError):
+            codec.compress("ACGT", 'lzma')
+        with self.assertRaises(ValueError):
+            codec.decompress(b'nothing')
+
+    def test_boundaries(self: object) -> None:
+
+        ends = chunk_boundaries(self.sequence)
+        self.assertEqual(ends[-1], len(self.sequence))
+        sizes = [end - start for start, end in zip([0] + ends, ends)]
+        self.assertTrue(all(4096 <= size <= 65536 for size in sizes[:-1]))
+        # the boundaries after an edit are shifted, not moved
+        shifted = set(end - 7 for end in chunk_boundaries(self.variant)
+                      if end > 70000)
+        self.assertGreater(len(shifted & set(ends)), len(ends) // 2)
+        self.assertEqual(chunk_boundaries(""), [])
+
+    def test_store(self: object) -> None:
+
+        sink = MemorySink()
+        store = DedupStore(self.directory, metrics=sink, min_size=1024,
+                           avg_size=4096, max_size=16384)
+        first = store.put("reference", self.sequence)
+        self.assertEqual(first['new_chunks'], first['chunks'])
+        second = store.put("variant", self.variant)
+        # only the chunks around the edits are compressed again
+        self.assertLessEqual(second['new_chunks'], 6)
+        self.assertEqual(store.get("reference"), self.sequence)
+        self.assertEqual(store.get("variant"), self.variant)
+        self.assertEqual(store.names(), ["reference", "variant"])
+        stats = store.stats()
+        self.assertEqual(stats['logical_bytes'],
+                         len(self.sequence) + len(self.variant))
+        self.assertLess(stats['stored_bytes'], 1.5 * first['bytes_stored'])
+        self.assertEqual(sink.summary()[('DedupStore', 'compress')]['calls'],
+                         stats['chunks'])
+
+        # a reopened store sees the same chunks
+        store = DedupStore(self.directory)
+        store.delete("reference")
+        self.assertEqual(store.get("variant"), self.variant)
+        self.assertEqual(store.stats()['chunks'], second['chunks'])
+        store.delete("variant")
+        self.assertEqual(store.stats()['chunks'], 0)
+        self.assertEqual(os.listdir(os.path.join(self.directory, 'manifests')),
+                         [])
+        with self.assertRaises(KeyError):
+            store.get("variant")
+        with self.assertRaises(ValueError):
+            store.put("../escape", "ACGT")
+
+    def test_ingest(self: object) -> None:
+
+        path = os.path.join(self.directory, "plasmid.txt")
+        Sequence(path).write(self.sequence[:30000])
+        store = DedupStore(os.path.join(self.directory, 'store'),
+                           entropy='context')
+        store.ingest(path)
+        summary = store.ingest(path, "copy")
+        self.assertEqual(summary['new_chunks'], 0)
+        store.put("copy", self.sequence[:10000]) # replaces the copy
+        self.assertEqual(store.get("copy"), self.sequence[:10000])
+        self.assertEqual(store.get("plasmid"), self.sequence[:30000])
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
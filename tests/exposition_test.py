@@ -0,0 +1,86 @@
+# coding: utf-8
+"""Unitary test for the metrics exposition of long-running workers."""
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+import urllib.request
+import sys
+sys.path.append('../')
+from genomeencode.sequence import Sequence
+from genomeencode.encoder import FullEncoder
+from genomeencode.decoder import FullDecoder
+from genomeencode.metrics import set_default_sink
+from genomeencode.pipeline import PipelineEncoder
+from genomeencode import exposition
+
+class ExpositionTest(unittest.TestCase):
+    """Test class to try out the Prometheus text exposition."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "seq.txt")
+        Sequence(self.path).write("ACGTTGCAACGTNACGT")
+        self.previous = set_default_sink(exposition.PrometheusSink())
+
+    def test_local_scrape(self: object) -> None:
+
+        controllers = ['FullEncoder', 'BWEncoder', 'HuffEncoder']
+        before = [exposition.COMPRESSED_BYTES.value(controller=controller)
+                  for controller in controllers]
+        ratios = exposition.COMPRESSION_RATIO.count(controller='FullEncoder')
+        encoder = FullEncoder(self.path)
+        encoder.full_zip()
+        FullDecoder(encoder.huff_encoder.huff_output).full_unzip()
+        # the nested controllers of a full zip do not count its input again
+        self.assertEqual([exposition.COMPRESSED_BYTES.value(
+            controller=controller) - count
+                          for controller, count in zip(controllers, before)],
+                         [os.path.getsize(self.path), 0, 0])
+        self.assertEqual(exposition.COMPRESSION_RATIO.count(
+            controller='FullEncoder'), ratios + 1)
+        self.assertEqual(exposition.COMPRESSION_RATIO.count(
+            controller='BWEncoder'), 0)
+        self.assertEqual(exposition.DECOMPRESSED_BYTES.value(
+            controller='HuffDecoder'), 0)
+
+        server = exposition.start_http_server(0)
+        try:
+            url = 'http://127.0.0.1:%d/metrics' % server.server_address[1]
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode('utf-8')
+        finally:
+            server.shutdown()
+        self.assertIn('# TYPE genomeencode_stage_seconds histogram', body)
+        self.assertIn('genomeencode_stage_seconds_bucket{controller='
+                      '"BWEncoder",stage="transform",le="+Inf"}', body)
+        self.assertIn('genomeencode_decompressed_bytes_total{controller='
+                      '"FullDecoder"}', body)
+        self.assertIn('genomeencode_compression_ratio_count', body)
+
+    def test_queue_depth(self: object) -> None:
+
+        exposition.QUEUE_DEPTH.set(3, queue='PipelineEncoder')
+        PipelineEncoder(self.path, block_size=4).encode()
+        # the queue is drained once the encoding is done
+        self.assertEqual(exposition.QUEUE_DEPTH.value(
+            queue='PipelineEncoder'), 0)
+
+    def test_textfile(self: object) -> None:
+
+        exposition.QUEUE_DEPTH.set(3, queue='test')
+        path = os.path.join(self.directory, "genomeencode.prom")
+        writer = exposition.TextfileWriter(path, interval=60)
+        writer.start()
+        writer.stop()
+        with open(path) as file:
+            self.assertIn('genomeencode_queue_depth{queue="test"} 3',
+                          file.read())
+        self.assertTrue(exposition.REGISTRY.render(True).endswith('# EOF\n'))
+
+    def tearDown(self: object) -> None:
+
+        set_default_sink(self.previous)
+        shutil.rmtree(self.directory)
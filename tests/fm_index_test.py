@@ -0,0 +1,74 @@
+# coding: utf-8
+"""Unitary test for the persistent FM-index."""
+from __future__ import absolute_import
+import os
+import random
+import re
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.append('../')
+import numpy as np
+from genomeencode.burros_wheeler import BurrosWheeler
+from genomeencode.fm_index import FMIndex, suffix_array
+from genomeencode.sequence import Sequence
+
+class FMIndexTest(unittest.TestCase):
+    """Test class to try out the FM-index and its index files."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "seq.fmi")
+        self.sequence = Sequence.generate(20000)
+
+    def positions(self: object, pattern: str) -> list:
+        return [match.start() for match in
+                re.finditer('(?=%s)' % re.escape(pattern), self.sequence)]
+
+    def test_suffix_array(self: object) -> None:
+
+        for sequence in ["", "A", "mississippi", self.sequence[:500]]:
+            symbols = np.array([ord(char) for char in sequence] + [0])
+            self.assertEqual(suffix_array(symbols).tolist(),
+                             BurrosWheeler.int_suffix_array(sequence))
+
+    def test_search(self: object) -> None:
+
+        index = FMIndex.build(self.sequence, 8, 64)
+        self.assertEqual(''.join(chr(index.alphabet[rank])
+                                 for rank in index.bwt),
+                         BurrosWheeler.bwt_advanced(self.sequence))
+        for _ in range(30):
+            start = random.randrange(len(self.sequence) - 12)
+            pattern = self.sequence[start:start + random.randint(1, 12)]
+            self.assertEqual(index.count(pattern),
+                             len(self.positions(pattern)))
+            self.assertEqual(index.locate(pattern), self.positions(pattern))
+        self.assertEqual(index.count("ACGTN"), len(self.positions("ACGTN")))
+        self.assertEqual(index.locate("AXG"), [])
+        self.assertEqual(index.count(""), len(self.sequence) + 1)
+
+    def test_persistence(self: object) -> None:
+
+        FMIndex.build(self.sequence).save(self.path)
+        index = FMIndex.load(self.path)
+        self.assertIsInstance(index.bwt, np.memmap)
+        self.assertFalse(index.bwt.flags.writeable)
+        for pattern in ["ACGT", "TTTTT", "GATTACA", self.sequence[100:140]]:
+            self.assertEqual(index.locate(pattern), self.positions(pattern))
+
+        FMIndex.build("").save(self.path)
+        self.assertEqual(FMIndex.load(self.path).count("A"), 0)
+        Sequence(self.path).write("ACGT")
+        with self.assertRaises(ValueError):
+            FMIndex.load(self.path)
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
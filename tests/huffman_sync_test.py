@@ -0,0 +1,112 @@
+# coding: utf-8
+"""Unitary test for the sync point index of Huffman streams."""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode.sequence import Sequence
+from genomeencode.huffman import HuffmanTree, SyncIndex
+from genomeencode.encoder import HuffEncoder
+from genomeencode.decoder import HuffDecoder
+from genomeencode.metrics import MemorySink
+
+class SyncIndexTest(unittest.TestCase):
+    """Test class to try out the parallel and random access Huffman
+    decoding."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "seq.txt")
+        self.sequence = Sequence.generate(20000) + "NNNN" + \
+            Sequence.generate(5003)
+        Sequence(self.path).write(self.sequence)
+
+    def test_index(self: object) -> None:
+
+        tree = HuffmanTree(self.sequence)
+        tree.get_codings(tree.root)
+        binary = tree.seq_to_binstr()
+        unicode = HuffmanTree.binstr_to_unicode(binary)
+        index = SyncIndex.build(self.sequence, tree.codes, unicode, 1000)
+        self.assertEqual(len(index), 26)
+        self.assertEqual(index.bits, len(binary) - int(tree.codes['pad']))
+        self.assertTrue(index.matches(unicode, int(tree.codes['pad'])))
+        self.assertFalse(index.matches(unicode[::-1],
+                                       int(tree.codes['pad'])))
+        for number, (start, stop, count) in enumerate(index.segments()):
+            piece, skip = index.piece(unicode, start, stop)
+            self.assertEqual(
+                SyncIndex.decode_segment(piece, skip, count, tree.codes),
+                self.sequence[number * 1000:number * 1000 + count])
+        for _ in range(50):
+            start = random.randrange(len(self.sequence))
+            stop = start + random.randrange(3000)
+            self.assertEqual(index.extract(unicode, tree.codes, start, stop),
+                             self.sequence[start:stop])
+        self.assertEqual(index.extract(unicode, tree.codes, 10, 10), '')
+
+        path = os.path.join(self.directory, "seq.idx")
+        index.save(path)
+        loaded = SyncIndex.load(path)
+        self.assertEqual(
+            (loaded.every, loaded.symbols, loaded.bits, loaded.crc),
+            (1000, len(self.sequence), index.bits, index.crc))
+        self.assertEqual(loaded.offsets.tolist(), index.offsets.tolist())
+        with self.assertRaises(ValueError):
+            SyncIndex.load(self.path)
+        with open(path, 'rb') as file:
+            data = file.read()
+        with open(path, 'wb') as file:
+            file.write(data[:-8])
+        with self.assertRaises(ValueError):
+            SyncIndex.load(path)
+
+    def test_controllers(self: object) -> None:
+
+        encoder = HuffEncoder(self.path, sync=1000)
+        encoder.encode()
+        sidecar = encoder.output + SyncIndex.SIDECAR
+        self.assertTrue(os.path.exists(sidecar))
+        sink = MemorySink()
+        decoder = HuffDecoder(encoder.output, sink, workers=2)
+        decoder.decode()
+        self.assertEqual(decoder.decompressed, self.sequence)
+        self.assertIsNone(decoder.binary)
+        self.assertEqual(sink.summary()[('HuffDecoder', 'decode')]['blocks'],
+                         26)
+        serial = HuffDecoder(encoder.output)
+        serial.decode()
+        self.assertEqual(serial.decompressed, self.sequence)
+
+        # the index of another stream with as many bits is ignored
+        shuffled = list(self.sequence)
+        random.shuffle(shuffled)
+        stale = os.path.join(self.directory, "stale.txt")
+        Sequence(stale).write(''.join(shuffled))
+        other = HuffEncoder(stale)
+        other.encode()
+        self.assertEqual(len(other.binary), len(encoder.binary))
+        shutil.copy(sidecar, other.output + SyncIndex.SIDECAR)
+        decoder = HuffDecoder(other.output, workers=2)
+        decoder.decode()
+        self.assertEqual(decoder.decompressed, ''.join(shuffled))
+        self.assertIsNotNone(decoder.binary)
+
+        # a stream without sync points removes the stale index
+        HuffEncoder(self.path).encode()
+        self.assertFalse(os.path.exists(sidecar))
+        with self.assertRaises(ValueError):
+            HuffEncoder(self.path, tables=6, sync=1000)
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
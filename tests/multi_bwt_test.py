@@ -0,0 +1,89 @@
+# coding: utf-8
+"""Unitary test for the multi-string BWT of read collections."""
+from __future__ import absolute_import
+import random
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode.burros_wheeler import BurrosWheeler
+from genomeencode.multi_bwt import MultiBWT
+from genomeencode.sequence import Sequence
+
+class MultiBWTTest(unittest.TestCase):
+    """Test class to try out the BCR construction and the document array."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.genome = Sequence.generate(3000)
+        self.reads = []
+        for _ in range(200):
+            start = random.randrange(len(self.genome) - 60)
+            stop = start + random.randint(20, 60)
+            self.reads.append(self.genome[start:stop])
+
+    def naive(self: object, strings: list) -> str:
+        # the suffixes of the concatenation, terminator i sorts as (0, i)
+        text = []
+        for number, string in enumerate(strings):
+            text += [(1, ord(char)) for char in string] + [(0, number)]
+        suff_arr = sorted(range(len(text)), key=lambda i: text[i:])
+        return ''.join('$' if text[i - 1][0] == 0 else chr(text[i - 1][1])
+                       for i in suff_arr)
+
+    def test_single_string(self: object) -> None:
+
+        self.assertEqual(MultiBWT(["mississippi"]).bwt,
+                         BurrosWheeler.bwt_advanced("mississippi"))
+        self.assertEqual(MultiBWT([""]).bwt, "$")
+        self.assertEqual(MultiBWT().bwt, "")
+
+    def test_batches(self: object) -> None:
+
+        strings = ["ACGT", "", "ACG", "TTACG", "ACGT", "G"]
+        whole = MultiBWT(strings)
+        self.assertEqual(whole.bwt, self.naive(strings))
+        batched = MultiBWT(strings[:2])
+        self.assertEqual(batched.add(strings[2:5]), range(2, 5))
+        batched.add(strings[5:])
+        self.assertEqual(batched.bwt, whole.bwt)
+
+        # code points beyond one and two bytes
+        strings = ["\u03b1\u03b2", "\U0001d538\u03b1", "A\u03b2\u03b1", ""]
+        wide = MultiBWT(strings[:2])
+        wide.add(strings[2:])
+        self.assertEqual(wide.bwt, self.naive(strings))
+
+        reads = MultiBWT(self.reads[:100])
+        reads.add(self.reads[100:])
+        self.assertEqual(reads.bwt, self.naive(self.reads))
+        self.assertEqual(len(reads), sum(map(len, self.reads)) + 200)
+
+    def test_locate(self: object) -> None:
+
+        reads = MultiBWT(self.reads[:50], sample=8)
+        reads.add(self.reads[50:])
+        for _ in range(20):
+            start = random.randrange(len(self.genome) - 15)
+            pattern = self.genome[start:start + random.randint(1, 15)]
+            expected = sorted((number, offset)
+                              for number, read in enumerate(self.reads)
+                              for offset in range(len(read))
+                              if read.startswith(pattern, offset))
+            self.assertEqual(reads.locate(pattern), expected)
+            self.assertEqual(reads.count(pattern), len(expected))
+        # a match never spans two reads
+        self.assertEqual(reads.locate(self.reads[0] + self.reads[1]), [])
+
+        rows, numbers, offsets = reads.document_sample
+        self.assertTrue(all(offset % 8 == 0 for offset in offsets.tolist()))
+        self.assertEqual(len(set(zip(numbers.tolist(), offsets.tolist()))),
+                         len(rows))
+
+    def test_invalid(self: object) -> None:
+
+        with self.assertRaises(ValueError):
+            MultiBWT(["AC\0GT"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+# coding: utf-8
+"""Unitary test for Huffman coding with multiple code tables."""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.append('../')
+import numpy as np
+from genomeencode.sequence import Sequence
+from genomeencode.huffman import HuffmanTree, MultiHuffman
+from genomeencode.encoder import FullEncoder, HuffEncoder
+from genomeencode.decoder import FullDecoder, HuffDecoder
+
+class MultiHuffmanTest(unittest.TestCase):
+    """Test class to try out the multiple tables Huffman coding."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "seq.txt")
+        # alternating AT-rich and GC-rich islands
+        self.sequence = ''.join(
+            ''.join(random.choice("GGGCCCAT" if i % 2 else "AAATTTGC")
+                    for _ in range(random.randint(500, 2000)))
+            for i in range(60))
+        Sequence(self.path).write(self.sequence)
+
+    def test_roundtrip(self: object) -> None:
+
+        for sequence in ["", "A", "AB", "mississippi$", self.sequence]:
+            for tables in [1, 2, 6]:
+                self.assertEqual(MultiHuffman.decode(
+                    MultiHuffman.encode(sequence, tables)), sequence)
+
+    def test_canonical_codes(self: object) -> None:
+
+        lengths = MultiHuffman.code_lengths(np.array([40, 30, 20, 10, 5]), 17)
+        codes = MultiHuffman.canonical_codes(lengths)
+        words = ['{:0{}b}'.format(code, length)
+                 for code, length in zip(codes, lengths)]
+        # a prefix code, shorter codes first
+        for word in words:
+            self.assertFalse(any(other != word and other.startswith(word)
+                                 for other in words))
+        self.assertEqual(list(lengths), sorted(lengths))
+        limited = MultiHuffman.code_lengths(2 ** np.arange(30), 8)
+        self.assertLessEqual(limited.max(), 8)
+
+    def test_islands(self: object) -> None:
+
+        single = MultiHuffman.encode(self.sequence, 1)
+        multiple = MultiHuffman.encode(self.sequence, 6)
+        self.assertLess(len(multiple), 0.95 * len(single))
+
+    def test_table_count(self: object) -> None:
+
+        # like bzip2, the number of tables grows with the symbols of a block
+        for length, tables in [(150, 2), (1000, 4), (3000, 6)]:
+            coded = MultiHuffman.encode(self.sequence[:length], 6)
+            size = MultiHuffman.HEADER.unpack_from(coded)[3]
+            self.assertEqual(coded[MultiHuffman.HEADER.size + 4 * size],
+                             tables)
+            self.assertEqual(MultiHuffman.decode(coded),
+                             self.sequence[:length])
+        # a stream of many slices
+        sequence = Sequence.generate(100000)
+        self.assertEqual(MultiHuffman.decode(MultiHuffman.encode(sequence)),
+                         sequence)
+
+    def test_controllers(self: object) -> None:
+
+        encoder = HuffEncoder(self.path, tables=6)
+        encoder.encode()
+        decoder = HuffDecoder(encoder.output)
+        decoder.decode()
+        self.assertEqual(Sequence(decoder.output).read(), self.sequence)
+
+        encoder = FullEncoder(self.path, entropy='multihuffman')
+        encoder.full_zip()
+        decoder = FullDecoder(encoder.huff_encoder.huff_output)
+        decoder.full_unzip()
+        self.assertEqual(Sequence(decoder.output).read(), self.sequence)
+
+    def test_max_length(self: object) -> None:
+
+        # long N runs and rare IUPAC symbols make long codes
+        sequence = self.sequence + "N" * 5000 + "RYKMSWBDHV"
+        Sequence(self.path).write(sequence)
+        for tables in [1, 6]:
+            encoder = HuffEncoder(self.path, tables=tables, max_length=5)
+            encoder.encode()
+            decoder = HuffDecoder(encoder.output)
+            decoder.decode()
+            self.assertEqual(Sequence(decoder.output).read(), sequence)
+
+        encoder = HuffEncoder(self.path, max_length=5)
+        encoder.encode()
+        codes = HuffmanTree.header_to_codes(encoder.header)
+        del codes['pad']
+        self.assertLessEqual(max(map(len, codes.values())), 5)
+        # the lookup tables of the decoder stay within TABLE_BITS
+        with self.assertRaises(ValueError):
+            MultiHuffman.encode(sequence, 6, HuffmanTree.TABLE_BITS + 1)
+        skewed = ''.join(chr(65 + i) * (1 << i) for i in range(20))
+        coded = MultiHuffman.encode(skewed, 1)
+        size = MultiHuffman.HEADER.unpack_from(coded)[3]
+        start = MultiHuffman.HEADER.size + 4 * size + MultiHuffman.BLOCK.size
+        self.assertEqual(max(coded[start:start + size]),
+                         HuffmanTree.TABLE_BITS)
+        self.assertEqual(MultiHuffman.decode(coded), skewed)
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+# coding: utf-8
+"""Unitary test for the pipelined block encoder."""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode.blocks import BlockCache, BlockReader
+from genomeencode.metrics import MetricsSink
+from genomeencode.pipeline import PipelineEncoder
+from genomeencode.progress import Cancelled
+from genomeencode.sequence import Sequence
+
+class ListSink(MetricsSink):
+    """A sink that keeps the events in order."""
+
+    def __init__(self: object) -> None:
+        self.events = []
+
+    def record(self: object, event: dict) -> None:
+        self.events.append(event)
+
+class PipelineEncoderTest(unittest.TestCase):
+    """Test class to try out the reader, compute and writer pipeline."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "seq.txt")
+        self.sequence = Sequence.generate(30000)
+        Sequence(self.path).write('\n'.join(
+            self.sequence[start:start + 70]
+            for start in range(0, len(self.sequence), 70)) + '\n')
+
+    def test_encode(self: object) -> None:
+
+        for entropy, workers in [('rans', 1), ('multihuffman', 2)]:
+            encoder = PipelineEncoder(self.path, block_size=4000,
+                                      entropy=entropy, workers=workers)
+            encoder.encode()
+            self.assertEqual(encoder.output,
+                             os.path.join(self.directory, "seq.gblk"))
+            with BlockReader(encoder.output, BlockCache()) as reader:
+                self.assertEqual(reader.count, 8)
+                self.assertEqual(reader.read(), Sequence(self.path).read())
+                self.assertEqual(reader.read(3990, 4010),
+                                 self.sequence[3990:4010])
+
+        Sequence(self.path).write("")
+        PipelineEncoder(self.path).encode()
+        with BlockReader(encoder.output) as reader:
+            self.assertEqual(reader.read(), "")
+
+    def test_backpressure(self: object) -> None:
+
+        sink = ListSink()
+        fractions = []
+        PipelineEncoder(self.path, block_size=1000, in_flight=2,
+                        metrics=sink, progress=fractions.append).encode()
+        stages = [event['stage'] for event in sink.events]
+        self.assertEqual(stages.count('write'), 30)
+        depths = [event['queue_depth'] for event in sink.events
+                  if event['stage'] == 'wait']
+        self.assertEqual(len(depths), 30)
+        self.assertLessEqual(max(depths), 2)
+        # never more than two blocks read ahead of the writer
+        for written in range(30):
+            end = [i for i, stage in enumerate(stages)
+                   if stage == 'write'][written]
+            self.assertLessEqual(stages[:end].count('read'), written + 2)
+        self.assertEqual(fractions[-1], 1.0)
+        self.assertEqual(fractions, sorted(fractions))
+
+    def test_cancel(self: object) -> None:
+
+        def progress(fraction: float) -> None:
+            if fraction > 0.5:
+                raise Cancelled()
+        encoder = PipelineEncoder(self.path, block_size=1000, in_flight=2,
+                                  progress=progress)
+        with self.assertRaises(Cancelled):
+            encoder.encode()
+        self.assertFalse(os.path.exists(encoder.output))
+        with self.assertRaises(ValueError):
+            PipelineEncoder(self.path, in_flight=0)
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
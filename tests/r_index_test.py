@@ -0,0 +1,75 @@
+# coding: utf-8
+"""Unitary test for the run-length compressed r-index."""
+from __future__ import absolute_import
+import random
+import re
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode.burros_wheeler import BurrosWheeler
+from genomeencode.fm_index import FMIndex
+from genomeencode.r_index import RIndex
+from genomeencode.sequence import Sequence
+
+class RIndexTest(unittest.TestCase):
+    """Test class to try out the r-index on a repetitive collection."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        base = Sequence.generate(5000)
+        self.sequences = []
+        for _ in range(20):
+            variant = list(base)
+            for _ in range(5):
+                variant[random.randrange(len(variant))] = random.choice("ACGT")
+            self.sequences.append(''.join(variant))
+        self.text = '#'.join(self.sequences)
+        self.index = RIndex.from_collection(self.sequences)
+
+    def positions(self: object, pattern: str) -> list:
+        return [match.start() for match in
+                re.finditer('(?=%s)' % re.escape(pattern), self.text)]
+
+    def test_runs(self: object) -> None:
+
+        index = RIndex("mississippi")
+        self.assertEqual(''.join(chr(index.alphabet[symbol]) * length
+                                 for symbol, length in zip(
+                                     index.run_symbols,
+                                     [1, 1, 2, 1, 1, 1, 1, 2, 2])),
+                         BurrosWheeler.bwt_advanced("mississippi"))
+        self.assertEqual(index.run_starts.tolist(),
+                         [0, 1, 2, 4, 5, 6, 7, 8, 10])
+        # far fewer runs than rows on the collection
+        self.assertLess(self.index.runs, len(self.index) / 10)
+        fm_index = FMIndex.build(self.text)
+        self.assertLess(self.index.nbytes(), sum(
+            getattr(fm_index, name).nbytes for name in FMIndex.ARRAYS) / 2)
+
+    def test_search(self: object) -> None:
+
+        for _ in range(50):
+            start = random.randrange(len(self.text) - 20)
+            pattern = self.text[start:start + random.randint(1, 20)]
+            self.assertEqual(self.index.count(pattern),
+                             len(self.positions(pattern)))
+            self.assertEqual(self.index.locate(pattern),
+                             self.positions(pattern))
+        for pattern in ["ACGTACGTACGTACGT", "X", "#A"]:
+            self.assertEqual(self.index.locate(pattern),
+                             self.positions(pattern))
+        self.assertEqual(RIndex("").count("A"), 0)
+
+    def test_documents(self: object) -> None:
+
+        pattern = self.sequences[3][1000:1030]
+        documents = [self.index.document(position)
+                     for position in self.index.locate(pattern)]
+        self.assertIn((3, 1000), documents)
+        self.assertEqual(self.index.document(0), (0, 0))
+        self.assertEqual(self.index.document(len(self.text) - 1),
+                         (19, len(self.sequences[19]) - 1))
+
+if __name__ == '__main__':
+    unittest.main()
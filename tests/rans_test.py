@@ -0,0 +1,70 @@
+# coding: utf-8
+"""Unitary test for the rANS entropy coding backend."""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode.sequence import Sequence
+from genomeencode.rans import RansCoder
+from genomeencode.encoder import FullEncoder, RansEncoder
+from genomeencode.decoder import FullDecoder, RansDecoder
+
+class RansTest(unittest.TestCase):
+    """Test class to try out the rANS coder and its controllers."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "seq.txt")
+        self.sequence = Sequence.generate(5000) + "NNNN"
+        Sequence(self.path).write(self.sequence)
+
+    def test_roundtrip(self: object) -> None:
+
+        for sequence in ["", "A", "ACGT$", "AAAAAAAA", self.sequence]:
+            for lanes in [1, 3, 64]:
+                self.assertEqual(RansCoder.decode(
+                    RansCoder.encode(sequence, lanes)), sequence)
+
+    def test_near_entropy(self: object) -> None:
+
+        sequence = ''.join(random.choice("ACGT") for _ in range(20000))
+        # 2 bits per base plus the header, tables and final states
+        self.assertLess(len(RansCoder.encode(sequence)), 20000 // 4 + 600)
+
+    def test_controllers(self: object) -> None:
+
+        encoder = RansEncoder(self.path)
+        encoder.encode()
+        self.assertTrue(Sequence(encoder.output).read_raw().startswith(
+            RansCoder.MAGIC))
+        decoder = RansDecoder(encoder.output)
+        decoder.decode()
+        self.assertEqual(Sequence(decoder.output).read(), self.sequence)
+
+    def test_full_rans(self: object) -> None:
+
+        encoder = FullEncoder(self.path, entropy='rans')
+        encoder.full_zip()
+        self.assertIsNone(encoder.huff_encoder)
+        decoder = FullDecoder(encoder.entropy_encoder.output)
+        decoder.full_unzip()
+        self.assertIsInstance(decoder.entropy_decoder, RansDecoder)
+        self.assertEqual(Sequence(decoder.bw_decoder.debwt_output).read(),
+                         self.sequence)
+
+    def test_unknown_entropy(self: object) -> None:
+
+        with self.assertRaises(ValueError):
+            FullEncoder(self.path, entropy='lzma')
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
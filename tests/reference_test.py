@@ -0,0 +1,96 @@
+# coding: utf-8
+"""Unitary test for the reference-based compression."""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode.sequence import Sequence
+from genomeencode.reference import ReferenceIndex, ReferenceCoder
+from genomeencode.encoder import ReferenceEncoder
+from genomeencode.decoder import FullDecoder, ReferenceDecoder
+
+class ReferenceTest(unittest.TestCase):
+    """Test class to try out the reference-based codec and its controllers."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.directory = tempfile.mkdtemp()
+        self.reference = ''.join(random.choice("ACGT") for _ in range(50000))
+        # substitutions, deletions, insertions and an N run
+        target = list(self.reference)
+        for position in sorted(random.sample(range(100, 49000), 60),
+                               reverse=True):
+            edit = random.random()
+            if edit < 0.6:
+                target[position] = random.choice("ACGT")
+            elif edit < 0.8:
+                del target[position:position + random.randint(1, 8)]
+            else:
+                target[position:position] = random.choice(["GATTACA", "T"])
+        target[25000:25000] = "N" * 300
+        self.target = ''.join(target)
+        self.ref_path = os.path.join(self.directory, "ref.txt")
+        self.path = os.path.join(self.directory, "seq.txt")
+        Sequence(self.ref_path).write(self.reference)
+        Sequence(self.path).write(self.target)
+
+    def test_roundtrip(self: object) -> None:
+
+        index = ReferenceIndex(self.reference)
+        for target in ["", "A", "NNNN", self.reference[:30], self.target,
+                       "XYZ" + self.reference[::-1][:1000]]:
+            self.assertEqual(ReferenceCoder.decode(
+                self.reference, ReferenceCoder.encode(index, target)), target)
+
+        coded = ReferenceCoder.encode(index, self.target)
+        # 2 bits per base would take 12.5 kB
+        self.assertLess(len(coded), 1000)
+        with self.assertRaises(ValueError):
+            ReferenceCoder.decode(self.reference[1:] + "A", coded)
+
+    def test_short_sequences(self: object) -> None:
+
+        index = ReferenceIndex(self.reference)
+        for length in [11, 15, 19, 20, 21]:
+            target = self.reference[100:100 + length]
+            self.assertEqual(ReferenceCoder.decode(
+                self.reference, ReferenceCoder.encode(index, target)), target)
+        # references shorter than a k-mer have no k-mer to index
+        for reference in ["", "ACGTACGTACG", self.reference[:19]]:
+            short = ReferenceIndex(reference)
+            for target in ["", "ACGTAC", self.target[:15], self.target[:500]]:
+                self.assertEqual(ReferenceCoder.decode(
+                    reference, ReferenceCoder.encode(short, target)), target)
+
+    def test_sampled_index(self: object) -> None:
+
+        index = ReferenceIndex(self.reference, k=16, step=5)
+        coded = ReferenceCoder.encode(index, self.target)
+        self.assertEqual(ReferenceCoder.decode(self.reference, coded),
+                         self.target)
+        saved = os.path.join(self.directory, "ref.npz")
+        index.save(saved)
+        loaded = ReferenceIndex.load(saved, self.reference)
+        self.assertEqual(ReferenceCoder.encode(loaded, self.target), coded)
+
+    def test_controllers(self: object) -> None:
+
+        encoder = ReferenceEncoder(self.path, self.ref_path)
+        encoder.encode()
+        decoder = ReferenceDecoder(encoder.output, self.ref_path)
+        decoder.decode()
+        self.assertEqual(Sequence(decoder.output).read(), self.target)
+        with self.assertRaises(ValueError):
+            FullDecoder(encoder.output).full_unzip()
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
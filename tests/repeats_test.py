@@ -0,0 +1,83 @@
+# coding: utf-8
+"""Unitary test for the LCP array and the repeat analyses."""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode.burros_wheeler import BurrosWheeler
+from genomeencode.encoder import BWEncoder
+from genomeencode.repeats import RepeatAnalysis
+from genomeencode.sequence import Sequence
+
+class RepeatAnalysisTest(unittest.TestCase):
+    """Test class to try out the repeat analyses on the suffix array."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.directory = tempfile.mkdtemp()
+        self.sequence = "mississippi"
+
+    def test_lcp(self: object) -> None:
+
+        analysis = RepeatAnalysis(self.sequence)
+        self.assertEqual(analysis.suff_arr,
+                         BurrosWheeler.int_suffix_array(self.sequence))
+        self.assertEqual(analysis.lcp, [0, 0, 1, 1, 4, 0, 0, 1, 0, 2, 1, 3])
+        self.assertEqual(RepeatAnalysis("").lcp, [0])
+
+    def test_distinct_substrings(self: object) -> None:
+
+        for _ in range(20):
+            sequence = Sequence.generate(random.randint(0, 60))
+            expected = len({sequence[i:j] for i in range(len(sequence))
+                            for j in range(i + 1, len(sequence) + 1)})
+            self.assertEqual(RepeatAnalysis(sequence).distinct_substrings(),
+                             expected)
+
+    def test_repeats(self: object) -> None:
+
+        analysis = RepeatAnalysis(self.sequence)
+        self.assertEqual(analysis.longest_repeats(), (4, [("issi", [1, 4])]))
+        self.assertEqual(analysis.maximal_repeats(), [(4, [1, 4])])
+        # 'ssi' always follows an 'i', it is not maximal
+        self.assertEqual(analysis.maximal_repeats(1),
+                         [(4, [1, 4]), (1, [1, 4, 7, 10]), (1, [2, 3, 5, 6]),
+                          (1, [8, 9])])
+        self.assertEqual(RepeatAnalysis("ACGT").longest_repeats(), (0, []))
+
+        # an inserted element is found again
+        element = Sequence.generate(300)
+        sequence = Sequence.generate(2000) + element + \
+            Sequence.generate(2000) + element + Sequence.generate(1000)
+        length, repeats = RepeatAnalysis(sequence).longest_repeats()
+        self.assertGreaterEqual(length, 300)
+        self.assertIn(element, repeats[0][0])
+
+    def test_tandem_repeats(self: object) -> None:
+
+        sequence = "GATTC" + "CA" * 6 + "G" + "AAAAA" + "TGC" + "ACG" * 4 + "T"
+        self.assertEqual(RepeatAnalysis(sequence).tandem_repeats(),
+                         [(5, 2, 6), (18, 1, 5), (26, 3, 4)])
+        self.assertEqual(RepeatAnalysis(sequence).tandem_repeats(2, 6),
+                         [(5, 2, 6)])
+
+    def test_encoder_suffix_array(self: object) -> None:
+
+        path = os.path.join(self.directory, "seq.txt")
+        Sequence(path).write(self.sequence)
+        encoder = BWEncoder(path)
+        encoder.encode()
+        analysis = RepeatAnalysis(self.sequence, encoder.suff_arr)
+        self.assertEqual(analysis.longest_repeats()[0], 4)
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
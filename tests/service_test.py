@@ -0,0 +1,89 @@
+# coding: utf-8
+"""Unitary test for the compression service and its client."""
+from __future__ import absolute_import
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sys
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append('../')
+from genomeencode.blocks import BlockWriter
+from genomeencode.client import Client
+from genomeencode.metrics import MemorySink
+from genomeencode.sequence import Sequence
+from genomeencode.service import Service
+
+class ServiceTest(unittest.TestCase):
+    """Test class to try out the batched requests of many clients."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        random.seed(0)
+        self.directory = tempfile.mkdtemp()
+        self.sequences = [Sequence.generate(random.randrange(1, 2000))
+                          for _ in range(40)]
+
+    def test_batching(self: object) -> None:
+
+        sink = MemorySink()
+
+        def job(sequences: list) -> list:
+            with Client(service.address) as client:
+                results = []
+                for sequence in sequences:
+                    data = client.compress(sequence)
+                    results.append(client.decompress(data))
+                    sock = client.connection.sock
+                # the connection was kept alive
+                self.assertIs(client.connection.sock, sock)
+                return results
+
+        with Service(workers=2, delay=0.01, metrics=sink) as service:
+            service.start()
+            with ThreadPoolExecutor(8) as pool:
+                results = pool.map(job, [self.sequences[number::8]
+                                         for number in range(8)])
+            for number, decoded in enumerate(results):
+                self.assertEqual(decoded, self.sequences[number::8])
+            with Client(service.address) as client:
+                self.assertEqual(client.decompress(client.compress(
+                    self.sequences[0], 'context')), self.sequences[0])
+                self.assertEqual(client.compress(''), client.compress(''))
+                with self.assertRaises(ValueError):
+                    client.compress('ACGT', 'unknown')
+                with self.assertRaises(ValueError):
+                    client.decompress(b'invalid')
+                with self.assertRaises(ValueError):
+                    client.request('GET', '/compress')
+        summary = sink.summary()
+        self.assertEqual(summary[('Service', 'compress')]['calls'], 45)
+        self.assertEqual(summary[('Batcher', 'batch')]['blocks'], 86)
+        # concurrent small requests share worker calls
+        self.assertLess(summary[('Batcher', 'batch')]['calls'], 86)
+
+    def test_unix_socket(self: object) -> None:
+
+        sequence = Sequence.generate(20000)
+        blocked = os.path.join(self.directory, "seq.gblk")
+        BlockWriter(blocked, 4096).write(sequence)
+        address = os.path.join(self.directory, "service.sock")
+        with Service(address) as service:
+            service.start()
+            with Client(address) as client:
+                self.assertEqual(client.extract(blocked), sequence)
+                self.assertEqual(client.extract(blocked, 5000, 9000),
+                                 sequence[5000:9000])
+                data = client.compress(sequence)
+                self.assertEqual(client.decompress(data), sequence)
+                with self.assertRaises(FileNotFoundError):
+                    client.extract(os.path.join(self.directory, "none"))
+        self.assertFalse(os.path.exists(address))
+
+    def tearDown(self: object) -> None:
+        """Cleaning after each test"""
+        shutil.rmtree(self.directory)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+# coding: utf-8
+"""Unitary test for the shared memory arrays of the worker processes."""
+from __future__ import absolute_import
+from concurrent.futures import ProcessPoolExecutor
+import unittest
+import sys
+sys.path.append('../')
+import numpy as np
+from genomeencode.shared import SharedArray, Spec
+
+def double(source: Spec, target: Spec, first: int, stop: int) -> None:
+    with SharedArray.attach(source) as shared_source, \
+            SharedArray.attach(target) as shared_target:
+        shared_target.array[first:stop] = 2 * shared_source.array[first:stop]
+
+class SharedArrayTest(unittest.TestCase):
+    """Test class to try out the zero-copy exchange with workers."""
+
+    def test_workers(self: object) -> None:
+
+        values = np.arange(1000, dtype=np.int64)
+        with SharedArray.copy(values) as source, \
+                SharedArray((1000,), '<i8') as target, \
+                ProcessPoolExecutor(2) as pool:
+            self.assertEqual(source.spec[1:], ((1000,), '<i8'))
+            list(pool.map(double, [source.spec] * 4, [target.spec] * 4,
+                          [0, 250, 500, 750], [250, 500, 750, 1000]))
+            self.assertEqual(target.array.tolist(), (2 * values).tolist())
+
+    def test_lifetime(self: object) -> None:
+
+        shared = SharedArray.copy(np.zeros(0, dtype=np.uint8))
+        self.assertEqual(len(shared.array), 0)
+        spec = shared.spec
+        shared.close()
+        shared.close()
+        self.assertIsNone(shared.array)
+        # the owner unlinked the segment
+        with self.assertRaises(FileNotFoundError):
+            SharedArray.attach(spec)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+# coding: utf-8
+"""Unitary test for the step-by-step traces of the GUI."""
+from __future__ import absolute_import
+import unittest
+import sys
+sys.path.append('../')
+from genomeencode.burros_wheeler import BurrosWheeler
+from genomeencode.trace import EncodeTrace, DecodeTrace
+
+class TraceTest(unittest.TestCase):
+    """Test class to check that the traces render the same steps as the
+    naive protocols."""
+
+    def setUp(self: object) -> None:
+        """Initialize before every test"""
+        self.sequence = "ACGTTGCAACGTNACGT"
+
+    def test_encode_trace(self: object) -> None:
+
+        trace = EncodeTrace()
+        trace.record(self.sequence,
+                     BurrosWheeler.int_suffix_array(self.sequence))
+        steps = list(BurrosWheeler.string_rotations(self.sequence))
+        self.assertEqual(len(trace), len(steps))
+        self.assertEqual(list(trace.steps()), steps)
+        self.assertEqual(trace.bwm(), BurrosWheeler.construct_bwm(steps[-1]))
+        self.assertEqual(trace.bwt, BurrosWheeler.bwt_advanced(self.sequence))
+
+    def test_decode_trace(self: object) -> None:
+
+        transform = BurrosWheeler.bwt_advanced(self.sequence)
+        trace = DecodeTrace()
+        trace.record(transform)
+        steps = list(BurrosWheeler.reconstruct_bwm(transform))
+        self.assertEqual(len(trace), len(steps))
+        self.assertEqual(list(trace.steps()), steps)
+        self.assertEqual(trace.original, self.sequence)
+
+    def test_lazy_windows(self: object) -> None:
+
+        transform = BurrosWheeler.bwt_advanced(self.sequence)
+        trace = DecodeTrace()
+        trace.record(transform)
+        for step in (0, 5, 6, len(trace) - 1):
+            view = trace.matrix_view(step)
+            lines = trace.matrix(step)
+            self.assertEqual(view.window(3, 9, 1, 4),
+                             [line[1:4] for line in lines[3:9]])
+
+        trace = EncodeTrace()
+        trace.record(self.sequence,
+                     BurrosWheeler.int_suffix_array(self.sequence))
+        view = trace.bwm_view()
+        self.assertEqual((view.height, view.width), (18, 18))
+        self.assertEqual(view.window(16, 40, 10, 40),
+                         [line[10:] for line in trace.bwm()[16:]])
+
+    def tearDown(self: object) -> None:
+
+        self.sequence = None